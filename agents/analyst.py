@@ -2,13 +2,12 @@
 from crewai import Agent
 from utils.config import config
 from tools.analysis_tool import analysis_tool
-from langchain_community.chat_models import ChatLiteLLM
+from utils.llm_cache import shared_llm
 
 AVAILABLE_DATA_PATHS = config.AVAILABLE_DATA_PATHS
 class DataAnalystAgent(Agent):
     def __init__(self, llm=None, verbose=True):
-        llm = ChatLiteLLM(model="gemini/gemini-1.5-flash",
-                api_key=config.GOOGLE_API_KEY)
+        llm = llm or shared_llm
         super().__init__(
             role='Senior Data Analyst',
 
@@ -32,15 +31,15 @@ You MUST exclusively use the `analysis_tool` to interact with and process data.
     *   Access Method:'metodo_accesso', 'modalita_autenticazione' (e.g., SPID, CIE)
     *   Commuting Distance: 'fascia di distanza', 'distanza_pendolare_km'
     *   Municipality: 'comune', 'descrizione_comune'
-    This is not exhaustive, these may not be the specific mappings, **always** explore df.columns.
+    This is not exhaustive; the exact columns and values of every file are listed in the schema catalog included in each task.
 
 **Key Workflow & Responsibilities:**
 
 1.  **Understand Query:** Carefully dissect the user's request to pinpoint the exact information, metrics, or insights required. Break down complex queries into manageable analytical steps.
 
-2.  **Data Exploration (MANDATORY Tool Use):**
-    *   Use the `analysis_tool`. Investigate all provided data files (accessible via `{AVAILABLE_DATA_PATHS}` to determine which contain relevant information.
-    *   For potentially relevant files, inspect structure (`df.columns`, `df.info()`) and content (`df.head()`).
+2.  **Data Exploration (Schema Catalog):**
+    *   Use the schema catalog in the task (also available as `describe_dataset()` in the tool) to determine which of the data files (accessible via `{AVAILABLE_DATA_PATHS}`) contain relevant information.
+    *   Do not spend tool calls on `df.columns`, `df.info()` or `df.head()`; inspect a file only if the catalog does not answer your question.
     *   Access file paths using the `AVAILABLE_DATA_PATHS` variable in your Python code.
     *   **Flexible Column Identification:** While column names are now more harmonized, 
         still be prepared for slight variations, even in Italian terms 
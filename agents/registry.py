@@ -0,0 +1,46 @@
+# agents/registry.py
+import threading
+import uuid
+
+from agents.analyst import DataAnalystAgent
+from agents.reporter import ReporterAgent
+from agents.visualizer import DataVisualizerAgent
+from utils.llm_cache import shared_llm
+
+
+class AgentRegistry:
+    """
+    Process-wide agent templates, built once on first use. Each request gets a shallow
+    copy that shares the template's LLM client and tools, so per-request setup is a
+    model copy rather than prompt formatting, validation and LLM construction.
+    """
+
+    def __init__(self, llm=None):
+        self.llm = llm
+        self._templates = {}
+        self._lock = threading.Lock()
+
+    def get(self, agent_class):
+        with self._lock:
+            template = self._templates.get(agent_class)
+            if template is None:
+                template = self._templates[agent_class] = agent_class(llm=self.llm)
+        # A fresh id keeps copies distinct inside a crew; execution state is created per task.
+        agent = template.model_copy(update={"id": uuid.uuid4()})
+        # Token usage is counted per agent instance, so each copy gets its own counter.
+        private = agent.__pydantic_private__ or {}
+        if "_token_process" in private:
+            private["_token_process"] = type(private["_token_process"])()
+        return agent
+
+    def analyst(self) -> DataAnalystAgent:
+        return self.get(DataAnalystAgent)
+
+    def visualizer(self) -> DataVisualizerAgent:
+        return self.get(DataVisualizerAgent)
+
+    def reporter(self) -> ReporterAgent:
+        return self.get(ReporterAgent)
+
+
+agent_registry = AgentRegistry(llm=shared_llm)
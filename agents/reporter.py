@@ -1,14 +1,13 @@
 # agents/reporter.py
 from crewai import Agent
 from utils.config import config
-from langchain_community.chat_models import ChatLiteLLM
+from utils.llm_cache import shared_llm
 import os
 from tools.reporter_tool import reporter_tool
 
 class ReporterAgent(Agent):
-    def __init__(self, verbose=True):
-        llm = ChatLiteLLM(model="gemini/gemini-1.5-flash",
-                          api_key=config.GOOGLE_API_KEY)
+    def __init__(self, llm=None, verbose=True):
+        llm = llm or shared_llm
         super().__init__(
             role='Chief communication officer and final reporter',
         goal=f"""
@@ -1,92 +1,57 @@
 # agents/visualizer.py
 from crewai import Agent
 from utils.config import config
-from tools.visualization_tool import python_plotting_tool
-from langchain_community.chat_models import ChatLiteLLM
+from utils.llm_cache import shared_llm
 
 AVAILABLE_DATA_PATHS = config.AVAILABLE_DATA_PATHS
 
 class DataVisualizerAgent(Agent):
     def __init__(self, llm=None, verbose=True, context = str):
-        llm = ChatLiteLLM(model="gemini/gemini-1.5-flash",
-                          api_key=config.GOOGLE_API_KEY)
+        llm = llm or shared_llm
         super().__init__(
             role='Data Visualization Expert',
             goal=f"""
-**Objective:** Create and save a single, clear plot image from the Analyst's data, then output a JSON with its file path and details.
+**Objective:** Describe a single, clear chart of the Analyst's data as a compact JSON chart spec. You do NOT write plotting code; the application renders the spec itself.
 
 **Activation:** Only if visualization is requested and Analyst provides suitable CSV data (after '=== DATA FOR VISUALIZATION (CSV) ===').
 
 **Your Workflow:**
-1.  **Get Data:** Extract the CSV data string from the Analyst's output (from after '=== DATA FOR VISUALIZATION (CSV) ==='). If this data is unsuitable for the requested plot, even after considering adaptations, your JSON output must clearly state 'visualization_type: "none"' and explain why.
-2.  **Design Plot:** Based on the user's request and the CSV data, decide the best chart type (e.g., bar, line, scatter), a clear title, and x/y axis labels.
-3.  **Generate Python Code & Package Data for Output JSON:**
-    *   Write Python code (e.g., Matplotlib/Seaborn) to generate the chart. This code will be the value for the `"python_code_to_generate_figure"` field in your JSON output.
-    *   This Python code MUST:
-        a.  Include all necessary imports (e.g., `import matplotlib.pyplot as plt`, `import pandas as pd`, `import io`).
-        b.  Be designed to accept the necessary data. If the `data_for_visualization.format` is 'csv_string' (from the Analyst), your code must parse it (e.g., `df = pd.read_csv(io.StringIO(data_string_variable_containing_csv))`). The data will be available in a variable like `df_viz_data` injected by the executing tool.
-        c.  Use the `df_viz_data` and `plot_params` (also injected) to construct the plot (e.g., `ax.set_title(plot_params.get('title', 'Default Title'))`).
-        d.  **ABSOLUTELY CRUCIAL: After creating the figure (`fig`), you MUST explicitly save it using the `plt.savefig()` command. The file path to save to will be provided to your code in a variable named `plot_path_to_save`. Your code MUST use this exact variable: `plt.savefig(plot_path_to_save)`.**
-        e.  After saving, include `plt.close(fig)` to release memory.
-        f.  The code should also aim to assign the created Matplotlib figure object to a variable named `figure_object` (e.g., `figure_object = fig`) so it can also be used for direct display by `st.pyplot()`.
-    *   **DO NOT include `plt.show()` in your generated code.**
-*   Prepare the specific data required by your Python code in the `data_for_visualization` part of your JSON.
-
-4.  **Construct Final JSON Output:**
-    *   Your final output MUST be a single JSON object.
-    *   **Success Case JSON Structure Example (Illustrative):**
-        ```json
-        {{
-            "visualization_type": "bar_chart",
-            "python_code_to_generate_figure": "import matplotlib.pyplot as plt\\nimport pandas as pd\\nimport io\\ndef generate_and_save_plot(df_viz_data, plot_params, plot_path_to_save):\\n  fig, ax = plt.subplots()\\n  # Example: ax.bar(df_viz_data['category_column'], df_viz_data['value_column'])\\n  ax.set_title(plot_params.get('title', 'Example Title'))\\n  ax.set_xlabel(plot_params.get('x_label', 'X Axis Example'))\\n  ax.set_ylabel(plot_params.get('y_label', 'Y Axis Example'))\\n  plt.tight_layout()\\n  plt.savefig(plot_path_to_save) # <<< ESSENTIAL LINE USING THE PROVIDED VARIABLE NAME\\n  plt.close(fig)\\n  return fig\\nfigure_object = generate_and_save_plot(df_viz_data, plot_params, plot_path_to_save) # Example of how figure_object is set",
-            "data_for_visualization": {{ ... }},
-            "plot_parameters": {{ ... }},
-            "description": "..."
-        }}
-    The tool will execute your code. If successful, it will return the `plot_path` (string) to the saved image. 
-    If it fails, it will return an error message (string).
-5.  **Output JSON:** Based on the tool's return:
-    *   **If tool returns a path (Success):** Output JSON:
-        `{{ "visualization_type": "your_chart_type", "plot_parameters": {{"title":"Chart Title", "x_label":"X-Axis Label", "y_label":"Y-Axis Label", "suggested_library":"matplotlib"}}, "description": "Brief description of the plot and any adaptations made.", "plot_path": "tool_returned_path_string" }}`
-    *   **If tool returns an error OR data was unsuitable (Failure):** Output JSON:
-        `{{ "visualization_type": "none", "plot_parameters": null, "description": "Reason (e.g., 'Data unsuitable for X plot because Y.' or 'Plotting Tool Error: [tool's error message]').", "plot_path": null }}`
-
-**Adaptation Principle:** If the exact requested visualization isn't possible with the provided data, create the most relevant alternative plot and explain this adaptation in your JSON "description". Only if no useful plot can be made should you output the failure JSON.
+1.  **Read the Data:** Look at the header and rows of the CSV after '=== DATA FOR VISUALIZATION (CSV) ===' in the Analyst's output. Use its column names EXACTLY as written. If the data is unsuitable for any useful chart, output the failure JSON below.
+2.  **Design the Chart:** Pick the best `chart_type` for the request and the data:
+    *   `bar` / `barh` for categories (use `barh` for long labels or many categories), `line` / `area` for ordered ranges or time, `pie` only for a few parts of a whole, `scatter` for two numeric columns.
+    *   `x` is the category column, `y` the numeric column, `hue` an optional second category column (grouped bars or several lines; `stacked: true` to stack them).
+    *   `aggregation`: `"none"` if the CSV already has one row per x (and hue), otherwise `"sum"`, `"mean"` or `"count"`.
+    *   `sort`: `"x"` for age/distance/income ranges (natural order), `"desc"`/`"asc"` to rank by value, `"none"` to keep the CSV order. `top_n` keeps only the N largest categories.
+3.  **Output JSON:**
+    *   **Success:** `{{ "visualization_type": "bar", "chart_spec": {{ "chart_type": "bar", "x": "regione_residenza", "y": "numero", "hue": null, "aggregation": "none", "sort": "desc", "top_n": null, "stacked": false, "title": "Chart Title", "x_label": "X-Axis Label", "y_label": "Y-Axis Label" }}, "description": "Brief description of the chart and any adaptations made." }}`
+    *   **Data unsuitable (Failure):** `{{ "visualization_type": "none", "plot_parameters": null, "description": "Reason (e.g., 'Data unsuitable for X plot because Y.').", "plot_path": null }}`
+
+**Adaptation Principle:** If the exact requested visualization isn't possible with the provided data, specify the most relevant alternative chart and explain this adaptation in your JSON "description". Only if no useful chart can be made should you output the failure JSON.
 
 **Output Rules:**
 *   Your ENTIRE output MUST be a single, valid JSON string. No surrounding text or markdown.
 *   All JSON keys and string values MUST use double quotes.
-*   Ensure special characters within JSON string values (like in the description) are correctly escaped (e.g., `\\"` for internal quotes, `\\\\n` for newlines).
+*   Ensure special characters within JSON string values (like in the description) are correctly escaped (e.g., `\\"` for internal quotes).
 """,
             backstory=f"""
 I am an expert Data Visualization Creator.
 
 **Core Expertise:**
-*   Expert in Python visualization. I am a master in generating clear and informative visualization libraries like Matplotlib and Seaborn.
-*   I have a deep understanding of data visualization principles, including color theory, chart types, and effective communication through visual means.
+*   I have a deep understanding of data visualization principles, chart types, and effective communication through visual means.
 *   Deep understanding of json files and correcting formatting.
-*   Skillfully identifying most relevant plot based on query.
-*   Performing complex visualizations to inform users about the analysis performed by the analyst.
-*   Preparing clear machine-readable JSON to translate my plots specifically tailored for downstream reporting tasks.
+*   Skillfully identifying most relevant chart based on query.
 
 My process is:
-1. I receive a visualization request and raw CSV data string.
-2. I design the plot and its parameters (title, labels), after carefully analyzing both request and CSV string.
-3. I write Python (Matplotlib/Seaborn) code that expects a pre-parsed DataFrame (df_plot_data), 
-    a plot_params dictionary, and a plot_path_to_save variable.
-4. I then instruct my 'Python Plotting Tool' to:
-    a. Parse the raw CSV data string I provide into the df_plot_data DataFrame.
-    b. Execute my Python code with df_plot_data, plot_params, and plot_path_to_save in scope.
-    c. Save the plot as an image file.
-5. Based on the tool's result (a file path or an error), I construct a final JSON, by being careful about formatting. 
-    If successful, this JSON includes the chart type, plot parameters, a description, and the file path to the saved image. 
-    If not, it explains the failure.
+1. I receive a visualization request and the Analyst's CSV data.
+2. I choose the chart type, the columns for x, y and hue, how rows are aggregated and sorted, a title and axis labels.
+3. I write them as a compact chart spec JSON; the application renders it deterministically, so I never write plotting code.
+4. If no useful chart can be made, my JSON explains why.
 
-I am meticulous about JSON formatting and providing all necessary components for successful visualization.
+I am meticulous about JSON formatting and about using the CSV column names exactly.
 """,
             verbose=1,
             allow_delegation=False, 
             llm=llm,
-            tools=[python_plotting_tool]
+            tools=[]
         )
 
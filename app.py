@@ -4,6 +4,7 @@ import os
 import sys
 import json
 import base64
+import uuid
 
 # Dynamically determine project root and add to sys.path
 PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__)))
@@ -12,20 +13,21 @@ if PROJECT_ROOT not in sys.path:
 
 #Import Config should be done at top level, not inside IF - Load .env at start
 from utils.config import config
-from langchain_community.chat_models import ChatLiteLLM
+from utils.data_cache import enable_copy_on_write
+
+# The app serves every session from the same cached frames; with copy-on-write they are
+# handed out as cheap shallow copies that an analysis cannot modify in place.
+enable_copy_on_write()
 
-from crewai import Crew, Process
 from pydantic import BaseModel, Field
 from typing import List, Dict, Optional, Any
-from agents.reporter import ReporterAgent
-from agents.analyst import DataAnalystAgent
-from agents.visualizer import DataVisualizerAgent
-from tasks.final_task import create_final_reporting_task
-from tasks.analyst_tasks import create_analyst_task
-from tasks.visualizer_tasks import create_visualization_task
-from tools.analysis_tool import DataAnalysisTool
-from tools.visualization_tool import python_plotting_tool
-from tools.reporter_tool import reporter_tool
+from crew import serve_without_crew
+from tools.reporter_tool import reporter_tool, render_report, render_analyst_findings, render_visualization
+from utils.sandbox_pool import sandbox_pool
+from utils.fast_path import fast_path_router
+from utils.render_service import render_service
+from utils.progress import install_stream_listener
+from utils.job_queue import JobRejected, job_queue
 
 #MEMORY attempts
 from crewai.memory.short_term.short_term_memory import ShortTermMemory
@@ -57,6 +59,12 @@ from crewai.memory.external.external_memory import ExternalMemory
 
 AVAILABLE_DATA_PATHS = config.AVAILABLE_DATA_PATHS
 
+# Start the analysis sandbox workers once per process, not on the first query.
+if config.SANDBOX_WORKERS > 0:
+    sandbox_pool.start()
+if config.LLM_STREAM:
+    install_stream_listener()
+
 st.set_page_config(page_title="Fantastic Crew Analyzer", layout="wide")
 st.title("Our Fantastic Crew: Mavi, Ale, Eli's crew")
 st.markdown("""
@@ -69,92 +77,111 @@ if 'crew_result' not in st.session_state:
     st.session_state.crew_result = None
 if 'query_processed' not in st.session_state:
     st.session_state.query_processed = False
+if 'user_id' not in st.session_state:
+    st.session_state.user_id = uuid.uuid4().hex
+if 'job_id' not in st.session_state:
+    st.session_state.job_id = None
 
 # 2. Input user query
 with st.form("query_form"):
     query = st.text_input("Cosa vuoi sapere?:", key="user_query_input")
     submit_button = st.form_submit_button("Let's goooo!")
 
+# Templated aggregate questions are answered straight from the cube; repeated questions
+# (same normalized query, same data version) come from the result cache. Both skip the crew.
+served_result = None
+served_message = None
 if submit_button and query:
+    served_result, source = serve_without_crew(query)
+    if source == "fast_path":
+        served_message = "This question was answered directly from the pre-aggregated data, without the crew."
+    elif served_result is not None:
+        served_message = "This question was already answered on the current data; the stored report is shown above."
+if served_result is not None:
     st.session_state.query_processed = True
-    st.session_state.crew_result = None 
-
-    # --- LLM Initialization ---
+    st.session_state.job_id = None
+    st.markdown("---")
+    render_report(served_result.analyst_output, served_result.visualizer_output, served_result.plot_image)
+    st.session_state.crew_result = served_message
+if config.FAST_PATH_ENABLED and fast_path_router.total:
+    st.caption(f"Fast path: {fast_path_router.fraction_served():.0%} of {fast_path_router.total} queries answered without the crew.")
+render_metrics = render_service.metrics()
+if render_metrics["renders"]:
+    st.caption(f"Chart rendering: p50 {render_metrics['latency_ms_p50']:.0f} ms, p95 {render_metrics['latency_ms_p95']:.0f} ms over {render_metrics['renders']} renders.")
+
+# The crew runs on the background job queue; the page polls the job and renders each stage
+# as it lands, so a long crew run does not hold the script (or other sessions) hostage.
+if submit_button and query and served_result is None:
+    st.session_state.query_processed = True
+    st.session_state.crew_result = None
     try:
-        common_llm = ChatLiteLLM(
-            model="gemini/gemini-1.5-flash",
-            api_key=config.GOOGLE_API_KEY, 
-            temperature=0.1, 
-            verbose=True 
+        st.session_state.job_id = job_queue.submit(query, st.session_state.user_id)
+    except JobRejected as e:
+        st.warning(str(e))
+
+
+def show_job_result(job):
+    """Renders a finished job's report from its stored outputs, with its queue and latency timings."""
+    result = job.result
+    render_report(result.analyst_output, result.visualizer_output, result.plot_image)
+    timings = job.progress.metrics()
+    if timings["time_to_first_content_s"] is not None:
+        first_token = timings["time_to_first_token_s"]
+        st.caption(
+            f"Waited {timings['queue_wait_s']:.1f} s in the queue. "
+            f"First content after {timings['time_to_first_content_s']:.1f} s"
+            + (f" (first streamed token after {first_token:.1f} s)" if first_token is not None else "")
+            + f", total {timings['total_s']:.1f} s."
         )
-    except Exception as e:
-        st.error(f"Failed to initialize LLM. Please check your API key and configuration: {e}")
-        st.stop() # Stop execution if LLM fails
 
 
-    # --- 3. Instantiate Agents (Pass LLM and Tools) ---
-    try:
-        analyst_agent = DataAnalystAgent() 
-
-        visualizer_agent = DataVisualizerAgent() 
-
-        reporter_agent = ReporterAgent()
-    except Exception as e:
-        st.error(f"Error instantiating agents: {e}")
-        st.stop()
-
-    # --- 4. Create Tasks ---
-    analyst_output_context_placeholder = "{{analyst_data_processing_task.output}}"
-    visualizer_output_context_placeholder = "{{visualization_code_generation_task.output}}"
-
-    # Task for Data Analyst
-    analyst_data_processing_task = create_analyst_task(analyst_agent = analyst_agent,query=query)
-
-    # Task for Data Visualizer (to generate code)
-    visualization_code_generation_task = create_visualization_task(
-        visualizer_agent=visualizer_agent,
-        user_query_for_visualization=query, 
-        analyst_task_output_context_name=analyst_output_context_placeholder
-    )
-    # Set context: Visualizer task needs output from Analyst task
-    visualization_code_generation_task.context = [analyst_data_processing_task]
-
-
-    # Task for Final Reporter (to use Streamlit tool)
-    final_report_rendering_task = create_final_reporting_task(
-        reporter_agent=reporter_agent,
-        original_user_query=query,
-        analyst_findings_context_name=analyst_output_context_placeholder,
-        visualizer_json_context_name=visualizer_output_context_placeholder
-    )
-    # Set context: Reporter task needs output from Analyst AND Visualizer tasks
-    final_report_rendering_task.context = [analyst_data_processing_task, visualization_code_generation_task]
-
-
-    # --- 5. Orchestrate the Crew ---
-
-    crew = Crew(
-        agents=[analyst_agent, visualizer_agent, reporter_agent], 
-        tasks=[
-            analyst_data_processing_task,
-            visualization_code_generation_task,
-            final_report_rendering_task
-        ],
-        process=Process.sequential, 
-        verbose=1
-    )
+@st.fragment(run_every=config.JOB_POLL_SECONDS)
+def poll_job():
+    job = job_queue.get(st.session_state.job_id)
+    if job is None:
+        st.session_state.job_id = None
+        st.warning("This question's result has expired; please ask again.")
+        return
+    if not job.active:
+        # Leave the polling fragment: the full script renders the final report once.
+        st.rerun()
+    st.markdown("---")
+    st.subheader("Crew Processing Log & Final Summary:")
+    if job.status == "queued":
+        st.info(f"Your question is number {job_queue.position(job.id)} in the queue…")
+        return
+    outputs = job.progress.outputs
+    if outputs.get("analyst") is not None:
+        render_analyst_findings(outputs["analyst"])
+    if outputs.get("visualizer") is not None:
+        # Rendered charts come from the plot cache, so redrawing on every poll is cheap.
+        render_visualization(outputs["visualizer"], analyst_findings=outputs.get("analyst"))
+    with st.spinner("The crew is processing your request... Please wait."):
+        streamed = job.progress.streamed_text()
+        if streamed:
+            st.markdown(f"*The crew is working…*\n\n{streamed[-3000:]}")
 
-    # --- 6. Run the crew and display the results ---
 
+job = job_queue.get(st.session_state.job_id) if st.session_state.job_id else None
+if job is not None and job.active:
+    poll_job()
+elif job is not None:
     st.markdown("---")
     st.subheader("Crew Processing Log & Final Summary:")
-    with st.spinner("The crew is processing your request... Please wait."):
-        try:
-            result = crew.kickoff()
-            st.session_state.crew_result = result 
-        except Exception as e:
-            st.error(f"An error occurred during crew execution: {e}")
-            st.session_state.crew_result = f"Crew execution failed: {e}"
+    if job.status == "done":
+        show_job_result(job)
+        st.session_state.crew_result = "The crew has answered your question."
+    else:
+        st.error(f"An error occurred during crew execution: {job.error}")
+        st.session_state.crew_result = f"Crew execution failed: {job.error}"
+job_metrics = job_queue.metrics()
+if job_metrics["completed"] or job_metrics["queue_depth"] or job_metrics["running"]:
+    st.caption(
+        f"Crew jobs: {job_metrics['running']} running, {job_metrics['queue_depth']} queued"
+        + (f", queue wait p50 {job_metrics['wait_s_p50']:.1f} s / p95 {job_metrics['wait_s_p95']:.1f} s"
+           if job_metrics["wait_s_p50"] is not None else "")
+        + f", {job_metrics['coalesced']} coalesced."
+    )
 
 # Display the final textual summary from the reporter agent
 if st.session_state.query_processed and st.session_state.crew_result:
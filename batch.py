@@ -0,0 +1,178 @@
+# batch.py
+"""
+Runs a file of queries through the analyst/visualizer(/reporter) pipeline without Streamlit
+and writes one JSONL record per query, for nightly report generation and load testing.
+
+    python batch.py "Agents Evaluation.xlsx" -o results.jsonl --parallel 4
+
+Queries are read from .xlsx/.csv (the `Query` column, or the first one), .jsonl (`query`
+field) or plain text (one per line). "ITA " / "ENG " prefixes, as in the evaluation
+spreadsheet, are stripped and kept as the record's language.
+"""
+import argparse
+import hashlib
+import json
+import os
+import re
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+PROJECT_ROOT = os.path.abspath(os.path.dirname(__file__))
+if PROJECT_ROOT not in sys.path:
+    sys.path.append(PROJECT_ROOT)
+
+from utils.config import config
+from utils.progress import PipelineProgress, install_stream_listener
+from utils.tracing import tracer
+
+LANGUAGE_PREFIX = re.compile(r"^(ITA|ENG)\s+", re.IGNORECASE)
+
+
+def load_queries(path: str) -> list:
+    """Returns [{"query": ..., "language": ...}] from a spreadsheet, CSV, JSONL or text file."""
+    extension = os.path.splitext(path)[1].lower()
+    if extension in (".xlsx", ".xls", ".csv"):
+        table = pd.read_csv(path) if extension == ".csv" else pd.read_excel(path)
+        column = next((c for c in table.columns if str(c).strip().lower() in ("query", "queries")), table.columns[0])
+        table = table.dropna(subset=[column])
+        raw = table[column].astype(str).tolist()
+        # The evaluation spreadsheet's "Time" column: response times measured by hand.
+        time_column = next((c for c in table.columns if str(c).strip().lower() == "time"), None)
+        reference_times = table[time_column].tolist() if time_column is not None else [None] * len(raw)
+    elif extension == ".jsonl":
+        with open(path, encoding="utf-8") as f:
+            raw = [json.loads(line)["query"] for line in f if line.strip()]
+    else:
+        with open(path, encoding="utf-8") as f:
+            raw = [line for line in f]
+    if extension not in (".xlsx", ".xls", ".csv"):
+        reference_times = [None] * len(raw)
+    queries = []
+    for text, reference_time in zip(raw, reference_times):
+        text = text.strip()
+        if not text:
+            continue
+        match = LANGUAGE_PREFIX.match(text)
+        item = {
+            "query": text[match.end():].strip() if match else text,
+            "language": match.group(1).upper() if match else None,
+        }
+        if pd.notna(reference_time):
+            item["reference_time_s"] = float(reference_time)
+        queries.append(item)
+    return queries
+
+
+def run_one(index: int, item: dict, plots_dir: str, use_cache: bool = True) -> dict:
+    """Answers one query and returns its JSONL record; failures are recorded, not raised."""
+    from crew import DataAnalysisCrew, serve_without_crew
+
+    query = item["query"]
+    record = {"index": index, "query": query, "language": item.get("language"),
+              "started_at": datetime.now(timezone.utc).isoformat()}
+    with tracer.span("query", "query", query=query, batch_index=index) as span:
+        record["trace_id"] = span.trace_id
+        progress = PipelineProgress()
+        start = time.perf_counter()
+        try:
+            result, source = serve_without_crew(query) if use_cache else (None, None)
+            token_usage = None
+            if result is None:
+                crew = DataAnalysisCrew(query, progress)
+                result, source = crew.run(), "crew"
+                token_usage = crew.token_usage
+        except Exception as e:
+            span.fail(f"{type(e).__name__}: {e}")
+            record.update(status="error", error=f"{type(e).__name__}: {e}",
+                          timings={**progress.metrics(), "total_s": time.perf_counter() - start})
+            return record
+
+        plot_path = None
+        if result.plot_image:
+            os.makedirs(plots_dir, exist_ok=True)
+            digest = hashlib.sha256(result.plot_image).hexdigest()[:12]
+            plot_path = os.path.join(plots_dir, f"{index:04d}_{digest}.png")
+            with open(plot_path, "wb") as f:
+                f.write(result.plot_image)
+        timings = progress.metrics()
+        timings["total_s"] = time.perf_counter() - start
+        record.update(
+            status="ok",
+            source=source,
+            analyst_output=result.analyst_output,
+            visualizer_output=result.visualizer_output,
+            plot_path=plot_path,
+            timings=timings,
+            token_usage=token_usage,
+        )
+        return record
+
+
+def run_batch(queries: list, output_path: str, parallel: int, plots_dir: str, use_cache: bool = True) -> list:
+    """Runs the queries on `parallel` workers, appending each record to `output_path` as it finishes."""
+    if config.SANDBOX_WORKERS > 0:
+        from utils.sandbox_pool import sandbox_pool
+        sandbox_pool.start()
+    if config.LLM_STREAM:
+        install_stream_listener()
+
+    records = []
+    with open(output_path, "w", encoding="utf-8") as out, ThreadPoolExecutor(parallel, thread_name_prefix="batch") as pool:
+        futures = [pool.submit(run_one, i, item, plots_dir, use_cache) for i, item in enumerate(queries)]
+        for future in as_completed(futures):
+            record = future.result()
+            out.write(json.dumps(record, ensure_ascii=False) + "\n")
+            out.flush()
+            records.append(record)
+            print(f"[{len(records)}/{len(queries)}] {record['status']} {record['timings']['total_s']:.1f}s  {record['query'][:70]}")
+    return records
+
+
+def summarize(records: list, wall_seconds: float) -> dict:
+    totals = np.array([r["timings"]["total_s"] for r in records if r["status"] == "ok"])
+    tokens = sum((r.get("token_usage") or {}).get("total_tokens", 0) for r in records)
+    sources = {}
+    for r in records:
+        if r["status"] == "ok":
+            sources[r["source"]] = sources.get(r["source"], 0) + 1
+    return {
+        "queries": len(records),
+        "llm_mode": config.LLM_MODE,
+        "errors": sum(r["status"] == "error" for r in records),
+        "sources": sources,
+        "wall_s": wall_seconds,
+        "throughput_qpm": len(records) / wall_seconds * 60 if wall_seconds else None,
+        "latency_s_p50": float(np.percentile(totals, 50)) if len(totals) else None,
+        "latency_s_p95": float(np.percentile(totals, 95)) if len(totals) else None,
+        "total_tokens": tokens,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Answer a file of queries headlessly and write JSONL results.")
+    parser.add_argument("queries", help="Queries file: .xlsx/.csv (Query column), .jsonl (query field) or text")
+    parser.add_argument("-o", "--output", default="batch_results.jsonl", help="JSONL output path")
+    parser.add_argument("-p", "--parallel", type=int, default=config.JOB_WORKERS, help="Queries run at the same time")
+    parser.add_argument("--plots-dir", default=None, help="Where plot PNGs are written (default: <output>_plots)")
+    parser.add_argument("--limit", type=int, default=None, help="Only run the first N queries")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="Always run the crew (skip fast path and result caches), e.g. for load testing")
+    args = parser.parse_args(argv)
+
+    queries = load_queries(args.queries)[:args.limit]
+    plots_dir = args.plots_dir or os.path.splitext(args.output)[0] + "_plots"
+    start = time.perf_counter()
+    records = run_batch(queries, args.output, max(1, args.parallel), plots_dir, use_cache=not args.no_cache)
+    summary = summarize(records, time.perf_counter() - start)
+    tracer.flush()
+    print(json.dumps(summary, indent=2))
+    return 1 if summary["errors"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,154 @@
+# benchmarks/data_layer.py
+"""
+Micro-benchmarks of the data operations behind the analyst's code, on the real datasets
+and on synthetic 10x / 100x copies (as if monthly extracts had accumulated).
+
+    python -m benchmarks.data_layer                  # scales 1, 10, 100
+    python -m benchmarks.data_layer --scales 1 10 --repeat 5
+
+Each operation is timed --repeat times per scale; the best and median times are reported
+with the slowdown relative to the smallest scale.
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if PROJECT_ROOT not in sys.path:
+    sys.path.append(PROJECT_ROOT)
+
+from benchmarks.pipeline import RESULTS_DIR, git_revision
+from utils.chart_spec import ChartSpec, render_chart_png
+from utils.columnar_store import load_compiled, write_arrow
+from utils.config import config
+from utils.data_cache import data_version, dataset_name
+
+# The breakdown each dataset is most often asked for, summed over its measure.
+GROUPBYS = {
+    "AMMINISTRATI": (["regione_residenza", "modalita_autenticazione"], "numero"),
+    "PENDOLARISMO": (["provincia_della_sede", "fascia di distanza"], "numero"),
+    "REDDITO": (["fascia_di_reddito", "sesso"], "numerosita"),
+    "STIPENDI": (["modalita_pagamento", "fascia di età"], "numero"),
+}
+CHART = ChartSpec(chart_type="bar", x="regione_residenza", y="numero", hue="modalita_autenticazione",
+                  aggregation="sum", sort="desc", title="Amministrati per regione")
+
+
+def scale_frame(df: pd.DataFrame, factor: int, measure: str, seed: int = 0) -> pd.DataFrame:
+    """Stacks `factor` copies of df with jittered counts, like `factor` monthly extracts."""
+    if factor == 1:
+        return df
+    scaled = pd.concat([df] * factor, ignore_index=True)
+    rng = np.random.default_rng(seed)
+    scaled[measure] = rng.poisson(scaled[measure].clip(lower=0).to_numpy()).astype(scaled[measure].dtype)
+    return scaled
+
+
+def timed(function, repeat: int) -> dict:
+    times = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        times.append(time.perf_counter() - start)
+    return {"best_s": min(times), "median_s": statistics.median(times), "result": result}
+
+
+def prepare_scale(datasets: dict, factor: int, workdir: str) -> dict:
+    """Writes each dataset at `factor` scale as CSV and compiled Arrow; returns their paths."""
+    paths = {}
+    # Scaled copies are reused between runs until the source data changes.
+    directory = os.path.join(workdir, f"{data_version()}_x{factor}")
+    for name, df in datasets.items():
+        csv_path = os.path.join(directory, f"{name}.csv")
+        arrow_path = os.path.join(directory, f"{name}.arrow")
+        if not os.path.exists(arrow_path):
+            os.makedirs(directory, exist_ok=True)
+            scaled = scale_frame(df, factor, measure=GROUPBYS[name][1])
+            scaled.to_csv(csv_path, index=False)
+            write_arrow(scaled, arrow_path)
+        paths[name] = (csv_path, arrow_path)
+    return paths
+
+
+def weighted_merge(stipendi: pd.DataFrame, pendolarismo: pd.DataFrame) -> pd.DataFrame:
+    """Employees paid vs commuters per amministrazione: aggregate each side, then join."""
+    paid = stipendi.groupby("amministrazione", observed=True)["numero"].sum().rename("stipendiati")
+    commuting = pendolarismo.groupby("amministrazione", observed=True)["numero"].sum().rename("pendolari")
+    return pd.concat([paid, commuting], axis=1, join="inner").reset_index()
+
+
+def run_scale(factor: int, paths: dict, repeat: int) -> list:
+    rows = []
+
+    def add(operation, dataset, function, **extra):
+        timing = timed(function, repeat)
+        result = timing.pop("result")
+        rows.append({"scale": factor, "operation": operation, "dataset": dataset, **timing,
+                     "rows": len(result) if isinstance(result, (pd.DataFrame, pd.Series)) else None, **extra})
+        return result
+
+    frames, compiled = {}, {}
+    for name, (csv_path, arrow_path) in paths.items():
+        frames[name] = add("load_csv", name, lambda: pd.read_csv(csv_path), mb=os.path.getsize(csv_path) / 2**20)
+        compiled[name] = add("load_compiled", name, lambda: load_compiled(arrow_path, categorical=True))
+    for name, (by, measure) in GROUPBYS.items():
+        add("groupby_sum", name, lambda: frames[name].groupby(by, observed=True)[measure].sum())
+        add("groupby_sum_categorical", name, lambda: compiled[name].groupby(by, observed=True)[measure].sum())
+        add("groupby_share", name, lambda: frames[name].groupby(by, observed=True)[measure].sum()
+            .groupby(level=0, observed=True).transform(lambda s: s / s.sum()))
+    raw_rows = int((frames["STIPENDI"]["amministrazione"].value_counts()
+                    * frames["PENDOLARISMO"]["amministrazione"].value_counts()).sum())
+    add("merge_amministrazione", "STIPENDI+PENDOLARISMO",
+        lambda: weighted_merge(frames["STIPENDI"], frames["PENDOLARISMO"]), raw_merge_rows=raw_rows)
+    add("merge_amministrazione_categorical", "STIPENDI+PENDOLARISMO",
+        lambda: weighted_merge(compiled["STIPENDI"], compiled["PENDOLARISMO"]))
+    # What the render service runs for a visualizer chart spec, including its aggregation.
+    add("render_chart_png", "AMMINISTRATI", lambda: render_chart_png(CHART, compiled["AMMINISTRATI"]))
+    return rows
+
+
+def print_table(rows: list):
+    smallest = min(row["scale"] for row in rows)
+    baseline = {(r["operation"], r["dataset"]): r["best_s"] for r in rows if r["scale"] == smallest}
+    print(f"{'operation':34} {'dataset':22} {'scale':>5} {'rows':>9} {'best ms':>9} {'median ms':>10} {'vs x' + str(smallest):>7}")
+    for row in sorted(rows, key=lambda r: (r["operation"], r["dataset"], r["scale"])):
+        ratio = row["best_s"] / baseline[(row["operation"], row["dataset"])]
+        print(f"{row['operation']:34} {row['dataset']:22} {row['scale']:>5} {row['rows'] or '':>9} "
+              f"{row['best_s'] * 1000:9.1f} {row['median_s'] * 1000:10.1f} {ratio:6.1f}x")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark data loading, groupbys, merges and rendering.")
+    parser.add_argument("--scales", type=int, nargs="+", default=[1, 10, 100])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--workdir", default=os.path.join(config.CACHE_DIR, "benchmarks"),
+                        help="Where the scaled copies of the datasets are written")
+    parser.add_argument("--output", default=None, help="Results JSON (default: benchmarks/results/data_<commit>_<time>.json)")
+    args = parser.parse_args(argv)
+
+    datasets = {dataset_name(path): pd.read_csv(path) for path in config.AVAILABLE_DATA_PATHS.values()}
+    rows = []
+    for factor in sorted(args.scales):
+        print(f"Scale x{factor}...")
+        rows += run_scale(factor, prepare_scale(datasets, factor, args.workdir), args.repeat)
+    print_table(rows)
+
+    revision = git_revision()
+    stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+    output = args.output or os.path.join(RESULTS_DIR, f"data_{revision['commit'] or 'nogit'}_{stamp}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump({**revision, "timestamp": stamp, "repeat": args.repeat, "results": rows}, f, indent=2)
+    print(f"Saved {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,224 @@
+# benchmarks/pipeline.py
+"""
+End-to-end benchmark over the evaluation spreadsheet's queries.
+
+    python -m benchmarks.pipeline                          # live model, one query at a time
+    python -m benchmarks.pipeline --llm-mode record        # live, and record a cassette
+    python -m benchmarks.pipeline --llm-mode replay        # offline, from the cassette
+    python -m benchmarks.pipeline --compare benchmarks/results/<earlier>.json
+
+Every query runs through the full crew and the per-stage numbers come from its trace. The fast
+path and the caches are bypassed, and answers are not written to the result or semantic caches,
+so a later query in the run (or a later run) is never served from an earlier one; --use-cache
+measures the warm path instead. Results are saved as JSON named after the commit,
+so two commits can be compared.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if PROJECT_ROOT not in sys.path:
+    sys.path.append(PROJECT_ROOT)
+
+DEFAULT_QUERIES = os.path.join(PROJECT_ROOT, "Agents Evaluation.xlsx")
+RESULTS_DIR = os.path.join(PROJECT_ROOT, "benchmarks", "results")
+
+# Metrics where a higher value is a regression, compared by --compare.
+COMPARED_METRICS = (
+    "latency_s.p50", "latency_s.p95", "time_to_first_content_s.p50", "llm_calls_per_query.mean",
+    "tokens_per_query.mean", "tool_time_s.p50", "tool_time_s.p95", "render_time_s.p50", "render_time_s.p95",
+)
+
+
+def distribution(values) -> dict:
+    values = np.array([v for v in values if v is not None], dtype=float)
+    if not len(values):
+        return {"n": 0, "mean": None, "p50": None, "p95": None, "max": None}
+    return {
+        "n": int(len(values)),
+        "mean": float(values.mean()),
+        "p50": float(np.percentile(values, 50)),
+        "p95": float(np.percentile(values, 95)),
+        "max": float(values.max()),
+    }
+
+
+def git_revision() -> dict:
+    def git(*args):
+        try:
+            return subprocess.run(["git", *args], cwd=PROJECT_ROOT, capture_output=True, text=True,
+                                  check=True).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
+    return {"commit": git("rev-parse", "--short", "HEAD"), "dirty": bool(git("status", "--porcelain", "-uno"))}
+
+
+def per_query_metrics(record: dict, spans: list) -> dict:
+    """Summarizes one query's trace: stage latencies, LLM calls, tokens, tool and render time."""
+    root = next((s for s in spans if s["parent_id"] is None), None)
+    counts = root["counts"] if root is not None else {}
+    return {
+        "index": record["index"],
+        "query": record["query"],
+        "language": record.get("language"),
+        "status": record["status"],
+        "source": record.get("source"),
+        "latency_s": record["timings"]["total_s"],
+        "time_to_first_content_s": record["timings"].get("time_to_first_content_s"),
+        "stages_s": {s["name"]: s["duration_s"] for s in spans if s["kind"] == "task"},
+        "llm_calls": counts.get("llm_calls", 0),
+        "llm_cache_hits": counts.get("cache_hits", 0),
+        "tokens": counts.get("prompt_tokens", 0) + counts.get("completion_tokens", 0),
+        "tool_calls": counts.get("tool_calls", 0),
+        "retries": counts.get("retries", 0),
+        "tool_time_s": sum(s["duration_s"] for s in spans if s["kind"] == "tool"),
+        "render_time_s": sum(s["duration_s"] for s in spans if s["kind"] == "render"),
+    }
+
+
+def aggregate(queries: list) -> dict:
+    ok = [q for q in queries if q["status"] == "ok"]
+    stages = sorted({name for q in ok for name in q["stages_s"]})
+    return {
+        "queries": len(queries),
+        "errors": len(queries) - len(ok),
+        "latency_s": distribution(q["latency_s"] for q in ok),
+        "time_to_first_content_s": distribution(q["time_to_first_content_s"] for q in ok),
+        "stage_latency_s": {name: distribution(q["stages_s"].get(name) for q in ok) for name in stages},
+        "llm_calls_per_query": distribution(q["llm_calls"] for q in ok),
+        "tokens_per_query": distribution(q["tokens"] for q in ok),
+        "retries_per_query": distribution(q["retries"] for q in ok),
+        "tool_time_s": distribution(q["tool_time_s"] for q in ok),
+        "render_time_s": distribution(q["render_time_s"] for q in ok),
+    }
+
+
+def lookup(metrics: dict, dotted: str):
+    for part in dotted.split("."):
+        metrics = metrics.get(part) if isinstance(metrics, dict) else None
+    return metrics
+
+
+def compare(baseline: dict, current: dict, tolerance: float) -> list:
+    """Returns (metric, baseline, current, change, regressed) rows for COMPARED_METRICS and every stage."""
+    names = list(COMPARED_METRICS) + [
+        f"stage_latency_s.{stage}.p50" for stage in current["metrics"]["stage_latency_s"]
+    ]
+    rows = []
+    for name in names:
+        before, after = lookup(baseline["metrics"], name), lookup(current["metrics"], name)
+        if before is None or after is None:
+            continue
+        change = (after - before) / before if before else 0.0
+        rows.append((name, before, after, change, change > tolerance))
+    return rows
+
+
+def print_report(result: dict):
+    metrics = result["metrics"]
+    print(f"\n{metrics['queries']} queries, {metrics['errors']} errors, LLM mode {result['llm_mode']}")
+    print(f"{'metric':42} {'p50':>9} {'p95':>9} {'mean':>9}")
+    rows = [("end-to-end latency (s)", metrics["latency_s"]),
+            ("time to first content (s)", metrics["time_to_first_content_s"])]
+    rows += [(f"  {stage} (s)", values) for stage, values in metrics["stage_latency_s"].items()]
+    rows += [("LLM calls / query", metrics["llm_calls_per_query"]),
+             ("tokens / query", metrics["tokens_per_query"]),
+             ("tool execution / query (s)", metrics["tool_time_s"]),
+             ("plot rendering / query (s)", metrics["render_time_s"])]
+    for label, values in rows:
+        cells = [f"{values[k]:9.2f}" if values[k] is not None else f"{'-':>9}" for k in ("p50", "p95", "mean")]
+        print(f"{label:42} {' '.join(cells)}")
+    if result.get("reference_latency_s"):
+        print(f"Spreadsheet (hand-timed) mean latency: {result['reference_latency_s']:.1f} s")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the crew on the evaluation queries.")
+    parser.add_argument("--queries", default=DEFAULT_QUERIES, help="Queries file (see batch.py)")
+    parser.add_argument("--llm-mode", choices=("live", "record", "replay"), default=None,
+                        help="Overrides LLM_MODE; 'replay' runs offline from the cassette")
+    parser.add_argument("--replay-latency-scale", type=float, default=None,
+                        help="In replay, wait this multiple of the recorded LLM latency")
+    parser.add_argument("--language", choices=("ITA", "ENG"), default=None, help="Only queries in this language")
+    parser.add_argument("--limit", type=int, default=None)
+    parser.add_argument("--parallel", type=int, default=1, help="Queries run at the same time (1 = isolated latency)")
+    parser.add_argument("--use-cache", action="store_true", help="Keep the LLM response cache and result caches on")
+    parser.add_argument("--output", default=None, help="Results JSON (default: benchmarks/results/<commit>_<time>.json)")
+    parser.add_argument("--compare", default=None, help="Earlier results JSON to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.10, help="Relative increase reported as a regression")
+    args = parser.parse_args(argv)
+
+    # Settings are read when utils.config is imported, so they are applied first.
+    if args.llm_mode:
+        os.environ["LLM_MODE"] = args.llm_mode
+    if args.replay_latency_scale is not None:
+        os.environ["LLM_REPLAY_LATENCY_SCALE"] = str(args.replay_latency_scale)
+    if not args.use_cache:
+        os.environ["LLM_CACHE_ENABLED"] = "false"
+        os.environ["RESULT_CACHE_ENABLED"] = "false"
+        os.environ["SEMANTIC_CACHE_ENABLED"] = "false"
+    os.environ["TRACING_ENABLED"] = "true"
+
+    from batch import load_queries, run_batch
+    from utils.config import config
+    from utils.tracing import tracer
+
+    queries = [q for q in load_queries(args.queries) if args.language is None or q["language"] == args.language]
+    queries = queries[:args.limit]
+    revision = git_revision()
+    stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+    output = args.output or os.path.join(RESULTS_DIR, f"{revision['commit'] or 'nogit'}_{stamp}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    records_path = os.path.splitext(output)[0] + ".records.jsonl"
+
+    start = time.perf_counter()
+    records = run_batch(queries, records_path, max(1, args.parallel), os.path.splitext(output)[0] + "_plots",
+                        use_cache=args.use_cache)
+    wall = time.perf_counter() - start
+    tracer.flush()
+    spans_by_trace = {}
+    for span in tracer.load(limit=200000):
+        spans_by_trace.setdefault(span["trace_id"], []).append(span)
+    per_query = sorted(
+        (per_query_metrics(record, spans_by_trace.get(record.get("trace_id"), [])) for record in records),
+        key=lambda q: q["index"]
+    )
+    reference = [q["reference_time_s"] for q in queries if q.get("reference_time_s") is not None]
+    result = {
+        **revision,
+        "timestamp": stamp,
+        "llm_mode": config.LLM_MODE,
+        "model": config.LLM_MODEL,
+        "parallel": args.parallel,
+        "use_cache": args.use_cache,
+        "wall_s": wall,
+        "reference_latency_s": float(np.mean(reference)) if reference else None,
+        "metrics": aggregate(per_query),
+        "per_query": per_query,
+    }
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(result, f, indent=2, ensure_ascii=False)
+    print_report(result)
+    print(f"Saved {output}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        print(f"\nCompared with {baseline.get('commit')} ({baseline.get('timestamp')}, {baseline.get('llm_mode')}):")
+        regressions = 0
+        for name, before, after, change, regressed in compare(baseline, result, args.tolerance):
+            regressions += regressed
+            print(f"{name:42} {before:9.2f} -> {after:9.2f}  {change:+7.1%}{'  REGRESSION' if regressed else ''}")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,232 +1,174 @@
 # crew.py
-from crewai import Agent, Crew, Process, Task
-from crewai.project import CrewBase, agent, crew, task
-from pydantic import BaseModel, Field
-from typing import List, Dict, Optional, Any
-from langchain_community.chat_models import ChatLiteLLM
-from utils.config import config
-from utils.tool_registry import get_tools_for_task
-
-
-# Define Pydantic models for structured task outputs
-class AnalysisOutput(BaseModel):
-    summary: str = Field(description="A summary of the analysis findings")
-    insights: List[str] = Field(description="Key insights from the data analysis")
-    metrics: Dict[str, float] = Field(description="Important metrics calculated during analysis")
-    
-class VisualizationOutput(BaseModel):
-    chart_type: str = Field(description="Type of visualization created")
-    visualization_data: Dict = Field(description="Data used for visualization") 
-    description: str = Field(description="Description of what the visualization shows")
-    plot_path: Optional[str] = Field(description="Path to the saved visualization file if applicable")
-
-@CrewBase
-class DataAnalysisCrew:
-    """Data Analysis Crew for analyzing and visualizing data based on user queries."""
-    
-    agents_config = "config/agents.yaml"
-    tasks_config = "config/tasks.yaml"
-    
-    def _init_(self, query: str):
-        """Initialize the crew with a user query."""
-        self.query = query
-        self.llm = ChatLiteLLM(model="gemini/gemini-1.5-flash", api_key=config.GOOGLE_API_KEY, verbose=True)
-    
-    @agent
-    def frontman(self) -> Agent:
-        """The frontman agent coordinates the analysis and visualization."""
-        return Agent(
-            config=self.agents_config["frontman"],  # type: ignore[index]
-            llm=self.llm,
-            verbose=True
-        )
-    
-    @agent
-    def data_analyst(self) -> Agent:
-        """The data analyst agent analyzes the data."""
-        return Agent(
-            config=self.agents_config["data_analyst"],  # type: ignore[index]
-            llm=self.llm,
-            verbose=True,
-            tools=get_tools_for_task('analysis')  # Use the tool registry
-        )
-    
-    @agent
-    def data_visualizer(self) -> Agent:
-        """The data visualizer agent creates visualizations based on the analysis."""
-        return Agent(
-            config=self.agents_config["data_visualizer"],  # type: ignore[index]
-            llm=self.llm,
-            verbose=True,
-            tools=get_tools_for_task('visualization')  # Use the tool registry
-        )
-    
-    @task
-    def initial_task(self) -> Task:
-        """The initial task for the frontman agent."""
-        task = Task(
-            config=self.tasks_config["initial_task"],  # type: ignore[index]
-        )
-        # Set the agent for this task
-        task.agent = self.frontman()
-        return task
-    
-    @task
-    def analysis_task(self) -> Task:
-        """The analysis task for the data analyst agent."""
-        task = Task(
-            config=self.tasks_config["analysis_task"],  # type: ignore[index]
-        )
-        # Set the output_pydantic model
-        task.output_pydantic = AnalysisOutput
-        # Set the agent for this task
-        task.agent = self.data_analyst()
-        # Add tools explicitly
-        task.tools = get_tools_for_task('analysis')
-        return task
-    
-    @task
-    def visualization_task(self) -> Task:
-        """The visualization task for the data visualizer agent."""
-        task = Task(
-            config=self.tasks_config["visualization_task"],  # type: ignore[index]
-        )
-        # Set the output_pydantic model
-        task.output_pydantic = VisualizationOutput
-        # Set the agent for this task
-        task.agent = self.data_visualizer()
-        # Add tools explicitly
-        task.tools = get_tools_for_task('visualization')
-        # Add context - the visualization task depends on the analysis task
-        task.context = [self.analysis_task()]
-        return task
-    
-    @crew
-    def crew(self) -> Crew:
-        """Configure the crew to execute the tasks."""
-        return Crew(
-            agents=[
-                self.frontman(),
-                self.data_analyst(),
-                self.data_visualizer()
-            ],
-            tasks=[
-                self.initial_task(),
-                self.analysis_task(),
-                self.visualization_task()
-            ],
-            process=Process.sequential,
-            verbose=True
-        )
-from crewai import Agent, Crew, Process, Task
-from crewai.project import CrewBase, agent, crew, task
-from pydantic import BaseModel, Field
-from typing import List, Dict, Optional
-from langchain_community.chat_models import ChatLiteLLM
+from crewai import Crew, Process
+
+from agents.registry import agent_registry
+from tasks.analyst_tasks import create_analyst_task
+from tasks.final_task import create_final_reporting_task
+from tasks.visualizer_tasks import create_visualization_task
+from tools.reporter_tool import read_plot_image
 from utils.config import config
+from utils.fast_path import fast_path_router
+from utils.progress import PipelineProgress
+from utils.result_cache import QueryResult, result_cache
+from utils.semantic_cache import semantic_cache
+from utils.tracing import tracer
+from utils.viz_intent import no_visualization_json, requested_visualization, should_visualize
+
 
-# Define Pydantic models for structured task outputs
-class AnalysisOutput(BaseModel):
-    summary: str = Field(description="A summary of the analysis findings")
-    insights: List[str] = Field(description="Key insights from the data analysis")
-    metrics: Dict[str, float] = Field(description="Important metrics calculated during analysis")
-    
-class VisualizationOutput(BaseModel):
-    chart_type: str = Field(description="Type of visualization created")
-    visualization_data: Dict[str, Any] = Field(description="Data used for visualization") 
-    description: str = Field(description="Description of what the visualization shows")
-    plot_path: Optional[str] = Field(description="Path to the saved visualization file if applicable")
-
-@CrewBase
 class DataAnalysisCrew:
-    """Data Analysis Crew for analyzing and visualizing data based on user queries."""
-    
-    agents_config = "config/agents.yaml"
-    tasks_config = "config/tasks.yaml"
-    
-    def _init_(self, query: str):
-        """Initialize the crew with a user query."""
+    """
+    The analyst -> visualizer (-> reporter) crew for one query, runnable without Streamlit:
+    the app's job workers and the batch CLI both go through here.
+    """
+
+    analyst_output_context_placeholder = "{{analyst_data_processing_task.output}}"
+    visualizer_output_context_placeholder = "{{visualization_code_generation_task.output}}"
+
+    def __init__(self, query: str, progress: PipelineProgress = None):
         self.query = query
-        self.llm = ChatLiteLLM(model="gemini/gemini-1.5-flash", api_key=config.GOOGLE_API_KEY, verbose=True)
-    
-    @agent
-    def frontman(self) -> Agent:
-        """The frontman agent coordinates the analysis and visualization."""
-        return Agent(
-            config=self.agents_config["frontman"],  # type: ignore[index]
-            llm=self.llm,
-            verbose=True
-        )
-    
-    @agent
-    def data_analyst(self) -> Agent:
-        """The data analyst agent analyzes the data."""
-        return Agent(
-            config=self.agents_config["data_analyst"],  # type: ignore[index]
-            llm=self.llm,
-            verbose=True
-        )
-    
-    @agent
-    def data_visualizer(self) -> Agent:
-        """The data visualizer agent creates visualizations based on the analysis."""
-        return Agent(
-            config=self.agents_config["data_visualizer"],  # type: ignore[index]
-            llm=self.llm,
-            verbose=True
-        )
-    
-    @task
-    def initial_task(self) -> Task:
-        """The initial task for the frontman agent."""
-        task = Task(
-            config=self.tasks_config["initial_task"],  # type: ignore[index]
-        )
-        # Set the agent for this task
-        task.agent = self.frontman()
-        return task
-    
-    @task
-    def analysis_task(self) -> Task:
-        """The analysis task for the data analyst agent."""
-        task = Task(
-            config=self.tasks_config["analysis_task"],  # type: ignore[index]
-        )
-        # Set the output_pydantic model
-        task.output_pydantic = AnalysisOutput
-        # Set the agent for this task
-        task.agent = self.data_analyst()
-        return task
-    
-    @task
-    def visualization_task(self) -> Task:
-        """The visualization task for the data visualizer agent."""
-        task = Task(
-            config=self.tasks_config["visualization_task"],  # type: ignore[index]
-        )
-        # Set the output_pydantic model
-        task.output_pydantic = VisualizationOutput
-        # Set the agent for this task
-        task.agent = self.data_visualizer()
-        # Add context
-        task.context = [self.analysis_task()]
-        return task
-    
-    @crew
+        self.progress = progress or PipelineProgress()
+        self.analyst_task = None
+        self.visualization_task = None
+        self.reporter_task = None
+        self.token_usage = None
+        self._task_span = None
+
     def crew(self) -> Crew:
-        """Configure the crew to execute the tasks."""
-        return Crew(
-            agents=[
-                self.frontman(),
-                self.data_analyst(),
-                self.data_visualizer()
-            ],
-            tasks=[
-                self.initial_task(),
-                self.analysis_task(),
-                self.visualization_task()
-            ],
-            process=Process.sequential,
-            verbose=True
-        )
+        """Builds the agents (copies of the process-wide templates), tasks and crew."""
+        query = self.query
+        analyst_agent = agent_registry.analyst()
+        agents = [analyst_agent]
+
+        self.analyst_task = create_analyst_task(analyst_agent=analyst_agent, query=query)
+        self.analyst_task.callback = self._stage_callback("analyst")
+        tasks = [self.analyst_task]
+
+        # The local classifier drops the visualizer for queries that refuse a chart and, as a
+        # ConditionalTask, skips it when the analyst's CSV is not chartable.
+        if not config.VISUALIZATION_CLASSIFIER_ENABLED or requested_visualization(query) is not False:
+            visualizer_agent = agent_registry.visualizer()
+            self.visualization_task = create_visualization_task(
+                visualizer_agent=visualizer_agent,
+                user_query_for_visualization=query,
+                analyst_task_output_context_name=self.analyst_output_context_placeholder,
+                condition=(lambda analyst_output: should_visualize(query, analyst_output.raw))
+                if config.VISUALIZATION_CLASSIFIER_ENABLED else None
+            )
+            self.visualization_task.context = [self.analyst_task]
+            self.visualization_task.callback = self._stage_callback("visualizer")
+            agents.append(visualizer_agent)
+            tasks.append(self.visualization_task)
+
+        # In "direct" mode the report is rendered in Python from the outputs, saving one LLM call.
+        if config.REPORTER_MODE == "agent":
+            reporter_agent = agent_registry.reporter()
+            self.reporter_task = create_final_reporting_task(
+                reporter_agent=reporter_agent,
+                original_user_query=query,
+                analyst_findings_context_name=self.analyst_output_context_placeholder,
+                visualizer_json_context_name=self.visualizer_output_context_placeholder
+            )
+            self.reporter_task.context = tasks[:]
+            self.reporter_task.callback = self._stage_callback("reporter")
+            agents.append(reporter_agent)
+            tasks.append(self.reporter_task)
+
+        return Crew(agents=agents, tasks=tasks, process=Process.sequential, verbose=1)
+
+    def _stage_callback(self, name: str):
+        """Task callback that closes the running task's span under `name`, then reports the stage."""
+        report = self.progress.task_callback(name)
+
+        def callback(output):
+            # Tasks run one after another on this thread: each callback ends one task's span
+            # and opens the next one's.
+            self._task_span.name = f"task:{name}"
+            self._task_span.set(output_chars=len(output.raw) if output is not None else 0)
+            tracer.end_span(self._task_span)
+            self._task_span = tracer.start_span("task", "task")
+            report(output)
+        return callback
+
+    def run(self) -> QueryResult:
+        """Runs the crew, stores the answer in the result caches and returns it."""
+        with tracer.span("crew", "crew", query=self.query, reporter_mode=config.REPORTER_MODE) as span:
+            crew = self.crew()
+            with self.progress:
+                self._task_span = tracer.start_span("task", "task")
+                try:
+                    crew_output = crew.kickoff()
+                except Exception as e:
+                    self._task_span.fail(f"{type(e).__name__}: {e}")
+                    tracer.end_span(self._task_span)
+                    raise
+                # The span opened after the last task has nothing in it.
+                tracer.end_span(self._task_span, record=False)
+            if getattr(crew_output, "token_usage", None) is not None:
+                self.token_usage = crew_output.token_usage.model_dump()
+                span.set(provider_token_usage=self.token_usage)
+            span.set(**self.progress.metrics())
+            analyst_output = self.analyst_task.output.raw
+            if self.visualization_task is not None and self.visualization_task.output:
+                visualizer_output = self.visualization_task.output.raw
+            else:
+                visualizer_output = no_visualization_json("No chart was needed for this question.")
+            plot_image, plot_error = None, None
+            try:
+                plot_image = read_plot_image(visualizer_output, analyst_output)
+            except Exception as e:
+                # A chart that cannot be rendered (render timeout, bad column types) still
+                # leaves the analyst's and visualizer's text to deliver.
+                plot_error = f"{type(e).__name__}: {e}"
+                span.set(plot_error=plot_error)
+            result = QueryResult(
+                query=self.query,
+                analyst_output=analyst_output,
+                visualizer_output=visualizer_output,
+                plot_image=plot_image
+            )
+            # Not cached without its chart: a render timeout may not happen again.
+            if config.RESULT_CACHE_ENABLED and plot_error is None:
+                result_cache.put(result)
+                if semantic_cache is not None:
+                    semantic_cache.add(self.query)
+            return result
+
+
+def serve_without_crew(query: str):
+    """
+    Returns (QueryResult, source) when the query can be answered without LLM calls: by the
+    fast path, the exact result cache or the semantic cache. Returns (None, None) otherwise.
+    """
+    with tracer.span("serve_without_crew", "lookup", query=query) as span:
+        result, source = _serve_without_crew(query)
+        span.set(source=source)
+        return result, source
+
+
+def _serve_without_crew(query: str):
+    if config.FAST_PATH_ENABLED:
+        result = fast_path_router.answer(query)
+        if result is not None:
+            return result, "fast_path"
+    if config.RESULT_CACHE_ENABLED:
+        result = result_cache.get(query)
+        if result is not None:
+            return result, "result_cache"
+        if semantic_cache is not None:
+            result = semantic_cache.lookup(query)
+            if result is not None:
+                return result, "semantic_cache"
+    return None, None
+
+
+def run_crew(query: str, progress: PipelineProgress = None) -> QueryResult:
+    return DataAnalysisCrew(query, progress).run()
+
 
+def answer_query(query: str, progress: PipelineProgress = None):
+    """Answers a query end to end; returns (QueryResult, source)."""
+    with tracer.span("query", "query", query=query):
+        result, source = serve_without_crew(query)
+        if result is not None:
+            return result, source
+        return run_crew(query, progress), "crew"
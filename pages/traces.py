@@ -0,0 +1,83 @@
+# pages/traces.py
+import os
+import sys
+
+import pandas as pd
+import streamlit as st
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if PROJECT_ROOT not in sys.path:
+    sys.path.append(PROJECT_ROOT)
+
+from utils.config import config
+from utils.tracing import tracer
+
+st.set_page_config(page_title="Crew traces", layout="wide")
+st.title("Where does the time go?")
+
+if not config.TRACING_ENABLED:
+    st.info("Tracing is disabled (TRACING_ENABLED=false).")
+    st.stop()
+
+spans = pd.DataFrame(tracer.load())
+if spans.empty:
+    st.info(f"No traces yet in {config.TRACE_PATH}. Ask the crew something first.")
+    st.stop()
+
+roots = spans[spans["parent_id"].isna()].sort_values("start", ascending=False)
+recent = st.slider("Recent queries", min_value=1, max_value=max(1, len(roots)), value=min(50, len(roots)))
+roots = roots.head(recent)
+spans = spans[spans["trace_id"].isin(roots["trace_id"])]
+counts = pd.json_normalize(spans["counts"].tolist()).reindex(columns=["llm_calls", "tool_calls", "prompt_tokens",
+                                                                      "completion_tokens", "retries", "errors"])
+spans = pd.concat([spans.reset_index(drop=True), counts.fillna(0).astype(int)], axis=1)
+
+st.subheader("Slowest stages")
+stages = spans.groupby(["kind", "name"]).agg(
+    calls=("duration_s", "size"),
+    p50_s=("duration_s", "median"),
+    p95_s=("duration_s", lambda d: d.quantile(0.95)),
+    max_s=("duration_s", "max"),
+    total_s=("duration_s", "sum"),
+    errors=("status", lambda s: int((s == "error").sum())),
+).reset_index().sort_values("p95_s", ascending=False)
+st.dataframe(stages, hide_index=True, use_container_width=True)
+
+st.subheader("Slowest queries")
+queries = spans[spans["parent_id"].isna()].copy()
+queries["query"] = queries["attributes"].map(lambda a: a.get("query"))
+queries["source"] = queries["attributes"].map(lambda a: a.get("source"))
+queries["started"] = pd.to_datetime(queries["start"], unit="s")
+queries = queries.sort_values("duration_s", ascending=False)
+st.dataframe(
+    queries[["started", "query", "name", "duration_s", "status", "llm_calls", "tool_calls",
+             "prompt_tokens", "completion_tokens", "retries", "trace_id"]],
+    hide_index=True, use_container_width=True
+)
+
+trace_id = st.selectbox(
+    "Trace", queries["trace_id"],
+    format_func=lambda t: f"{queries.set_index('trace_id').at[t, 'duration_s']:.1f} s  "
+                          f"{queries.set_index('trace_id').at[t, 'query']}"
+)
+trace = spans[spans["trace_id"] == trace_id].sort_values("start")
+parents = dict(zip(trace["span_id"], trace["parent_id"]))
+
+
+def depth(span_id):
+    level = 0
+    while parents.get(span_id) is not None:
+        span_id = parents[span_id]
+        level += 1
+    return level
+
+
+trace = trace.assign(
+    step=[("· " * depth(s)) + n for s, n in zip(trace["span_id"], trace["name"])],
+    offset_s=trace["start"] - trace["start"].min(),
+)
+st.dataframe(
+    trace[["step", "kind", "offset_s", "duration_s", "status", "llm_calls", "tool_calls", "prompt_tokens",
+           "completion_tokens", "error", "attributes"]],
+    hide_index=True, use_container_width=True
+)
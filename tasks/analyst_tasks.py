@@ -2,6 +2,7 @@
 from crewai import Task
 from utils.config import config
 from tools.analysis_tool import analysis_tool
+from utils.schema_catalog import schema_catalog
 
 AVAILABLE_DATA_PATHS = config.AVAILABLE_DATA_PATHS
 
@@ -9,17 +10,22 @@ def create_analyst_task(analyst_agent, query: str):
     description_for_analyst_task = f"""
 Analyze the data based on the provided query: '{query}'.
 You have access to data files via the `AVAILABLE_DATA_PATHS` variable in your Python code execution environment.
+The same files are already loaded as DataFrames in the `dfs` variable (e.g. `dfs['STIPENDI']`, `dfs['AMMINISTRATI']`); use them instead of re-reading the CSVs.
+For plain counts, `cube(dataset, by=[...], filters={{...}})` returns the sum of `numero` (`numerosita` for REDDITO) from a precomputed aggregate, e.g. `cube('AMMINISTRATI', by=['fascia di età', 'regione_residenza'], filters={{'modalita_autenticazione': 'SPID'}})`; it returns a DataFrame, or an int when `by` is empty.
 
 **STEPS TO FOLLOW:**
 
 1.  **Understand Query:** Determine the specific information and level of detail required by the query: '{query}'.
 
-2.  **Explore Data (Tool Use MANDATORY):**
-    *   Systematically use the 'Python Code Executor' tool to explore ALL data files available.
-    *   You MUST inspect columns, data types, and sample data (e.g., using `df.columns`, `df.head()`, `df.info()`) 
-    of potentially relevant files to locate the necessary information. 
+2.  **Use the Schema Catalog (NO exploratory tool calls):**
+    *   The catalog below lists every dataset with its row count, exact column names, all values of the 
+    low-cardinality columns (note exact spellings such as '65- ') and the range of the numeric columns. 
+    It is generated from the current data, so do NOT spend tool calls on `df.columns`, `df.head()` or `df.info()`; 
+    go straight to the analysis code. Call `describe_dataset('NAME')` only if you need to re-read it.
     Note that relevant information might be in columns with non-obvious names or spread across multiple files.
 
+{schema_catalog.render()}
+
 3.  **Devise Your Analytical Plan (MANDATORY for ALL queries, especially complex ones):**
     *   For the current query: '{query}', you MUST apply your structured thinking process 
         (Deconstruct, Identify Data, Formulate Step-by-Step Plan, Self-Correct) as outlined in your core 
@@ -56,7 +62,7 @@ You have access to data files via the `AVAILABLE_DATA_PATHS` variable in your Py
 4.  **Perform Analysis (Tool Use MANDATORY):** Execute the Python code to perform the planned analysis.
 
 5.  **Formulate Response (Dual Output Required):**
-    *   **Part 1: Human-Readable Summary:** Provide a clear, textual explanation of your findings in response to '{query}'. If you present small tables here (<15 rows), use Markdown.
+    *   **Part 1: Human-Readable Summary:** Provide a clear, textual explanation of your findings in response to '{query}'. If the tool output of a result table contains `Table reference: [table:<id>]`, write that reference on its own line where the table belongs instead of retyping the table; the application displays the full table from it. Otherwise, if you present small tables here (<15 rows), use Markdown.
         If tables are large and you state "see the table below X", always provide a concise textual summary of its main points INSTEAD 
         of referring to a non-existent table. 
         If an exact answer isn't possible but a related one is, explain the adaptation. If no answer is possible, explain why.
@@ -78,8 +84,9 @@ The response string MUST contain:
     *   Begin with a clear textual explanation answering the core of the query.
     *   **Presenting Tabular Data in Summary:**
         *   If your analysis produces tabular data that directly presents the key findings, you MUST include a representation of this data within this summary.
-        *   **For small tables (e.g., less than 15 rows AND less than 10 columns):** Format the entire table as Markdown directly within this summary.
-        *   **For larger tables:**
+        *   **Preferred: table references.** Assign the result DataFrame to `return_value` in your code; the tool output then contains `Table reference: [table:<id>]`. Write `[table:<id>]` on its own line in this summary instead of a Markdown table. Never invent an id.
+        *   **For small tables without a reference (e.g., less than 15 rows AND less than 10 columns):** Format the entire table as Markdown directly within this summary.
+        *   **For larger tables without a reference:**
             1.  Provide a concise textual summary of the table's main purpose and overall trends.
             2.  Present a **truncated version of the table in Markdown format**, showing, for example, the **first 5-10 rows and the last 2-3 rows**, or a relevant subset if the query implies a focus. Clearly indicate that the table is truncated (e.g., by adding a note like "... (and X more rows not shown) ..." at the end of the Markdown table).
             3.  Mention that the full, detailed data is available in the `=== DATA FOR VISUALIZATION (CSV) ===` section for complete review and will be used for any generated visualizations.
@@ -0,0 +1,21 @@
+# tests/conftest.py
+import os
+import sys
+import tempfile
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+# utils.config reads the environment at import, so the test settings go in first:
+# the repository's datasets, and every cache/compiled/trace file in a throwaway directory.
+_SCRATCH = tempfile.mkdtemp(prefix="noipa-tests-")
+os.environ.setdefault("GOOGLE_API_KEY", "test-key")
+for _name in ("AMMINISTRATI", "REDDITO", "PENDOLARISMO", "STIPENDI"):
+    os.environ.setdefault(_name, os.path.join(PROJECT_ROOT, "data", f"{_name}.csv"))
+os.environ["CACHE_DIR"] = _SCRATCH
+os.environ["COMPILED_DATA_DIR"] = os.path.join(_SCRATCH, "compiled")
+os.environ["CHROMA_DB_PATH"] = os.path.join(_SCRATCH, "chroma")
+os.environ["EMBEDDING_BACKEND"] = "hashing"
+os.environ["TRACING_ENABLED"] = "false"
+os.environ["SANDBOX_WORKERS"] = "0"
@@ -0,0 +1,52 @@
+# tests/test_columnar_store.py
+import os
+import shutil
+import time
+
+import pandas as pd
+import pytest
+
+from utils.columnar_store import compile_dataset, compiled_path, load_compiled, load_dataset
+from utils.config import config
+
+
+def _compiled_copy(tmp_path, name="STIPENDI"):
+    csv_path = tmp_path / f"{name}.csv"
+    shutil.copy(config.AVAILABLE_DATA_PATHS[f"{name}.csv"], csv_path)
+    compile_dataset(str(csv_path))
+    return str(csv_path)
+
+
+def test_compiled_text_columns_load_as_strings(tmp_path):
+    csv_path = _compiled_copy(tmp_path)
+    df = load_dataset(csv_path)
+    assert not any(isinstance(dtype, pd.CategoricalDtype) for dtype in df.dtypes)
+    # String operations that fail on categoricals work as on a CSV read.
+    combined = df["sesso"] + "_" + df["modalita_pagamento"]
+    assert combined.iloc[0] == f"{df['sesso'].iloc[0]}_{df['modalita_pagamento'].iloc[0]}"
+
+
+def test_multi_key_groupby_matches_csv_read(tmp_path):
+    csv_path = _compiled_copy(tmp_path)
+    by = ["comune", "sesso", "modalita_pagamento"]
+    baseline = pd.read_csv(csv_path).groupby(by)["numero"].sum()
+    compiled = load_dataset(csv_path).groupby(by)["numero"].sum()
+    assert len(compiled) == len(baseline)
+    assert compiled.sum() == baseline.sum()
+
+
+def test_categorical_load_keeps_dictionaries(tmp_path):
+    csv_path = _compiled_copy(tmp_path)
+    df = load_compiled(compiled_path(csv_path), categorical=True)
+    assert isinstance(df["sesso"].dtype, pd.CategoricalDtype)
+
+
+@pytest.mark.parametrize("name", ["AMMINISTRATI", "STIPENDI", "REDDITO", "PENDOLARISMO"])
+def test_csv_fallback_matches_compiled_load(tmp_path, monkeypatch, name):
+    csv_path = _compiled_copy(tmp_path, name)
+    compiled = load_dataset(csv_path)
+    later = time.time() + 10
+    os.utime(csv_path, (later, later))  # the compiled file is now stale
+    monkeypatch.setattr(config, "COMPILE_DATA_ON_LOAD", False)
+    fallback = load_dataset(csv_path)
+    pd.testing.assert_frame_equal(fallback, compiled)
@@ -0,0 +1,46 @@
+# tests/test_cube.py
+import pandas as pd
+import pytest
+
+from utils.config import config
+from utils.cube import CubeStore, compile_cube
+from utils.ingestion import read_dataset_csv
+from utils.partition_store import PartitionStore
+
+
+def _assert_plain(result):
+    assert not any(isinstance(dtype, pd.CategoricalDtype) for dtype in result.dtypes), result.dtypes
+    # Concatenation and groupby work as on dfs[...]: no TypeError, no unused combinations.
+    labels = result["regione_residenza"] + "_" + result["sesso"]
+    assert len(labels) == len(result)
+    dimensions = [c for c in result.columns if c != "numero"]
+    assert len(result.groupby(dimensions)) == len(result)
+
+
+@pytest.fixture(scope="module")
+def amministrati():
+    csv_path = config.AVAILABLE_DATA_PATHS["AMMINISTRATI.csv"]
+    df = read_dataset_csv(csv_path)
+    compile_cube(csv_path, df)  # the compiled cube keeps categorical dimensions
+    return df
+
+
+def test_cube_query_returns_plain_columns(amministrati):
+    store = CubeStore()
+    _assert_plain(store.query("AMMINISTRATI", by=["regione_residenza", "sesso"]))
+    _assert_plain(store.query("AMMINISTRATI", by=["regione_residenza", "sesso"], filters={"sesso": ["F", "M"]}))
+    by_age = store.query("AMMINISTRATI", by=["fascia di età"])
+    assert by_age["fascia di età"].dtype == object
+
+
+def test_partition_query_returns_plain_columns(amministrati, tmp_path):
+    store = PartitionStore(root=str(tmp_path / "partitions"), workers=2)
+    for month in ("2025-01", "2025-02"):
+        store.write("AMMINISTRATI", month, amministrati, {})
+    try:
+        result = store.query("AMMINISTRATI", by=["mese", "regione_residenza", "sesso"])
+        _assert_plain(result)
+        assert result["mese"].dtype == object
+        assert sorted(result["mese"].unique()) == ["2025-01", "2025-02"]
+    finally:
+        store.shutdown()
@@ -0,0 +1,46 @@
+# tests/test_fast_path.py
+import pandas as pd
+
+from utils.cube import cube
+from utils.fast_path import fast_path_router
+
+
+def test_dataset_named_by_its_noun_is_not_answered_from_another():
+    # PENDOLARISMO has no 'sesso' column: the router must not fall back to AMMINISTRATI.
+    assert fast_path_router.parse("distribuzione per sesso dei pendolari") is None
+
+
+def test_multi_valued_filter_is_grouped_on():
+    intent = fast_path_router.parse("quanti uomini e quante donne usano la CIE?")
+    assert intent is not None
+    assert intent.dataset == "AMMINISTRATI"
+    assert intent.by == ["sesso"]
+    result = cube(intent.dataset, by=intent.by, filters=intent.filters)
+    assert isinstance(result, pd.DataFrame)
+    assert sorted(result["sesso"]) == ["F", "M"]
+
+
+def test_ratio_and_comparison_questions_fall_back_to_the_agents():
+    assert fast_path_router.parse("percentuale di donne che usano SPID nel Lazio rispetto alla Lombardia") is None
+    assert fast_path_router.parse("percentuale di donne che usano SPID") is None
+
+
+def test_templated_distribution_is_still_answered():
+    intent = fast_path_router.parse("distribuzione per regione degli amministrati che usano SPID")
+    assert intent is not None and intent.by == ["regione_residenza"]
+    assert intent.confidence >= fast_path_router.min_confidence
+
+
+def test_negated_and_excluding_questions_fall_back_to_the_agents():
+    queries = [
+        "Quanti dipendenti non usano SPID in Lombardia per fascia di età?",
+        "Distribuzione per fascia di età dei dipendenti che non usano SPID in Lombardia",
+        "How many employees do not use SPID in Lombardia by age group?",
+        "Quanti dipendenti usano SPID fuori dalla Lombardia per sesso?",
+        "How many employees don't use SPID in Lombardia by age group?",
+        "Distribution by gender of employees in regions other than Lombardia",
+        "Quanti dipendenti usano SPID tranne in Lombardia?",
+    ]
+    for query in queries:
+        assert fast_path_router.parse(query) is None, query
+    assert fast_path_router.parse("Quanti dipendenti usano SPID in Lombardia per fascia di età?") is not None
@@ -0,0 +1,31 @@
+# tests/test_job_queue.py
+import time
+from types import SimpleNamespace
+
+from utils.job_queue import JobQueue
+
+RUN_SECONDS = 0.3
+
+
+def slow_runner(query, progress):
+    with progress:
+        time.sleep(RUN_SECONDS)
+        progress.stage("analyst", SimpleNamespace(raw=f"findings for {query}"))
+    return query
+
+
+def test_latency_excludes_queue_wait():
+    queue = JobQueue(runner=slow_runner, workers=1)
+    try:
+        first = queue.submit("quanti utenti in Lazio?", "user-a")
+        second = queue.submit("quanti utenti in Puglia?", "user-b")
+        queue.wait(first, timeout=5)
+        job = queue.wait(second, timeout=5)
+        assert job.status == "done"
+        timings = job.progress.metrics()
+        # The second job waited for the first one; that wait is reported on its own.
+        assert timings["queue_wait_s"] >= RUN_SECONDS * 0.8
+        assert timings["time_to_first_content_s"] < RUN_SECONDS * 1.8
+        assert timings["total_s"] < RUN_SECONDS * 1.8
+    finally:
+        queue.shutdown()
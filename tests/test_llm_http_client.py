@@ -0,0 +1,76 @@
+# tests/test_llm_http_client.py
+import json
+
+import httpx
+import pytest
+
+litellm = pytest.importorskip("litellm")
+pytest.importorskip("crewai")
+
+from crewai import LLM  # noqa: E402
+from litellm.llms.custom_httpx.http_handler import HTTPHandler  # noqa: E402
+
+from utils.llm_cache import CachedLLM, http_client, llm_client_params, make_http_client, make_shared_llm  # noqa: E402
+
+GEMINI_RESPONSE = {
+    "candidates": [{"content": {"parts": [{"text": "ok"}], "role": "model"}, "finishReason": "STOP", "index": 0}],
+    "usageMetadata": {"promptTokenCount": 3, "candidatesTokenCount": 1, "totalTokenCount": 4},
+}
+
+
+@pytest.fixture
+def counting_handler(monkeypatch):
+    monkeypatch.setattr(litellm, "client_session", litellm.client_session)  # restored afterwards
+    requests = []
+
+    def respond(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        return httpx.Response(200, json=GEMINI_RESPONSE)
+
+    return make_http_client(transport=httpx.MockTransport(respond)), requests
+
+
+def test_gemini_completion_goes_through_the_pooled_client(counting_handler):
+    handler, requests = counting_handler
+    for _ in range(2):
+        response = litellm.completion(model="gemini/gemini-1.5-flash", api_key="test-key",
+                                      messages=[{"role": "user", "content": "hi"}], client=handler)
+        assert response.choices[0].message.content == "ok"
+    assert len(requests) == 2
+    assert "generativelanguage.googleapis.com" in str(requests[0].url)
+
+
+def test_crewai_llm_forwards_the_client(counting_handler):
+    handler, requests = counting_handler
+    llm = LLM(model="gemini/gemini-1.5-flash", api_key="test-key", stream=False,
+              **llm_client_params("gemini/gemini-1.5-flash", handler))
+    assert llm.call([{"role": "user", "content": "hi"}]) == "ok"
+    assert len(requests) == 1
+    assert json.loads(requests[0].content)["contents"][0]["parts"][0]["text"] == "hi"
+
+
+def test_shared_llm_uses_the_process_client():
+    assert make_shared_llm().additional_params.get("client") is http_client
+    assert llm_client_params("openai/gpt-4o", http_client) == {}
+
+
+def test_http_client_is_installed_as_litellm_session(monkeypatch):
+    monkeypatch.setattr(litellm, "client_session", None)
+    handler = make_http_client()
+    assert litellm.client_session is handler.client
+
+
+@pytest.mark.parametrize("model, routed", [("gemini/gemini-1.5-flash", True), ("openai/gpt-4o", False)])
+def test_cached_llm_passes_the_client_only_to_gemini(monkeypatch, model, routed):
+    calls = []
+
+    def completion(**kwargs):
+        calls.append(kwargs)
+        return litellm.ModelResponse(choices=[{"message": {"role": "assistant", "content": "ok"}}])
+
+    monkeypatch.setattr(litellm, "completion", completion)
+    handler = HTTPHandler()
+    llm = CachedLLM(model=model, api_key="test-key", stream=False, cache=None, **llm_client_params(model, handler))
+    assert llm.call([{"role": "user", "content": "hi"}]) == "ok"
+    assert len(calls) == 1
+    assert (calls[0].get("client") is handler) if routed else ("client" not in calls[0])
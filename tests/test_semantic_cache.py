@@ -0,0 +1,63 @@
+# tests/test_semantic_cache.py
+import pytest
+
+from utils.chroma_db import ChromaManager, HashingEmbeddingFunction
+from utils.config import config
+from utils.result_cache import QueryResult, ResultCache
+from utils.semantic_cache import SemanticQueryCache
+
+# Pairs that embed close together but ask different questions.
+DIFFERENT_QUESTIONS = [
+    ("Quanti dipendenti usano SPID?", "Quanti dipendenti non usano SPID?"),
+    ("Distribuzione degli amministrati per regione", "Distribuzione degli amministrati per sesso"),
+    ("In quali comuni ci sono i dipendenti più anziani?", "In quali comuni ci sono i dipendenti più giovani?"),
+    ("Quale regione ha più pendolari?", "Quale regione ha meno pendolari?"),
+    ("Quanti dipendenti usano SPID in Lombardia?", "Quanti dipendenti usano SPID fuori dalla Lombardia?"),
+    ("Employees using SPID in Lombardia", "Employees using SPID in regions other than Lombardia"),
+]
+
+
+@pytest.fixture
+def cache(tmp_path):
+    manager = ChromaManager(embedding_function=HashingEmbeddingFunction(), path=str(tmp_path / "chroma"))
+    return SemanticQueryCache(manager_factory=lambda: manager, results=None,
+                              threshold=config.SEMANTIC_CACHE_THRESHOLD, max_entries=100,
+                              collection_name="test_semantic_cache")
+
+
+@pytest.mark.parametrize("cached, query", DIFFERENT_QUESTIONS)
+def test_different_questions_are_not_served(cache, cached, query):
+    cache.add(cached)
+    assert cache._match(query, threshold=0.0) is None
+    assert cache._match(query, cache.threshold) is None
+
+
+@pytest.mark.parametrize("cached, query", DIFFERENT_QUESTIONS)
+def test_entities_tell_the_pairs_apart(cached, query):
+    assert SemanticQueryCache.entities(cached) != SemanticQueryCache.entities(query)
+
+
+def test_rephrased_question_is_served(cache):
+    cache.add("Quanti dipendenti usano SPID in Lombardia?")
+    assert cache._match("quanti  dipendenti usano spid in lombardia", cache.threshold) == \
+        "Quanti dipendenti usano SPID in Lombardia?"
+
+
+def test_hashing_backend_uses_stricter_threshold():
+    assert config.EMBEDDING_BACKEND == "hashing"
+    assert config.SEMANTIC_CACHE_THRESHOLD >= 0.95
+
+
+def test_match_looks_past_a_rejected_nearest_entry(cache):
+    cache.add(["Quanti dipendenti non usano SPID in Lombardia?", "Numero di dipendenti con SPID in Lombardia"])
+    query = "Quanti dipendenti usano SPID in Lombardia?"
+    assert cache.nearest(query)[0][1] == "Quanti dipendenti non usano SPID in Lombardia?"
+    assert cache._match(query, threshold=0.0) == "Numero di dipendenti con SPID in Lombardia"
+
+
+def test_lookup_does_not_count_as_an_exact_cache_lookup(cache, tmp_path):
+    cache.results = ResultCache(path=str(tmp_path / "results.sqlite3"), max_entries=10)
+    cache.results.put(QueryResult(query="Quanti dipendenti usano SPID in Lombardia?", analyst_output="42"))
+    cache.add("Quanti dipendenti usano SPID in Lombardia?")
+    assert cache.lookup("quanti dipendenti usano spid in lombardia").analyst_output == "42"
+    assert (cache.results.hits, cache.results.misses) == (0, 0)
@@ -0,0 +1,42 @@
+# tests/test_table_store.py
+import pandas as pd
+import pytest
+
+import utils.table_store
+from utils.sandbox_pool import run_analysis_code
+from utils.table_store import TableStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    return TableStore(directory=str(tmp_path / "tables"), max_bytes=2**20, max_rows=1000)
+
+
+def test_series_named_like_its_index(store):
+    df = pd.DataFrame({"sesso": ["F", "M", "F"], "numero": [1, 2, 3]})
+    series = df.groupby("sesso")["sesso"].count()
+    table = store.get(store.put(series))
+    assert list(table.columns) == ["sesso", "sesso_2"]
+    assert table["sesso_2"].tolist() == [2, 1]
+
+
+def test_mixed_type_object_column(store):
+    df = pd.DataFrame({"regione": ["LAZIO", 3, float("nan")], "numero": [1, 2, 3]})
+    table = store.get(store.put(df))
+    assert table["regione"].tolist() == ["LAZIO", "3", None]
+
+
+def test_duplicate_column_names(store):
+    df = pd.DataFrame([[1, 2], [3, 4]], columns=["numero", "numero"])
+    table = store.get(store.put(df))
+    assert list(table.columns) == ["numero", "numero_2"]
+
+
+def test_unstorable_result_is_returned_inline(monkeypatch):
+    def fail(value):
+        raise ValueError("cannot store")
+
+    monkeypatch.setattr(utils.table_store.table_store, "put", fail)
+    output = run_analysis_code("return_value = pd.DataFrame({'numero': [42]})")
+    assert not output.startswith("Error executing code")
+    assert "42" in output and "[table:" not in output
@@ -3,49 +3,40 @@
 import os
 from crewai.tools import BaseTool
 from typing import Type, Any, Dict, List, Optional
-import io
-import contextlib
+from utils.config import config
+from utils.sandbox_pool import run_analysis_code, sandbox_pool
+from utils.tracing import tracer
 #AVAILABLE_DATA_PATHS = os.environ.get("AVAILABLE_DATA_PATHS", "").split(",")
 
 class DataAnalysisTool(BaseTool):
     name: str = "Python Code Executor"
-    description: str = "Execute Python code for data analysis using pandas. Code must use file paths from AVAILABLE_DATA_PATHS."
+    description: str = (
+        "Execute Python code for data analysis using pandas. Code must use file paths from AVAILABLE_DATA_PATHS. "
+        "The datasets are also preloaded as `dfs['AMMINISTRATI']`, `dfs['REDDITO']`, `dfs['PENDOLARISMO']` "
+        "and `dfs['STIPENDI']`. "
+        "For sums of `numero`/`numerosita`, prefer the precomputed "
+        "`cube('AMMINISTRATI', by=['regione_residenza'], filters={'modalita_autenticazione': 'SPID'})`. "
+        "`dfs` and `cube` cover the latest month. For other months or trends, `months('STIPENDI')` lists "
+        "the months available, `history('STIPENDI', months=['2025-01', '2025-02'])` (or a year, '2025') "
+        "returns their rows with a `mese` column ('YYYY-MM'), and `cube` accepts `mese` in `by`/`filters`, "
+        "e.g. `cube('STIPENDI', by=['mese', 'sesso'], filters={'mese': '2025'})`. "
+        "`describe_dataset('NAME')` returns a dataset's columns and values. "
+        "Assign a result DataFrame to `return_value` to get a `[table:<id>]` reference that shows it to the user."
+    )
 
     def _run(self, code: str) -> str:
         """Execute Python code for data analysis and return the results."""
-        try:
-            import pandas as pd
-            import numpy as np
-            import re
-            import io
-            import contextlib
-            from utils.config import config 
-
-            local_namespace = {
-                'pd': pd,
-                'np': np,
-                're':re,
-                'AVAILABLE_DATA_PATHS': config.AVAILABLE_DATA_PATHS 
-            }
-
-            output_buffer = io.StringIO()
-
-            with contextlib.redirect_stdout(output_buffer):
-                exec(code, local_namespace)
-
-            output = output_buffer.getvalue()
-
-            if 'return_value' in local_namespace:
-                result = local_namespace['return_value']
-                if isinstance(result, (pd.DataFrame, pd.Series)):
-                    return output + "\n" + str(result)
-                else:
-                    return output + "\n" + str(result)
+        with tracer.span(self.name, "tool", input_chars=len(code)) as span:
+            # Run in a pre-warmed sandbox process when the pool is enabled, so a slow
+            # or runaway snippet cannot block the Streamlit process.
+            if config.SANDBOX_WORKERS > 0:
+                output = sandbox_pool.run(code)
             else:
-                return output or "Code executed successfully, but no output was produced."
-
-        except Exception as e:
-            return f"Error executing code: {str(e)}"
+                output = run_analysis_code(code)
+            span.set(output_chars=len(output))
+            if output.startswith("Error executing code"):
+                span.fail(output)
+            return output
 
     def _arun(self, code: str) -> str:
         """Async version simply calls the sync version."""
@@ -3,18 +3,174 @@ import json
 import pandas as pd
 import io
 import os
-import matplotlib.pyplot as plt
 import streamlit as st
 from crewai.tools import BaseTool
+from tools.visualization_tool import render_chart_from_spec
+from utils.plot_cache import PLOT_REF_PREFIX, plot_cache
+from utils.table_store import TABLE_REF_PATTERN, table_store
+from utils.tracing import tracer
+
+
+def parse_visualizer_json(visualizer_json_output: str) -> dict:
+    """Parses the Visualizer's JSON output, tolerating a ```json fence around it."""
+    json_to_parse_viz = visualizer_json_output
+    if visualizer_json_output.startswith("```json"): # Strip markdown
+        start_idx_viz = visualizer_json_output.find('{')
+        end_idx_viz = visualizer_json_output.rfind('}')
+        if start_idx_viz != -1 and end_idx_viz != -1 and end_idx_viz > start_idx_viz:
+            json_to_parse_viz = visualizer_json_output[start_idx_viz : end_idx_viz+1]
+        else:
+            json_to_parse_viz = visualizer_json_output.replace("```json\n", "").replace("\n```", "").strip()
+    return json.loads(json_to_parse_viz)
+
+
+def read_plot_image(visualizer_json_output: str, analyst_findings: str = None):
+    """
+    Returns the PNG bytes of the Visualizer's plot, or None: the plot cache entry or file
+    at plot_path, or its chart_spec rendered over the analyst's CSV block.
+    """
+    try:
+        viz_data = parse_visualizer_json(visualizer_json_output)
+        plot_path = viz_data.get("plot_path")
+    except (json.JSONDecodeError, AttributeError):
+        return None
+    if plot_path and plot_path.startswith(PLOT_REF_PREFIX):
+        image = plot_cache.get(plot_path)
+        if image is not None:
+            return image
+    elif plot_path and os.path.exists(plot_path):
+        with open(plot_path, "rb") as f:
+            return f.read()
+    if viz_data.get("chart_spec") and analyst_findings:
+        try:
+            return render_chart_from_spec(viz_data, analyst_findings)
+        except ValueError:
+            return None
+    return None
+
+
+def _render_text_with_blocks(analyst_findings: str):
+    """Displays markdown, re-parsing ```text blocks as tables where possible (outputs without table references)."""
+    parts = analyst_findings.split("```text")
+    st.markdown(parts[0])
+    if len(parts) > 1:
+        for i in range(1, len(parts)):
+            block_content = parts[i]
+            table_and_after = block_content.split("```", 1)
+            table_string_data = table_and_after[0].strip()
+            text_after_current_table = table_and_after[1].strip() if len(table_and_after) > 1 else None
+            if table_string_data:
+                try:
+                    lines = table_string_data.split('\n')
+                    if not lines or not any(line.strip() for line in lines):
+                        st.markdown("##### Data Table (Raw Text - Block was empty):")
+                        st.text("(Table block was empty or whitespace only)")
+                    else:
+                        # Basic heuristic for header, can be improved
+                        header_line_index = 0
+                        for idx, line_content in enumerate(lines):
+                            if len(line_content.strip().split()) > 1: # Simple check for multiple words
+                                header_line_index = idx
+                                break
+                        data_to_parse_str = "\n".join(lines[header_line_index:])
+                        try:
+                            df_from_text = pd.read_csv(io.StringIO(data_to_parse_str), delim_whitespace=True, on_bad_lines='skip')
+                            if not df_from_text.empty:
+                                st.markdown("##### Data Table (Attempted Parse):")
+                                st.dataframe(df_from_text)
+                            else:
+                                st.markdown("##### Data Table (Raw Text - Parsed as empty):")
+                                st.text(table_string_data)
+                        except Exception: # Broad exception for parsing issues
+                            st.markdown("##### Data Table (Raw Text - Could not parse nicely):")
+                            st.text(table_string_data)
+                except Exception as e_table:
+                    st.warning(f"Could not process a text table from analyst: {e_table}")
+                    st.text(table_string_data) # Show raw if any error
+            if text_after_current_table:
+                st.markdown(text_after_current_table)
+
+
+def render_analyst_findings(analyst_findings: str):
+    """Displays the analyst's findings; [table:<id>] references are shown from the table store."""
+    # --- 1. Display Analyst's Findings ---
+    st.subheader("Analytical Insights")
+    # split() alternates text and the ids captured by the pattern
+    for i, part in enumerate(TABLE_REF_PATTERN.split(analyst_findings)):
+        if i % 2 == 0:
+            if part.strip():
+                _render_text_with_blocks(part)
+            continue
+        table = table_store.get(part)
+        if table is None:
+            st.caption(f"(Table {part} is no longer available.)")
+        else:
+            st.dataframe(table, hide_index=True)
+    st.markdown("---")
+
+
+def render_visualization(visualizer_json_output: str, plot_image: bytes = None, analyst_findings: str = None) -> str:
+    """
+    Displays the Visualizer's plot. `plot_image` (PNG bytes, e.g. from a cache) takes
+    precedence over the file at the JSON's plot_path and over its chart_spec, which is
+    rendered over the CSV block of `analyst_findings`.
+    """
+    # --- 2. Process and Render Visualization ---
+    st.subheader("Data Visualization")
+    try:
+        viz_data = parse_visualizer_json(visualizer_json_output)
+    except json.JSONDecodeError as e:
+        error_msg = f"Error: Could not decode JSON from Visualizer: {e}. Raw: {visualizer_json_output[:500]}..."
+        st.error(error_msg)
+        return error_msg
+
+    visualization_type = viz_data.get("visualization_type", "none")
+    plot_path = viz_data.get("plot_path")
+    plot_params = viz_data.get("plot_parameters") or viz_data.get("chart_spec") or {}
+    viz_description = viz_data.get("description", "No visualization description provided.")
+
+    if plot_image is None and plot_path and plot_path.startswith(PLOT_REF_PREFIX):
+        plot_image = plot_cache.get(plot_path)
+    if visualization_type != "none" and plot_image is None and viz_data.get("chart_spec"):
+        try:
+            plot_image = render_chart_from_spec(viz_data, analyst_findings or "")
+        except ValueError as e:
+            st.error(f"Visualization Error: could not render the chart spec: {e}")
+            st.info(f"Visualizer's description: {viz_description}")
+            return f"Analyst findings displayed. Chart spec could not be rendered: {e}"
+
+    if visualization_type != "none" and (plot_image or plot_path):
+        if plot_image or os.path.exists(plot_path):
+            st.markdown(f"**{plot_params.get('title', 'Visualization')}**")
+            st.markdown(f"*{viz_description}*")
+            st.image(plot_image or plot_path) # Display the image bytes or the image from the file path
+            return "Analyst findings and visualization image rendered successfully in Streamlit."
+        else:
+            st.error(f"Visualization Error: Plot image file not found at path: {plot_path}. The Visualizer may have failed to save it.")
+            st.info(f"Visualizer's description: {viz_description}") # Show why it thought it succeeded or failed
+            return f"Analyst findings displayed. Visualization image not found at {plot_path}."
+    else:
+        st.info(f"Visualization not generated or not applicable: {viz_description}")
+        return f"Analyst findings displayed. Visualization not applicable or path missing: {viz_description}"
+
+
+def render_report(analyst_findings: str, visualizer_json_output: str, plot_image: bytes = None) -> str:
+    """Renders analyst findings and a visualization in Streamlit."""
+    try:
+        render_analyst_findings(analyst_findings)
+        return render_visualization(visualizer_json_output, plot_image, analyst_findings)
+    except Exception as e_main:
+        st.error(f"An critical error occurred in the Streamlit Reporter Tool: {e_main}")
+        return f"Critical error in Streamlit Reporter Tool: {e_main}"
+
 
 class StreamlitReporterTool(BaseTool):
     name: str = "Streamlit Report Finalizer"
     description: str = (
         "Takes textual analysis findings from the Data Analyst and a JSON output from the "
-        "Data Visualizer. The Visualizer's JSON contains Python code defining a plotting function, "
-        "the data for the plot, and plot parameters. This tool displays the analyst's findings, "
-        "then executes the plotting function with the provided data and parameters, "
-        "and renders the resulting Matplotlib Figure in Streamlit using st.pyplot(). "
+        "Data Visualizer. The Visualizer's JSON contains a declarative chart spec over the "
+        "analyst's CSV data. This tool displays the analyst's findings, then renders the "
+        "chart described by the spec in Streamlit. "
         "Returns a confirmation message or error details."
     )
 
@@ -22,90 +178,12 @@ class StreamlitReporterTool(BaseTool):
         """
         Renders analyst findings and a visualization in Streamlit.
         """
-        try:
-            # --- 1. Display Analyst's Findings (with improved table parsing) ---
-            st.subheader("Analytical Insights")
-            parts = analyst_findings.split("```text")
-            st.markdown(parts[0])
-            if len(parts) > 1:
-                for i in range(1, len(parts)):
-                    block_content = parts[i]
-                    table_and_after = block_content.split("```", 1)
-                    table_string_data = table_and_after[0].strip()
-                    text_after_current_table = table_and_after[1].strip() if len(table_and_after) > 1 else None
-                    if table_string_data:
-                        try:
-                            lines = table_string_data.split('\n')
-                            if not lines or not any(line.strip() for line in lines):
-                                st.markdown("##### Data Table (Raw Text - Block was empty):")
-                                st.text("(Table block was empty or whitespace only)")
-                            else:
-                                # Basic heuristic for header, can be improved
-                                header_line_index = 0
-                                for idx, line_content in enumerate(lines):
-                                    if len(line_content.strip().split()) > 1: # Simple check for multiple words
-                                        header_line_index = idx
-                                        break
-                                data_to_parse_str = "\n".join(lines[header_line_index:])
-                                try:
-                                    df_from_text = pd.read_csv(io.StringIO(data_to_parse_str), delim_whitespace=True, on_bad_lines='skip')
-                                    if not df_from_text.empty:
-                                        st.markdown("##### Data Table (Attempted Parse):")
-                                        st.dataframe(df_from_text)
-                                    else:
-                                        st.markdown("##### Data Table (Raw Text - Parsed as empty):")
-                                        st.text(table_string_data)
-                                except Exception: # Broad exception for parsing issues
-                                    st.markdown("##### Data Table (Raw Text - Could not parse nicely):")
-                                    st.text(table_string_data)
-                        except Exception as e_table:
-                            st.warning(f"Could not process a text table from analyst: {e_table}")
-                            st.text(table_string_data) # Show raw if any error
-                    if text_after_current_table:
-                        st.markdown(text_after_current_table)
-            st.markdown("---")
-
-            # --- 2. Process and Render Visualization ---
-            st.subheader("Data Visualization")
-            st.subheader("Data Visualization")
-            try:
-                json_to_parse_viz = visualizer_json_output
-                if visualizer_json_output.startswith("```json"): # Strip markdown
-                    start_idx_viz = visualizer_json_output.find('{')
-                    end_idx_viz = visualizer_json_output.rfind('}')
-                    if start_idx_viz != -1 and end_idx_viz != -1 and end_idx_viz > start_idx_viz:
-                        json_to_parse_viz = visualizer_json_output[start_idx_viz : end_idx_viz+1]
-                    else:
-                        json_to_parse_viz = visualizer_json_output.replace("```json\n", "").replace("\n```", "").strip()
-                viz_data = json.loads(json_to_parse_viz)
-            except json.JSONDecodeError as e:
-                error_msg = f"Error: Could not decode JSON from Visualizer: {e}. Raw: {visualizer_json_output[:500]}..."
-                st.error(error_msg)
-                return error_msg
-
-            visualization_type = viz_data.get("visualization_type", "none")
-            plot_path = viz_data.get("plot_path")
-            plot_params = viz_data.get("plot_parameters", {})
-            viz_description = viz_data.get("description", "No visualization description provided.")
-
-            if visualization_type != "none" and plot_path:
-                if os.path.exists(plot_path):
-                    st.markdown(f"**{plot_params.get('title', 'Visualization')}**")
-                    st.markdown(f"*{viz_description}*")
-                    st.image(plot_path) # Display the image from the file path
-                    return "Analyst findings and visualization image rendered successfully in Streamlit."
-                else:
-                    st.error(f"Visualization Error: Plot image file not found at path: {plot_path}. The Visualizer may have failed to save it.")
-                    st.info(f"Visualizer's description: {viz_description}") # Show why it thought it succeeded or failed
-                    return f"Analyst findings displayed. Visualization image not found at {plot_path}."
-            else:
-                st.info(f"Visualization not generated or not applicable: {viz_description}")
-                return f"Analyst findings displayed. Visualization not applicable or path missing: {viz_description}"
-
-        except Exception as e_main:
-            st.error(f"An critical error occurred in the Streamlit Reporter Tool: {e_main}")
-            return f"Critical error in Streamlit Reporter Tool: {e_main}"
-           
+        with tracer.span(self.name, "tool", input_chars=len(analyst_findings) + len(visualizer_json_output)) as span:
+            status = render_report(analyst_findings, visualizer_json_output)
+            if status.startswith("Critical error"):
+                span.fail(status)
+            return status
+
 
 # To make it available for import:
 reporter_tool = StreamlitReporterTool()
\ No newline at end of file
@@ -1,46 +1,24 @@
-# tools/plotting_tool.py
-import os
-import time
-import io
-import contextlib
-import pandas as pd
-import numpy as np
-import matplotlib.pyplot as plt
-import seaborn as sns # If you want your visualizer to use it
-from crewai.tools import BaseTool
+# tools/visualization_tool.py
+from typing import Optional
 
-class PythonPlottingTool(BaseTool):
-    name: str = "Python Plotting Tool"
-    description: str = (
-        "Executes Python code using Matplotlib or Seaborn to generate and save a visualization as a PNG image file. "
-        "The provided Python code MUST include `plt.savefig(plot_path_to_save)`. "
-        "This tool provides `plot_path_to_save` and `analyst_data_str` to the code's execution scope. "
-        "Returns the file path to the saved plot upon success, or an error message string."
-    )
+from pydantic import ValidationError
 
-    def _run(self, python_plot_code: str, analyst_data_str: str) -> str:
-        try:
-            plots_dir = "plots" # Ensure this directory exists or is created by your app
-            os.makedirs(plots_dir, exist_ok=True)
-            timestamp = int(time.time() * 1000)
-            plot_filename = f"visualization_{timestamp}.png"
-            # Use absolute path for saving and returning
-            plot_path_to_save = os.path.abspath(os.path.join(plots_dir, plot_filename))
+from utils.chart_spec import ChartSpec
+from utils.render_service import render_service
+from utils.viz_intent import extract_visualization_csv
 
-            local_namespace = {
-                'pd': pd, 'np': np, 'plt': plt, 'sns': sns, 'io': io,
-                'analyst_data_str': analyst_data_str, # The CSV string from analyst
-                'plot_path_to_save': plot_path_to_save # Path where the code should save
-            }
-            plt.close('all') # Clear any previous plots
-            exec(python_plot_code, local_namespace)
 
-            if os.path.exists(plot_path_to_save):
-                return plot_path_to_save
-            else:
-                return (f"Error: Plotting code executed, but plot file not found at '{plot_path_to_save}'. "
-                        "Ensure `plt.savefig(plot_path_to_save)` was called.")
-        except Exception as e:
-            return f"Error executing plotting code: {str(e)}"
-
-python_plotting_tool = PythonPlottingTool() 
\ No newline at end of file
+def render_chart_from_spec(viz_data: dict, analyst_output: str) -> Optional[bytes]:
+    """
+    Renders the Visualizer's `chart_spec` over the CSV block of the analyst's output and
+    returns PNG bytes; identical spec and data are served from the plot cache.
+    Raises ValueError if the spec or the data cannot be used.
+    """
+    try:
+        spec = ChartSpec.model_validate(viz_data.get("chart_spec") or {})
+    except ValidationError as e:
+        raise ValueError(f"Invalid chart spec: {e}") from e
+    df = extract_visualization_csv(analyst_output)
+    if df is None:
+        raise ValueError("The analyst's output has no usable '=== DATA FOR VISUALIZATION (CSV) ===' block.")
+    return render_service.render(spec, df)
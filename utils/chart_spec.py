@@ -0,0 +1,163 @@
+# utils/chart_spec.py
+import io
+from typing import Literal, Optional
+
+import numpy as np
+import pandas as pd
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+from pydantic import BaseModel, Field
+
+from utils.schema_catalog import range_sort_key
+
+
+class ChartSpec(BaseModel):
+    """Declarative description of one chart over the analyst's CSV; replaces generated plotting code."""
+    chart_type: Literal["bar", "barh", "line", "area", "pie", "scatter"] = Field(description="Kind of chart")
+    x: str = Field(description="CSV column for categories / x axis")
+    y: Optional[str] = Field(default=None, description="Numeric CSV column (not needed with aggregation 'count')")
+    hue: Optional[str] = Field(default=None, description="Optional CSV column splitting the series")
+    aggregation: Literal["sum", "mean", "count", "none"] = Field(
+        default="sum", description="How rows sharing x (and hue) are combined")
+    sort: Literal["none", "x", "asc", "desc"] = Field(
+        default="none", description="'x' = natural order of x (ranges by lower bound), 'asc'/'desc' = by value")
+    top_n: Optional[int] = Field(default=None, ge=1, description="Keep only the N largest x categories")
+    stacked: bool = Field(default=False, description="Stack hue series instead of grouping them")
+    title: str = Field(default="", description="Chart title")
+    x_label: Optional[str] = Field(default=None, description="X axis label (defaults to x)")
+    y_label: Optional[str] = Field(default=None, description="Y axis label (defaults to y)")
+
+
+def _resolve_column(df: pd.DataFrame, name: Optional[str]) -> Optional[str]:
+    """Finds a column by exact name, else ignoring case and surrounding whitespace."""
+    if name is None or name in df.columns:
+        return name
+    wanted = name.strip().casefold()
+    for column in df.columns:
+        if str(column).strip().casefold() == wanted:
+            return column
+    raise ValueError(f"Column '{name}' is not in the data. Available columns: {list(df.columns)}")
+
+
+def _natural_order(values: pd.Series) -> pd.Series:
+    numeric = pd.to_numeric(values, errors="coerce")
+    if numeric.notna().all():
+        return numeric
+    return values.astype(str).map(range_sort_key)
+
+
+def prepare_data(spec: ChartSpec, df: pd.DataFrame) -> tuple:
+    """Applies the spec's aggregation, sort and top-N; returns (data, x, y, hue) column names."""
+    x, y, hue = (_resolve_column(df, c) for c in (spec.x, spec.y, spec.hue))
+    keys = [x] + ([hue] if hue else [])
+    if spec.aggregation == "count":
+        data = df.groupby(keys, observed=True, sort=False).size().reset_index(name="count")
+        y = "count"
+    else:
+        if y is None:
+            raise ValueError(f"Aggregation '{spec.aggregation}' needs a y column.")
+        data = df.assign(**{y: pd.to_numeric(df[y], errors="coerce")})
+        if spec.aggregation != "none":
+            data = data.groupby(keys, observed=True, sort=False)[y].agg(spec.aggregation).reset_index()
+
+    totals = data.groupby(x, observed=True, sort=False)[y].sum()
+    if spec.top_n is not None and len(totals) > spec.top_n:
+        keep = totals.nlargest(spec.top_n).index
+        data = data[data[x].isin(keep)]
+        totals = totals[totals.index.isin(keep)]
+    if spec.sort == "x":
+        order = totals.index[np.argsort(_natural_order(totals.index.to_series()).to_numpy(), kind="stable")]
+    elif spec.sort in ("asc", "desc"):
+        order = totals.sort_values(ascending=spec.sort == "asc", kind="stable").index
+    else:
+        order = totals.index
+    rank = pd.Series(np.arange(len(order)), index=order)
+    # astype: mapping a categorical column would keep sorting by its category codes
+    data = data.assign(_rank=data[x].map(rank).astype(float)).sort_values("_rank", kind="stable").drop(columns="_rank")
+    return data.reset_index(drop=True), x, y, hue
+
+
+def _plot_series(ax, spec: ChartSpec, pivot: pd.DataFrame):
+    """Draws one series per hue column of `pivot` (rows = x categories), grouped or stacked."""
+    positions = np.arange(len(pivot))
+    values = pivot.to_numpy(dtype=float)
+    names = [str(c).strip() for c in pivot.columns]
+    tick_labels = pivot.index.astype(str).str.strip()
+    if spec.chart_type in ("bar", "barh"):
+        draw = ax.bar if spec.chart_type == "bar" else ax.barh
+        offset_key = "bottom" if spec.chart_type == "bar" else "left"
+        if spec.stacked:
+            base = np.zeros(len(pivot))
+            for column, name in zip(values.T, names):
+                draw(positions, column, 0.8, **{offset_key: base}, label=name)
+                base = base + column
+        else:
+            width = 0.8 / len(names)
+            for i, (column, name) in enumerate(zip(values.T, names)):
+                draw(positions - 0.4 + width * (i + 0.5), column, width, label=name)
+        if spec.chart_type == "bar":
+            ax.set_xticks(positions, tick_labels)
+        else:
+            ax.set_yticks(positions, tick_labels)
+            ax.invert_yaxis()
+    elif spec.chart_type == "area":
+        ax.stackplot(positions, values.T, labels=names, alpha=0.8)
+        ax.set_xticks(positions, tick_labels)
+    else:
+        for column, name in zip(values.T, names):
+            ax.plot(positions, column, marker="o", label=name)
+        ax.set_xticks(positions, tick_labels)
+    ax.legend(title=str(pivot.columns.name).strip())
+
+
+def render_chart(spec: ChartSpec, df: pd.DataFrame) -> Figure:
+    """Builds the figure with the object-oriented API (no pyplot state, safe across threads)."""
+    data, x, y, hue = prepare_data(spec, df)
+    if data.empty:
+        raise ValueError("No rows left to plot after applying the chart spec.")
+    figure = Figure(figsize=(10, 5.5))
+    FigureCanvasAgg(figure)
+    ax = figure.add_subplot()
+    labels = data[x].astype(str).str.strip()
+
+    if spec.chart_type == "pie":
+        ax.pie(data[y], labels=labels, autopct="%1.1f%%", startangle=90, counterclock=False)
+        ax.axis("equal")
+    elif spec.chart_type == "scatter":
+        ax.scatter(data[x], data[y], c=pd.factorize(data[hue])[0] if hue else None)
+    elif hue:
+        pivot = data.pivot_table(index=x, columns=hue, values=y, aggfunc="sum", sort=False, observed=True)
+        pivot = pivot.reindex(data[x].drop_duplicates()).fillna(0)
+        _plot_series(ax, spec, pivot)
+        labels = pivot.index.astype(str).str.strip().to_series()
+    elif spec.chart_type == "bar":
+        ax.bar(labels, data[y])
+    elif spec.chart_type == "barh":
+        ax.barh(labels, data[y])
+        ax.invert_yaxis()
+    elif spec.chart_type == "line":
+        ax.plot(labels, data[y], marker="o")
+    else:
+        ax.fill_between(labels, data[y], alpha=0.6)
+
+    ax.set_title(spec.title)
+    if spec.chart_type != "pie":
+        x_label, y_label = spec.x_label or x, spec.y_label or y
+        ax.set_xlabel(y_label if spec.chart_type == "barh" else x_label)
+        ax.set_ylabel(x_label if spec.chart_type == "barh" else y_label)
+        if spec.chart_type != "barh" and (len(labels) > 6 or labels.str.len().max() > 10):
+            ax.tick_params(axis="x", labelrotation=45)
+            for label in ax.get_xticklabels():
+                label.set_horizontalalignment("right")
+    figure.tight_layout()
+    return figure
+
+
+def figure_to_png(figure: Figure) -> bytes:
+    buffer = io.BytesIO()
+    figure.savefig(buffer, format="png")
+    return buffer.getvalue()
+
+
+def render_chart_png(spec: ChartSpec, df: pd.DataFrame) -> bytes:
+    return figure_to_png(render_chart(spec, df))
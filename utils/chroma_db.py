@@ -1,49 +1,121 @@
 # utils/chroma_db.py
+import hashlib
+import re
+import threading
+
 import chromadb
+import numpy as np
+from chromadb import Documents, EmbeddingFunction, Embeddings
 from chromadb.utils import embedding_functions
-from config import config  
+from utils.config import config
+
+
+class HashingEmbeddingFunction(EmbeddingFunction):
+    """
+    Offline stand-in for a sentence embedder: word and character n-grams hashed into a
+    fixed-size, L2-normalised vector. Needs no model download, so it works on air-gapped
+    machines and in tests; near-duplicate phrasings still land close together.
+    """
+
+    def __init__(self, dimensions: int = 512):
+        self.dimensions = dimensions
+
+    @staticmethod
+    def name() -> str:
+        return "noipa-hashing"
+
+    def _features(self, text: str) -> list:
+        words = re.findall(r"\w+", text.casefold())
+        features = list(words) + [" ".join(pair) for pair in zip(words, words[1:])]
+        for word in words:
+            padded = f" {word} "
+            features.extend(padded[i:i + 3] for i in range(len(padded) - 2))
+        return features
+
+    def __call__(self, input: Documents) -> Embeddings:
+        embeddings = []
+        for text in input:
+            vector = np.zeros(self.dimensions, dtype=np.float32)
+            for feature in self._features(text):
+                digest = hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest()
+                index = int.from_bytes(digest[:4], "little") % self.dimensions
+                vector[index] += 1.0 if digest[4] & 1 else -1.0
+            norm = np.linalg.norm(vector)
+            embeddings.append(vector / norm if norm else vector)
+        return embeddings
+
+
+def make_embedding_function(backend: str = None):
+    """Builds the embedder named by EMBEDDING_BACKEND: 'sentence-transformers' or 'hashing'."""
+    backend = backend or config.EMBEDDING_BACKEND
+    if backend == "hashing":
+        return HashingEmbeddingFunction()
+    return embedding_functions.SentenceTransformerEmbeddingFunction(
+        model_name=config.EMBEDDING_MODEL_NAME
+    )
+
 
 class ChromaManager:
-    def __init__(self):
-        self.client = chromadb.PersistentClient(path=config.CHROMA_DB_PATH)
+    def __init__(self, embedding_function=None, path: str = None):
+        self.client = chromadb.PersistentClient(path=path or config.CHROMA_DB_PATH)
 
-        self.embedding_function = embedding_functions.SentenceTransformerEmbeddingFunction(
-            model_name=config.EMBEDDING_MODEL_NAME
-        )
-        self.collection = None 
+        self.embedding_function = embedding_function or make_embedding_function()
+        self.collection = None
+        self._collections = {}
 
     def get_or_create_collection(self, collection_name: str = config.CHROMA_COLLECTION_NAME):
         """Gets or creates a ChromaDB collection."""
-        if self.collection is None:
-            self.collection = self.client.get_or_create_collection(
+        if collection_name not in self._collections:
+            self._collections[collection_name] = self.client.get_or_create_collection(
                 name=collection_name,
                 embedding_function=self.embedding_function,
                 metadata={"hnsw:space": "cosine"}
             )
+        self.collection = self._collections[collection_name]
         return self.collection
 
-    def add_data(self, documents: list[str], ids: list[str]):
-        """Adds data to the ChromaDB collection."""
+    def add_data(self, documents: list[str], ids: list[str], metadatas: list[dict] = None):
+        """Adds (or replaces) data in the ChromaDB collection in a single batch."""
         if self.collection is None:
              raise ValueError("Collection must be initialized before adding data. Call get_or_create_collection first.")
-        self.collection.add(
+        self.collection.upsert(
             documents=documents,
-            ids=ids
+            ids=ids,
+            metadatas=metadatas
         )
 
-    def query_data(self, query_texts: list[str], n_results: int = 1):
+    def query_data(self, query_texts: list[str], n_results: int = 1, where: dict = None):
         """Queries the ChromaDB collection."""
         if self.collection is None:
             raise ValueError("Collection must be initialized before querying data. Call get_or_create_collection first.")
         results = self.collection.query(
             query_texts=query_texts,
-            n_results=n_results
+            n_results=n_results,
+            where=where
         )
         return results
 
+    def delete_data(self, ids: list[str] = None, where: dict = None):
+        """Deletes entries by id or metadata filter."""
+        if self.collection is None:
+            raise ValueError("Collection must be initialized before deleting data. Call get_or_create_collection first.")
+        self.collection.delete(ids=ids, where=where)
+
 
 # Get the embedding model name from the configuration - Moved
 embedding_model_name = config.EMBEDDING_MODEL_NAME
 
+_manager = None
+_manager_lock = threading.Lock()
+
 
-chroma_manager = ChromaManager()
\ No newline at end of file
+def get_chroma_manager() -> ChromaManager:
+    """
+    Returns the process-wide manager. The database is opened and the embedder loaded (a
+    model download with sentence-transformers) on first use, not when this module is imported.
+    """
+    global _manager
+    with _manager_lock:
+        if _manager is None:
+            _manager = ChromaManager()
+        return _manager
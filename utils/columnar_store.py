@@ -0,0 +1,112 @@
+# utils/columnar_store.py
+import os
+import sys
+
+import pandas as pd
+import pyarrow as pa
+
+from utils.config import config
+
+COMPILED_SUFFIX = ".arrow"
+# String columns whose distinct/total ratio is below this are dictionary-encoded.
+DICTIONARY_MAX_RATIO = 0.5
+
+
+def compiled_path(csv_path: str) -> str:
+    """Returns where the compiled form of a CSV lives, e.g. data/compiled/STIPENDI.arrow."""
+    directory = config.COMPILED_DATA_DIR or os.path.join(os.path.dirname(os.path.abspath(csv_path)), "compiled")
+    name = os.path.splitext(os.path.basename(csv_path))[0]
+    return os.path.join(directory, name + COMPILED_SUFFIX)
+
+
+def is_fresh(csv_path: str) -> bool:
+    """True if a compiled file exists and is at least as new as its CSV."""
+    target = compiled_path(csv_path)
+    return os.path.exists(target) and os.path.getmtime(target) >= os.path.getmtime(csv_path)
+
+
+def _to_table(df: pd.DataFrame) -> pa.Table:
+    df = df.copy()
+    for column in df.columns:
+        if df[column].dtype == object and df[column].nunique() <= DICTIONARY_MAX_RATIO * len(df):
+            df[column] = df[column].astype("category")
+    return pa.Table.from_pandas(df, preserve_index=False)
+
+
+def write_arrow(df: pd.DataFrame, target: str) -> str:
+    """Writes a frame as an uncompressed Arrow IPC file and returns its path."""
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    table = _to_table(df)
+    # Write next to the target and rename, so concurrent readers never see a partial file.
+    tmp_path = f"{target}.{os.getpid()}.tmp"
+    with pa.OSFile(tmp_path, "wb") as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    os.replace(tmp_path, target)
+    return target
+
+
+def compile_dataset(csv_path: str) -> str:
+    """Compiles a CSV, and its pre-aggregated cube, into Arrow files; returns the dataset's path."""
+    from utils.cube import compile_cube
+    from utils.ingestion import read_dataset_csv
+
+    df = read_dataset_csv(csv_path)
+    target = write_arrow(df, compiled_path(csv_path))
+    compile_cube(csv_path, df)
+    return target
+
+
+def _decode_dictionaries(table: pa.Table) -> pa.Table:
+    for index, field in enumerate(table.schema):
+        if pa.types.is_dictionary(field.type):
+            table = table.set_column(index, field.name, table.column(index).cast(field.type.value_type))
+    return table
+
+
+def load_compiled(path: str, categorical: bool = False) -> pd.DataFrame:
+    """
+    Loads a compiled file through a memory map. Numeric columns stay backed by the
+    mapped pages, which the OS shares between every process reading the same file.
+    Dictionary-encoded text comes back as plain strings, as pd.read_csv would return it;
+    `categorical=True` keeps pandas categoricals, for internal aggregations (cubes) only.
+    """
+    source = pa.memory_map(path, "r")
+    table = pa.ipc.open_file(source).read_all()
+    if not categorical:
+        table = _decode_dictionaries(table)
+    return table.to_pandas(split_blocks=True)
+
+
+def read_csv_as_compiled(csv_path: str) -> pd.DataFrame:
+    """Reads a dataset CSV with the same types as its compiled form (plain text, nullable bounds)."""
+    from utils.cube import plain_dimensions
+    from utils.ingestion import read_dataset_csv
+
+    return plain_dimensions(read_dataset_csv(csv_path))
+
+
+def load_dataset(csv_path: str) -> pd.DataFrame:
+    """Loads a dataset, preferring its compiled form when it is fresher than the CSV."""
+    if not is_fresh(csv_path):
+        if not config.COMPILE_DATA_ON_LOAD:
+            return read_csv_as_compiled(csv_path)
+        try:
+            compile_dataset(csv_path)
+        except OSError:
+            # e.g. a read-only data directory: serve the CSV rather than failing the query
+            return read_csv_as_compiled(csv_path)
+    return load_compiled(compiled_path(csv_path))
+
+
+def compile_all(paths=None) -> list:
+    """Compiles every configured dataset whose compiled form is missing or stale."""
+    paths = paths or [p for p in config.AVAILABLE_DATA_PATHS.values() if p]
+    return [compile_dataset(p) for p in paths if not is_fresh(p)]
+
+
+if __name__ == "__main__":
+    compiled = compile_all(sys.argv[1:])
+    print(f"Compiled {len(compiled)} dataset(s).")
+    for path in compiled:
+        print(f"  {path}")
@@ -10,7 +10,6 @@ class Config:
     """Configuration settings for the CrewAI project."""
     GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
     MEMO_API_KEY = os.getenv("MEMO_API_KEY")
-    CHROMA_DB_PATH = os.getenv("CHROMA_DB_PATH", "my_chroma_db")  # Provide a default
     CHROMA_COLLECTION_NAME = os.getenv("CHROMA_COLLECTION_NAME", "my_crew_collection")  # Provide a default
 
     AVAILABLE_DATA_PATHS = {
@@ -20,12 +19,114 @@ class Config:
         'STIPENDI.csv': os.getenv("STIPENDI")
     }
 
+    # Compiled (Arrow) copies of the data files; defaults to a 'compiled' folder next to each CSV.
+    COMPILED_DATA_DIR = os.getenv("COMPILED_DATA_DIR", "")
+    COMPILE_DATA_ON_LOAD = os.getenv("COMPILE_DATA_ON_LOAD", "true").lower() == "true"
+
+    # Monthly NoiPA extracts that utils/ingestion.py cleans into the data files, and its checksum
+    # manifest; both default to next to the CSVs ('original' folder, 'manifest.json').
+    ORIGINAL_DATA_DIR = os.getenv("ORIGINAL_DATA_DIR", "")
+    INGEST_MANIFEST_PATH = os.getenv("INGEST_MANIFEST_PATH", "")
+    # One compiled file per dataset and month (default: a 'partitions' folder next to the CSVs);
+    # multi-month queries read this many partitions at a time.
+    PARTITIONED_DATA_DIR = os.getenv("PARTITIONED_DATA_DIR", "")
+    PARTITION_SCAN_WORKERS = int(os.getenv("PARTITION_SCAN_WORKERS", "4"))
+
+    # Sandbox worker pool for analysis code; 0 workers runs the code in-process.
+    SANDBOX_WORKERS = int(os.getenv("SANDBOX_WORKERS", "2"))
+    SANDBOX_TIMEOUT_SECONDS = float(os.getenv("SANDBOX_TIMEOUT_SECONDS", "60"))
+    SANDBOX_CPU_SECONDS = int(os.getenv("SANDBOX_CPU_SECONDS", "60"))
+    SANDBOX_MEMORY_MB = int(os.getenv("SANDBOX_MEMORY_MB", "2048"))
+
+    # Local caches (LLM responses, results, plots) live under this directory.
+    CACHE_DIR = os.getenv("CACHE_DIR", ".cache")
+    # Runtime Chroma database (semantic query cache), kept out of the source tree.
+    CHROMA_DB_PATH = os.getenv("CHROMA_DB_PATH", os.path.join(CACHE_DIR, "chroma"))
+
+    # Rendered charts, keyed by hash of (chart spec, data): memory LRU plus optional disk tier.
+    PLOT_CACHE_MAX_MEMORY_MB = int(os.getenv("PLOT_CACHE_MAX_MEMORY_MB", "64"))
+    PLOT_CACHE_DISK_ENABLED = os.getenv("PLOT_CACHE_DISK_ENABLED", "true").lower() == "true"
+    PLOT_CACHE_DIR = os.getenv("PLOT_CACHE_DIR", os.path.join(CACHE_DIR, "plots"))
+    PLOT_CACHE_MAX_DISK_MB = int(os.getenv("PLOT_CACHE_MAX_DISK_MB", "256"))
+
+    # Chart rendering pool ("thread" or "process") shared by all sessions.
+    RENDER_WORKERS = int(os.getenv("RENDER_WORKERS", "4"))
+    RENDER_EXECUTOR = os.getenv("RENDER_EXECUTOR", "thread").lower()
+    RENDER_TIMEOUT_SECONDS = float(os.getenv("RENDER_TIMEOUT_SECONDS", "30"))
+
+    # Result tables handed from the analysis sandbox to the reporter (Arrow IPC files).
+    TABLE_STORE_DIR = os.getenv("TABLE_STORE_DIR", os.path.join(CACHE_DIR, "tables"))
+    TABLE_STORE_MAX_MB = int(os.getenv("TABLE_STORE_MAX_MB", "256"))
+    TABLE_STORE_MAX_ROWS = int(os.getenv("TABLE_STORE_MAX_ROWS", "10000"))
+
+    LLM_MODEL = os.getenv("LLM_MODEL", "gemini/gemini-1.5-flash")
+    LLM_TEMPERATURE = float(os.getenv("LLM_TEMPERATURE", "0.1"))
+    # Stream tokens from the provider so the UI can show the analyst's text as it is written.
+    LLM_STREAM = os.getenv("LLM_STREAM", "true").lower() == "true"
+    # "live" calls the provider; "record" also appends every request/response to the cassette;
+    # "replay" answers only from the cassette (no network, no API key), for offline benchmarks.
+    LLM_MODE = os.getenv("LLM_MODE", "live").lower()
+    LLM_CASSETTE_PATH = os.getenv("LLM_CASSETTE_PATH", os.path.join(CACHE_DIR, "cassettes", "llm_cassette.jsonl"))
+    # Replay waits this multiple of the recorded latency (0 = answer immediately).
+    LLM_REPLAY_LATENCY_SCALE = float(os.getenv("LLM_REPLAY_LATENCY_SCALE", "0"))
+
+    # "direct" renders the report in Python from the analyst/visualizer outputs;
+    # "agent" runs the ReporterAgent task (one extra LLM round-trip per query).
+    REPORTER_MODE = os.getenv("REPORTER_MODE", "direct").lower()
+    # Decide locally (keywords + shape of the analyst's CSV) whether the visualizer task runs.
+    VISUALIZATION_CLASSIFIER_ENABLED = os.getenv("VISUALIZATION_CLASSIFIER_ENABLED", "true").lower() == "true"
+    LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "true").lower() == "true"
+    LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", os.path.join(CACHE_DIR, "llm_cache.sqlite3"))
+    LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "5000"))
+    LLM_CACHE_TTL_SECONDS = float(os.getenv("LLM_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+
+    # Pooled keep-alive HTTP client for LLM requests, shared by every session of the process.
+    LLM_HTTP_MAX_CONNECTIONS = int(os.getenv("LLM_HTTP_MAX_CONNECTIONS", "20"))
+    LLM_HTTP_KEEPALIVE_SECONDS = float(os.getenv("LLM_HTTP_KEEPALIVE_SECONDS", "120"))
+    LLM_HTTP_TIMEOUT_SECONDS = float(os.getenv("LLM_HTTP_TIMEOUT_SECONDS", "600"))
+
+    RESULT_CACHE_ENABLED = os.getenv("RESULT_CACHE_ENABLED", "true").lower() == "true"
+    RESULT_CACHE_PATH = os.getenv("RESULT_CACHE_PATH", os.path.join(CACHE_DIR, "result_cache.sqlite3"))
+    RESULT_CACHE_MAX_ENTRIES = int(os.getenv("RESULT_CACHE_MAX_ENTRIES", "500"))
+
     EMBEDDING_MODEL_NAME = os.getenv("EMBEDDING_MODEL_NAME", "all-MiniLM-L6-v2")  # default model
+    # 'sentence-transformers' (uses EMBEDDING_MODEL_NAME) or 'hashing' (fully offline, no model download)
+    EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "sentence-transformers")
+
+    # Semantic near-duplicate cache on top of the result cache (needs RESULT_CACHE_ENABLED).
+    SEMANTIC_CACHE_ENABLED = os.getenv("SEMANTIC_CACHE_ENABLED", "true").lower() == "true"
+    # Cosine similarity needed for a hit; the hashing embedder scores unrelated phrasings
+    # that share most words higher than the sentence model does, so it needs a stricter default.
+    SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD",
+                                               "0.95" if EMBEDDING_BACKEND == "hashing" else "0.9"))
+    # Nearest cached queries checked per lookup; the closest one may differ in a negation or value.
+    SEMANTIC_CACHE_CANDIDATES = int(os.getenv("SEMANTIC_CACHE_CANDIDATES", "4"))
+    SEMANTIC_CACHE_MAX_ENTRIES = int(os.getenv("SEMANTIC_CACHE_MAX_ENTRIES", "2000"))
+    SEMANTIC_CACHE_COLLECTION = os.getenv("SEMANTIC_CACHE_COLLECTION", "semantic_query_cache")
+
+    # Rule-based answers to templated aggregate questions, served from the cube without the crew.
+    FAST_PATH_ENABLED = os.getenv("FAST_PATH_ENABLED", "true").lower() == "true"
+    FAST_PATH_MIN_CONFIDENCE = float(os.getenv("FAST_PATH_MIN_CONFIDENCE", "0.75"))
+
+    # Background crew execution: the UI submits a job and polls it instead of blocking the script.
+    # 'thread' workers stream tokens and stages to the page; 'process' workers only report the result.
+    # With REPORTER_MODE=agent the reporter's Streamlit calls run on a worker and are not shown.
+    JOB_WORKERS = int(os.getenv("JOB_WORKERS", "4"))
+    JOB_EXECUTOR = os.getenv("JOB_EXECUTOR", "thread")
+    JOB_MAX_PER_USER = int(os.getenv("JOB_MAX_PER_USER", "2"))  # queued + running jobs per session
+    JOB_MAX_QUEUED = int(os.getenv("JOB_MAX_QUEUED", "50"))
+    JOB_RESULT_TTL_SECONDS = float(os.getenv("JOB_RESULT_TTL_SECONDS", "900"))
+    JOB_POLL_SECONDS = float(os.getenv("JOB_POLL_SECONDS", "1"))
+
+    # Structured per-query traces (crew, task, tool and LLM spans) written asynchronously as JSONL.
+    TRACING_ENABLED = os.getenv("TRACING_ENABLED", "true").lower() == "true"
+    TRACE_PATH = os.getenv("TRACE_PATH", os.path.join(CACHE_DIR, "traces", "traces.jsonl"))
+    TRACE_MAX_MB = int(os.getenv("TRACE_MAX_MB", "50"))
 
 
     def validate_config(self):
         """Validates that essential configuration variables are set."""
-        if not self.GOOGLE_API_KEY:
+        if not self.GOOGLE_API_KEY and self.LLM_MODE != "replay":
             raise ValueError("GOOGLE_API_KEY is not set in the environment.")
         if not all(self.AVAILABLE_DATA_PATHS.values()):
             raise ValueError("All data paths in AVAILABLE_DATA_PATHS must be set in the environment.")
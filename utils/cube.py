@@ -0,0 +1,151 @@
+# utils/cube.py
+import os
+import threading
+
+import pandas as pd
+
+from utils.columnar_store import compiled_path, load_compiled, write_arrow
+from utils.config import config
+from utils.data_cache import dataset_cache, dataset_name, file_signature
+
+# Low-cardinality dimensions pre-aggregated in the cube. Anything else
+# (comune, amministrazione, ...) is answered from the raw frame.
+CUBE_DIMENSIONS = [
+    "sesso", "fascia di età", "fascia_di_eta", "regione_residenza", "modalita_autenticazione",
+    "modalita_pagamento", "fascia di distanza", "stesso_comune", "fascia_di_reddito", "comparto",
+    "aliquota_max"
+]
+MEASURES = ["numero", "numerosita"]
+CUBE_SUFFIX = ".cube"
+# The month dimension of the partitioned history (see utils/partition_store.py).
+MONTH_COLUMN = "mese"
+
+
+def cube_path(csv_path: str) -> str:
+    """Returns where the pre-aggregated base cuboid of a CSV is stored."""
+    base, ext = os.path.splitext(compiled_path(csv_path))
+    return base + CUBE_SUFFIX + ext
+
+
+def build_base_cuboid(df: pd.DataFrame) -> pd.DataFrame:
+    """Sums the measure over every combination of the cube dimensions present in df."""
+    dimensions = [c for c in CUBE_DIMENSIONS if c in df.columns]
+    measure = next(c for c in MEASURES if c in df.columns)
+    return df.groupby(dimensions, observed=True, dropna=False)[measure].sum().reset_index()
+
+
+def compile_cube(csv_path: str, df: pd.DataFrame) -> str:
+    """Writes the base cuboid next to the compiled dataset; called at ingest time."""
+    return write_arrow(build_base_cuboid(df), cube_path(csv_path))
+
+
+def _apply_filters(df: pd.DataFrame, filters: dict) -> pd.DataFrame:
+    for column, value in filters.items():
+        values = value if isinstance(value, (list, tuple, set)) else [value]
+        wanted = {str(v).casefold() for v in values}
+        df = df[df[column].astype(str).str.casefold().isin(wanted)]
+    return df
+
+
+def plain_dimensions(result):
+    """
+    Returns a query result with categorical columns (kept inside the cubes for cheap
+    roll-ups) as plain text, like dfs[...], so analysis code can group and concatenate them.
+    """
+    if not isinstance(result, pd.DataFrame):
+        return result
+    categorical = [c for c in result.columns if isinstance(result[c].dtype, pd.CategoricalDtype)]
+    return result.astype({c: object for c in categorical}) if categorical else result
+
+
+def _aggregate(df: pd.DataFrame, by: list, filters: dict, measure: str):
+    df = _apply_filters(df, filters)
+    if not by:
+        return int(df[measure].sum())
+    return df.groupby(by, observed=True, dropna=False)[measure].sum().reset_index()
+
+
+class Cube:
+    """All roll-ups of one dataset's base cuboid, materialised on first use."""
+
+    def __init__(self, base: pd.DataFrame):
+        self.measure = next(c for c in MEASURES if c in base.columns)
+        self.dimensions = [c for c in base.columns if c != self.measure]
+        self._cuboids = {frozenset(self.dimensions): base}
+        self._lock = threading.Lock()
+
+    def cuboid(self, dimensions) -> pd.DataFrame:
+        key = frozenset(dimensions)
+        with self._lock:
+            if key not in self._cuboids:
+                base = self._cuboids[frozenset(self.dimensions)]
+                ordered = [c for c in self.dimensions if c in key]
+                if ordered:
+                    rolled = base.groupby(ordered, observed=True, dropna=False)[self.measure].sum().reset_index()
+                else:
+                    rolled = pd.DataFrame({self.measure: [base[self.measure].sum()]})
+                self._cuboids[key] = rolled
+            return self._cuboids[key]
+
+    def covers(self, columns) -> bool:
+        return set(columns) <= set(self.dimensions)
+
+
+class CubeStore:
+    """Process-wide cubes, rebuilt when the underlying data file changes."""
+
+    def __init__(self):
+        self._cubes = {}
+        self._lock = threading.Lock()
+
+    def _paths(self) -> dict:
+        return {dataset_name(p): p for p in config.AVAILABLE_DATA_PATHS.values() if p}
+
+    def _load_base(self, csv_path: str) -> pd.DataFrame:
+        path = cube_path(csv_path)
+        if os.path.exists(path) and os.path.getmtime(path) >= os.path.getmtime(csv_path):
+            return load_compiled(path, categorical=True)
+        return build_base_cuboid(dataset_cache.get(csv_path))
+
+    def get(self, name: str) -> Cube:
+        paths = self._paths()
+        key = dataset_name(name).upper()
+        if key not in paths:
+            raise KeyError(f"Unknown dataset '{name}'. Available: {', '.join(paths)}")
+        signature = file_signature(paths[key])
+        with self._lock:
+            entry = self._cubes.get(key)
+            if entry is None or entry[0] != signature:
+                entry = (signature, Cube(self._load_base(paths[key])))
+                self._cubes[key] = entry
+        return entry[1]
+
+    def query(self, dataset: str, by=None, filters=None, measure: str = None):
+        """
+        Sums the dataset's measure (`numero`, or `numerosita` for REDDITO) grouped by `by`
+        after applying `filters` ({column: value or list of values}, case-insensitive).
+        Answered from the cube when every column is a cube dimension, otherwise from the
+        raw frame. Returns a DataFrame, or an int total when `by` is empty.
+        Sums cover the latest month, unless 'mese' is in `by` or `filters`
+        (e.g. filters={'mese': '2025'} for every month of 2025).
+        """
+        by = [by] if isinstance(by, str) else list(by or [])
+        filters = dict(filters or {})
+        if MONTH_COLUMN in by or MONTH_COLUMN in filters:
+            # Over the monthly history instead of the latest month.
+            from utils.partition_store import partition_store
+            return partition_store.query(dataset, by, filters, measure)
+        cube = self.get(dataset)
+        measure = measure or cube.measure
+        columns = by + list(filters)
+        if measure == cube.measure and cube.covers(columns):
+            cuboid = cube.cuboid(columns)
+            if not filters:
+                # Exact cuboid hit: no aggregation left to do.
+                return plain_dimensions(cuboid[by + [measure]]) if by else int(cuboid[measure].iloc[0])
+            return plain_dimensions(_aggregate(cuboid, by, filters, measure))
+        return plain_dimensions(_aggregate(dataset_cache.frames(config.AVAILABLE_DATA_PATHS)[dataset], by, filters, measure))
+
+
+cube_store = CubeStore()
+cube = cube_store.query
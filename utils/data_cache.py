@@ -0,0 +1,135 @@
+# utils/data_cache.py
+import hashlib
+import os
+import threading
+from collections.abc import Mapping
+
+import pandas as pd
+
+from utils.columnar_store import COMPILED_SUFFIX, load_compiled, load_dataset
+
+
+def enable_copy_on_write():
+    """
+    Turns on pandas copy-on-write for this process. Call it once at startup of a process
+    that serves many queries: the cache then hands out shallow copies, and an in-place
+    edit copies the touched data first instead of changing the cached frame.
+    """
+    pd.set_option("mode.copy_on_write", True)
+
+
+def file_signature(path: str) -> tuple:
+    """Returns the (mtime_ns, size) pair used to detect changes to a data file."""
+    stat = os.stat(path)
+    return (stat.st_mtime_ns, stat.st_size)
+
+
+def data_version(paths=None) -> str:
+    """Returns a short fingerprint of the data files; it changes whenever any of them does."""
+    from utils.config import config
+
+    if paths is None:
+        from utils.partition_store import MANIFEST_NAME, partition_store
+
+        # Backfilled months change the partitions without touching the current data files.
+        manifest = os.path.join(partition_store.root, MANIFEST_NAME)
+        paths = list(config.AVAILABLE_DATA_PATHS.values()) + ([manifest] if os.path.exists(manifest) else [])
+    paths = paths.values() if isinstance(paths, Mapping) else paths
+    signatures = sorted((os.path.abspath(p), file_signature(p)) for p in paths if p)
+    return hashlib.sha1(repr(signatures).encode("utf-8")).hexdigest()[:16]
+
+
+def dataset_name(path: str) -> str:
+    """Maps a data file path to its dataset name, e.g. '.../STIPENDI.csv' -> 'STIPENDI'."""
+    return os.path.splitext(os.path.basename(path))[0]
+
+
+class DatasetCache:
+    """Process-wide cache of parsed data files, keyed on path, mtime and size."""
+
+    def __init__(self):
+        self._frames = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _load(self, path: str) -> pd.DataFrame:
+        if path.lower().endswith(".csv"):
+            return load_dataset(path)
+        if path.endswith(COMPILED_SUFFIX):
+            return load_compiled(path)
+        return pd.read_csv(path)
+
+    def get(self, path: str) -> pd.DataFrame:
+        """
+        Returns a private copy of the file's frame, parsing it only if it changed on disk.
+        The copy is shallow under copy-on-write, and deep otherwise so that in-place edits
+        by one query can never reach the cached frame seen by the next one.
+        """
+        path = os.path.abspath(path)
+        signature = file_signature(path)
+        with self._lock:
+            entry = self._frames.get(path)
+            if entry is not None and entry[0] == signature:
+                self.hits += 1
+            else:
+                self.misses += 1
+                entry = (signature, self._load(path))
+                self._frames[path] = entry
+        return entry[1].copy(deep=not pd.get_option("mode.copy_on_write"))
+
+    def read_csv(self, filepath_or_buffer, *args, **kwargs):
+        """Drop-in for pd.read_csv that serves plain reads of local files from the cache."""
+        if not args and not kwargs and isinstance(filepath_or_buffer, (str, os.PathLike)) \
+                and os.path.isfile(filepath_or_buffer):
+            return self.get(os.fspath(filepath_or_buffer))
+        return pd.read_csv(filepath_or_buffer, *args, **kwargs)
+
+    def frames(self, paths) -> "DatasetFrames":
+        """Returns a lazy mapping of dataset name to cached frame for the given paths."""
+        return DatasetFrames(self, paths)
+
+    def pandas(self) -> "CachedPandas":
+        """Returns a pandas stand-in whose read_csv goes through this cache."""
+        return CachedPandas(self)
+
+    def clear(self):
+        with self._lock:
+            self._frames.clear()
+
+
+class DatasetFrames(Mapping):
+    """Read-only mapping such as dfs['STIPENDI'] that loads each frame on first access."""
+
+    def __init__(self, cache: DatasetCache, paths):
+        self._cache = cache
+        paths = paths.values() if isinstance(paths, Mapping) else paths
+        self._paths = {dataset_name(p): p for p in paths if p}
+
+    def __getitem__(self, name: str) -> pd.DataFrame:
+        key = dataset_name(name).upper()
+        if key not in self._paths:
+            raise KeyError(f"Unknown dataset '{name}'. Available: {', '.join(self._paths)}")
+        return self._cache.get(self._paths[key])
+
+    def __iter__(self):
+        return iter(self._paths)
+
+    def __len__(self):
+        return len(self._paths)
+
+
+class CachedPandas:
+    """Stand-in for the pandas module exposed to executed analysis code."""
+
+    def __init__(self, cache: DatasetCache):
+        self._cache = cache
+
+    def __getattr__(self, name):
+        return getattr(pd, name)
+
+    def read_csv(self, *args, **kwargs):
+        return self._cache.read_csv(*args, **kwargs)
+
+
+dataset_cache = DatasetCache()
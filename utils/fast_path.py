@@ -0,0 +1,296 @@
+# utils/fast_path.py
+import json
+import re
+import threading
+
+import pandas as pd
+
+from utils.chart_spec import ChartSpec
+from utils.config import config
+from utils.cube import cube
+from utils.plot_cache import plot_key, plot_ref
+from utils.render_service import render_service
+from utils.result_cache import QueryResult, normalize_query
+from utils.schema_catalog import range_sort_key, schema_catalog
+from utils.table_store import table_ref, table_store
+from utils.viz_intent import VISUALIZATION_CSV_MARKER
+
+# Group-by dimensions: query phrases (already accent/case folded) -> candidate columns.
+DIMENSIONS = {
+    "age": (["fascia di eta", "fasce di eta", "classe di eta", "eta", "age group", "age groups", "age"],
+            ["fascia di età", "fascia_di_eta"]),
+    "region": (["regione", "regioni", "region", "regions"], ["regione_residenza"]),
+    "gender": (["sesso", "genere", "gender", "sex"], ["sesso"]),
+    "authentication": (["modalita di autenticazione", "metodo di autenticazione", "modalita di accesso",
+                        "metodo di accesso", "metodi di accesso", "autenticazione", "authentication method",
+                        "authentication", "access method", "login method"], ["modalita_autenticazione"]),
+    "payment": (["modalita di pagamento", "metodo di pagamento", "metodi di pagamento", "pagamento",
+                 "payment method", "payment methods", "payment"], ["modalita_pagamento"]),
+    "distance": (["fascia di distanza", "fasce di distanza", "distanza", "distance"], ["fascia di distanza"]),
+    "income": (["fascia di reddito", "fasce di reddito", "reddito", "income bracket", "income"],
+               ["fascia_di_reddito"]),
+    "sector": (["comparto", "comparti", "sector", "sectors"], ["comparto"]),
+}
+
+# Filter values not spelled like the data: phrase -> (column, value).
+VALUE_SYNONYMS = {
+    "donne": ("sesso", "F"), "femmine": ("sesso", "F"), "women": ("sesso", "F"), "female": ("sesso", "F"),
+    "uomini": ("sesso", "M"), "maschi": ("sesso", "M"), "men": ("sesso", "M"), "male": ("sesso", "M"),
+}
+
+# Words that make a query a count/distribution question.
+COUNT_WORDS = {
+    "quanti", "quante", "numero", "totale", "distribuzione", "ripartizione", "suddivisione", "conteggio",
+    "percentuale", "percentuali", "how", "many", "number", "count", "total", "distribution", "breakdown",
+    "split", "percentage", "share"
+}
+
+# Ratios of one group to another, comparisons and averages: the cube's sums cannot answer these.
+# Percentage words are only taken as "distribution" when nothing is filtered to a single value.
+RATIO_WORDS = {"percentuale", "percentuali", "quota", "rapporto", "proporzione", "percentage", "share",
+               "ratio", "proportion"}
+COMPARISON_WORDS = {
+    "rispetto", "confronto", "confronta", "confrontare", "differenza", "media", "medio", "crescita",
+    "aumento", "versus", "vs", "compared", "compare", "comparison", "difference", "average", "mean",
+    "growth", "increase",
+}
+
+# Negations and exclusions ('non usano SPID', 'fuori dalla Lombardia'): the cube only sums the
+# rows that match a value, so these are left to the analyst. Phrases are folded like queries
+# ("don't" -> 'don t'); the semantic cache uses the same list for its 'not' group.
+NEGATION_WORDS = {
+    "non", "senza", "tranne", "eccetto", "fuori", "infuori", "escluso", "esclusi", "escluse", "esclusa",
+    "escludendo", "nessun", "nessuno", "mai", "not", "no", "don t", "doesn t", "without", "except",
+    "excluding", "other than", "never", "nobody", "none",
+}
+
+# Words that point at one dataset when the dimensions alone are ambiguous.
+DATASET_HINTS = {
+    "AMMINISTRATI": {"accesso", "accedono", "accedere", "portale", "login", "access", "spid", "cie", "cns"},
+    "STIPENDI": {"stipendio", "stipendi", "accredito", "pagati", "salary", "salaries", "paid"},
+    "PENDOLARISMO": {"pendolari", "pendolarismo", "commute", "commuting", "commuters", "km"},
+    "REDDITO": {"reddito", "redditi", "aliquota", "income", "tax"},
+}
+DATASET_PRIORITY = ["AMMINISTRATI", "STIPENDI", "REDDITO", "PENDOLARISMO"]
+
+STOPWORDS = {
+    # Italian
+    "il", "lo", "la", "i", "gli", "le", "l", "un", "uno", "una", "di", "d", "del", "dello", "della", "dei",
+    "degli", "delle", "a", "al", "allo", "alla", "ai", "agli", "alle", "da", "dal", "dalla", "dai", "in",
+    "nel", "nella", "nei", "nelle", "negli", "con", "su", "per", "tra", "fra", "e", "ed", "o", "che", "chi",
+    "sono", "ci", "ce", "hanno", "ha", "usano", "usa", "utilizzano", "utilizza", "scelgono", "preferiscono",
+    "dipendenti", "amministrati", "lavoratori", "persone", "utenti", "personale", "mostra", "mostrami",
+    "dammi", "fammi", "vedere", "qual", "quale", "quali", "grafico", "visualizza", "tramite", "via",
+    "loro", "come", "sul", "sulla", "mi", "divisi", "suddivisi", "ripartiti",
+    # English
+    "the", "of", "by", "and", "or", "per", "to", "in", "on", "for", "with", "across", "each", "is", "are",
+    "do", "does", "use", "uses", "using", "used", "which", "what", "who", "there", "employees", "employee",
+    "users", "people", "staff", "workers", "show", "me", "give", "plot", "chart", "their", "many", "much",
+    "split", "broken", "down",
+}
+
+ITALIAN_MARKERS = {"quanti", "quante", "per", "di", "della", "dei", "distribuzione", "usano", "dipendenti",
+                   "regione", "eta", "sesso", "donne", "uomini"}
+
+
+def _contains(text: str, phrase: str) -> bool:
+    return re.search(rf"(?<!\w){re.escape(phrase)}(?!\w)", text) is not None
+
+
+def has_negation(query: str) -> bool:
+    """True if the query negates or excludes something ('non', 'fuori da', 'other than')."""
+    text = normalize_query(query).replace("'", " ")
+    return any(_contains(text, phrase) for phrase in NEGATION_WORDS)
+
+
+def _remove(text: str, phrase: str) -> str:
+    return re.sub(rf"(?<!\w){re.escape(phrase)}(?!\w)", " ", text)
+
+
+class Intent:
+    """A parsed aggregate question: dataset, group-by columns, filters and confidence."""
+
+    def __init__(self, dataset, by, filters, confidence, italian):
+        self.dataset = dataset
+        self.by = by
+        self.filters = filters
+        self.confidence = confidence
+        self.italian = italian
+
+
+class FastPathRouter:
+    """
+    Answers templated aggregate questions ("quanti dipendenti usano SPID in Lombardia?",
+    "distribution by age group") directly from the cube, without invoking the crew.
+    Anything it cannot fully account for is left to the analyst.
+    """
+
+    def __init__(self, min_confidence: float):
+        self.min_confidence = min_confidence
+        self.total = 0
+        self.served = 0
+        self._lock = threading.Lock()
+
+    def parse(self, query: str):
+        """Returns the Intent of a query, or None if it is not an aggregate question."""
+        text = normalize_query(query).replace("'", " ")
+        words = re.findall(r"\w+", text)
+        italian = len(ITALIAN_MARKERS.intersection(words)) >= 1
+        has_count_word = bool(COUNT_WORDS.intersection(words))
+
+        # Filters: dataset values (longest first, so 'libretto postale' wins over shorter overlaps).
+        filters, filter_datasets = {}, []
+        vocabulary = schema_catalog.vocabulary()
+        for value in sorted(vocabulary, key=len, reverse=True):
+            phrase = value.replace("'", " ")
+            if len(phrase) >= 3 and _contains(text, phrase):
+                uses = vocabulary[value]
+                for _, column, original in uses:
+                    filters.setdefault(column, set()).add(original)
+                filter_datasets.append({dataset for dataset, _, _ in uses})
+                text = _remove(text, phrase)
+        for phrase, (column, value) in VALUE_SYNONYMS.items():
+            if _contains(text, phrase):
+                filters.setdefault(column, set()).add(value)
+                text = _remove(text, phrase)
+
+        # Group-by dimensions.
+        dimensions = []
+        for name, (phrases, _) in DIMENSIONS.items():
+            for phrase in sorted(phrases, key=len, reverse=True):
+                if _contains(text, phrase):
+                    dimensions.append(name)
+                    text = _remove(text, phrase)
+                    break
+
+        if not (has_count_word or dimensions) or not (dimensions or filters):
+            return None
+        if COMPARISON_WORDS.intersection(words) or has_negation(query):
+            return None
+
+        remaining = re.findall(r"\w+", text)
+        hint_words = set().union(*DATASET_HINTS.values())
+        content = [w for w in remaining if w not in STOPWORDS and w not in COUNT_WORDS and w not in hint_words]
+        covered = len(re.findall(r"\w+", normalize_query(query))) - len(remaining)
+        confidence = covered / (covered + len(content)) if covered + len(content) else 0.0
+
+        # Datasets holding every requested column; hints break ties between them.
+        candidates = []
+        for dataset in DATASET_PRIORITY:
+            columns = self._columns(dataset)
+            if columns is None:
+                continue
+            by = [next((c for c in DIMENSIONS[d][1] if c in columns), None) for d in dimensions]
+            if None in by or any(column not in columns for column in filters) \
+                    or any(dataset not in datasets for datasets in filter_datasets):
+                continue
+            candidates.append((dataset, by))
+        # A dataset named by its nouns ('pendolari', 'stipendi') must be the one answering;
+        # a query naming several, or one without the requested columns, is left to the analyst.
+        named = {dataset for dataset, hints in DATASET_HINTS.items() if hints.intersection(words)}
+        if len(named) > 1:
+            return None
+        if named:
+            candidates = [c for c in candidates if c[0] in named]
+        if not candidates:
+            return None
+        if not named and len(candidates) > 1:
+            confidence *= 0.9  # several datasets could answer; the most general one is used
+
+        dataset, by = candidates[0]
+        # A column filtered to a single value carries no information as a group-by; one
+        # filtered to several values ('uomini e donne') is answered per value.
+        by = [c for c in by if len(filters.get(c, ())) != 1]
+        by += [c for c, values in filters.items() if len(values) > 1 and c not in by]
+        if RATIO_WORDS.intersection(words) and (not by or any(len(v) == 1 for v in filters.values())):
+            return None  # e.g. 'percentuale di donne': a share of a subgroup, not a distribution
+        return Intent(dataset, by, {c: sorted(v) for c, v in filters.items()}, confidence, italian)
+
+    @staticmethod
+    def _columns(dataset: str):
+        entry = schema_catalog.get().get(dataset)
+        return None if entry is None else {column["name"] for column in entry["columns"]}
+
+    def answer(self, query: str):
+        """Returns a QueryResult answered directly from the data, or None to use the crew."""
+        intent = self.parse(query)
+        with self._lock:
+            self.total += 1
+        if intent is None or intent.confidence < self.min_confidence:
+            return None
+        result = cube(intent.dataset, by=intent.by, filters=intent.filters)
+        if isinstance(result, pd.DataFrame) and result.empty:
+            return None
+        with self._lock:
+            self.served += 1
+        return self._build_result(query, intent, result)
+
+    def fraction_served(self) -> float:
+        with self._lock:
+            return self.served / self.total if self.total else 0.0
+
+    def _build_result(self, query: str, intent: Intent, result) -> QueryResult:
+        measure = "numerosita" if intent.dataset == "REDDITO" else "numero"
+        filters_text = ", ".join(f"{c} = {' / '.join(v)}" for c, v in intent.filters.items())
+        if intent.italian:
+            lines = [f"**Risposta diretta** calcolata sul dataset {intent.dataset} (somma di `{measure}`)"
+                     + (f", filtri: {filters_text}." if filters_text else ".")]
+        else:
+            lines = [f"**Direct answer** computed on the {intent.dataset} dataset (sum of `{measure}`)"
+                     + (f", filters: {filters_text}." if filters_text else ".")]
+
+        if not isinstance(result, pd.DataFrame):
+            lines.append(f"\n{'Totale' if intent.italian else 'Total'}: **{result:,}**")
+            visualizer = {"visualization_type": "none", "plot_parameters": None,
+                          "description": "Single total, no chart needed.", "plot_path": None}
+            return QueryResult(query=query, analyst_output="\n".join(lines),
+                               visualizer_output=json.dumps(visualizer), plot_image=None)
+
+        table = self._order(result, intent.by, measure)
+        table["percentuale" if intent.italian else "percentage"] = (100 * table[measure] / table[measure].sum()).round(2)
+        top = table.sort_values(measure, ascending=False).iloc[0]
+        label = " / ".join(str(top[c]).strip() for c in intent.by)
+        share = top.iloc[-1]
+        lines.append("")
+        table_id = table_store.put(table)
+        lines.append(table_ref(table_id) if table_id else self._markdown(table))
+        lines.append("")
+        lines.append(f"{'Il gruppo più numeroso è' if intent.italian else 'The largest group is'} "
+                     f"**{label}** ({top[measure]:,}, {share}%).")
+        lines.append("\n" + VISUALIZATION_CSV_MARKER)
+        lines.append(table.to_csv(index=False))
+
+        title = f"{measure} by {' and '.join(intent.by)}" + (f" ({filters_text})" if filters_text else "")
+        spec = ChartSpec(chart_type="bar", x=intent.by[0], y=measure,
+                         hue=intent.by[1] if len(intent.by) > 1 else None, aggregation="sum",
+                         sort="x" if intent.by[0].startswith("fascia") else "desc", title=title)
+        visualizer = {
+            "visualization_type": spec.chart_type,
+            "chart_spec": spec.model_dump(),
+            "description": f"{measure} per {' / '.join(intent.by)} from {intent.dataset}.",
+            "plot_path": plot_ref(plot_key(spec, table)),
+        }
+        return QueryResult(query=query, analyst_output="\n".join(lines), visualizer_output=json.dumps(visualizer),
+                           plot_image=render_service.render(spec, table))
+
+    @staticmethod
+    def _order(table: pd.DataFrame, by: list, measure: str) -> pd.DataFrame:
+        """Range columns in their natural order, everything else by descending count."""
+        if by[0].startswith("fascia"):
+            keys = [table[c].astype(str).map(range_sort_key) for c in by]
+            table = table.assign(_order=keys[0]).sort_values("_order", kind="stable").drop(columns="_order")
+        else:
+            table = table.sort_values(measure, ascending=False)
+        return table.reset_index(drop=True)
+
+    @staticmethod
+    def _markdown(table: pd.DataFrame, max_rows: int = 15) -> str:
+        shown = table.head(max_rows)
+        rows = ["| " + " | ".join(map(str, shown.columns)) + " |", "|" + "---|" * len(shown.columns)]
+        rows += ["| " + " | ".join(map(str, row)) + " |" for row in shown.itertuples(index=False)]
+        if len(table) > max_rows:
+            rows.append(f"\n... ({len(table) - max_rows} more rows not shown)")
+        return "\n".join(rows)
+
+
+fast_path_router = FastPathRouter(min_confidence=config.FAST_PATH_MIN_CONFIDENCE)
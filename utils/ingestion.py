@@ -0,0 +1,291 @@
+# utils/ingestion.py
+"""
+Builds the cleaned datasets from the monthly NoiPA extracts in data/original, replacing the
+cleaning notebooks. Every extract becomes a month partition (utils/partition_store.py); the
+newest one is also written to data/*.csv and their compiled Arrow files:
+
+    python -m utils.ingestion            # only extracts that changed
+    python -m utils.ingestion --force    # rebuild everything
+
+Range columns keep their labels ('25-34', ' -5km', ...) next to integer lower/upper
+bounds (empty upper bound = open-ended), and are ordered categoricals in the compiled files.
+
+Column names are not standardized: each dataset keeps the names its existing files use
+(only the renames in DATASETS are applied), so the age range is 'fascia di età' in three
+datasets and 'fascia_di_eta' in REDDITO, as the prompts, fast path and catalog expect.
+"""
+import argparse
+import glob
+import hashlib
+import json
+import os
+import re
+from datetime import datetime, timezone
+
+import pandas as pd
+
+from utils.config import config
+from utils.data_cache import dataset_name
+
+# Bump when the transformation changes, so every dataset is rebuilt once.
+PIPELINE_VERSION = 1
+
+# Extract file name: <prefix>_<YYYYMM>.csv
+EXTRACT_PATTERN = re.compile(r"^(?P<prefix>[A-Za-z]+)_(?P<month>\d{6})\.csv$")
+
+# How each extract becomes a dataset. A range is (label, lower bound, upper bound, source lower,
+# source upper, label suffix); the label is "<source lower>-<source upper><suffix>", as before.
+DATASETS = {
+    "AMMINISTRATI": {
+        "prefix": "EntryAccessoAmministrati",
+        "rename": {"regione_residenza_domicilio": "regione_residenza",
+                   "amministrazione_appartenenza": "amministrazione",
+                   "numero_occorrenze": "numero"},
+        "measure": "numero",
+        "ranges": [("fascia di età", "eta_min", "eta_max", "eta_min", "eta_max", "")],
+    },
+    "STIPENDI": {
+        "prefix": "EntryAccreditoStipendi",
+        "rename": {"comune_della_sede": "comune"},
+        "measure": "numero",
+        "ranges": [("fascia di età", "eta_min", "eta_max", "eta_min", "eta_max", "")],
+    },
+    "REDDITO": {
+        "prefix": "EntryAmministratiPerFasciaDiReddito",
+        "rename": {},
+        "measure": "numerosita",
+        "ranges": [("fascia_di_eta", "eta_min", "eta_max", "eta_min", "eta_max", ""),
+                   ("fascia_di_reddito", "reddito_min", "reddito_max", "fascia_reddito_min", "fascia_reddito_max", "")],
+        "percent": ["aliquota_max"],
+    },
+    "PENDOLARISMO": {
+        "prefix": "EntryPendolarismo",
+        "rename": {"comune_della_sede": "comune", "ente": "amministrazione", "numero_amministrati": "numero"},
+        "measure": "numero",
+        "ranges": [("fascia di distanza", "distanza_min_km", "distanza_max_km", "distance_min_KM", "distance_max_KM", "km")],
+    },
+}
+
+
+class IngestionError(ValueError):
+    """Raised when an extract does not validate; nothing is written for it."""
+
+
+def file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def original_dir() -> str:
+    if config.ORIGINAL_DATA_DIR:
+        return config.ORIGINAL_DATA_DIR
+    first = next(p for p in config.AVAILABLE_DATA_PATHS.values() if p)
+    return os.path.join(os.path.dirname(os.path.abspath(first)), "original")
+
+
+def manifest_path() -> str:
+    if config.INGEST_MANIFEST_PATH:
+        return config.INGEST_MANIFEST_PATH
+    first = next(p for p in config.AVAILABLE_DATA_PATHS.values() if p)
+    return os.path.join(os.path.dirname(os.path.abspath(first)), "manifest.json")
+
+
+def find_extracts(directory: str = None) -> dict:
+    """Maps dataset name -> {month: path} for every extract found."""
+    prefixes = {spec["prefix"]: name for name, spec in DATASETS.items()}
+    extracts = {}
+    for path in sorted(glob.glob(os.path.join(directory or original_dir(), "*.csv"))):
+        match = EXTRACT_PATTERN.match(os.path.basename(path))
+        if match and match.group("prefix") in prefixes:
+            extracts.setdefault(prefixes[match.group("prefix")], {})[match.group("month")] = path
+    return extracts
+
+
+def _bound(value: str):
+    match = re.search(r"\d+", value)
+    return int(match.group()) if match else None
+
+
+def range_categories(labels) -> list:
+    from utils.schema_catalog import range_sort_key  # schema_catalog loads the datasets
+
+    return sorted(set(labels), key=range_sort_key)
+
+
+def transform(name: str, raw: pd.DataFrame) -> pd.DataFrame:
+    """Turns one extract (read as text) into the cleaned dataset with typed bound columns."""
+    spec = DATASETS[name]
+    df = raw.copy()
+    for label, lower, upper, source_lower, source_upper, suffix in spec["ranges"]:
+        low, high = df.pop(source_lower).str.strip(), df.pop(source_upper).str.strip()
+        # Labels keep the extracts' spelling: a missing lower bound is 0 only in the income ranges.
+        low_text = low.where(low != "", "0" if name == "REDDITO" else " ")
+        high_text = high.where(high != "", " ")
+        df[label] = low_text + "-" + high_text + suffix
+        df[lower] = pd.array([_bound(v) if v else 0 for v in low], dtype="Int64")
+        df[upper] = pd.array([_bound(v) if v else None for v in high], dtype="Int64")
+    for column in spec.get("percent", []):
+        df[column] = df[column].str.strip() + "%"
+    df = df.rename(columns=spec["rename"])
+    df[spec["measure"]] = pd.to_numeric(df[spec["measure"]], errors="raise").astype("int64")
+    return df
+
+
+def apply_types(name: str, df: pd.DataFrame) -> pd.DataFrame:
+    """Range labels become ordered categoricals and bounds nullable integers (e.g. after a CSV read)."""
+    spec = DATASETS.get(name)
+    if spec is None:
+        return df
+    df = df.copy()
+    for label, lower, upper, *_ in spec["ranges"]:
+        if label in df.columns:
+            df[label] = pd.Categorical(df[label].astype(str), categories=range_categories(df[label].astype(str)),
+                                       ordered=True)
+        for column in (lower, upper):
+            if column in df.columns:
+                df[column] = df[column].astype("Int64")
+    return df
+
+
+def read_dataset_csv(csv_path: str) -> pd.DataFrame:
+    """Reads a cleaned dataset CSV with its types (labels as text, bounds as nullable ints)."""
+    df = pd.read_csv(csv_path, keep_default_na=False, na_values={"eta_max": [""], "reddito_max": [""],
+                                                                  "distanza_max_km": [""]})
+    return apply_types(dataset_name(csv_path), df)
+
+
+def validate(name: str, raw: pd.DataFrame, df: pd.DataFrame):
+    spec = DATASETS[name]
+    measure = spec["measure"]
+    problems = []
+    if len(df) != len(raw):
+        problems.append(f"{len(df)} rows, extract has {len(raw)}")
+    source_measure = next(source for source, target in spec["rename"].items() if target == measure) \
+        if measure not in raw.columns else measure
+    source_total = pd.to_numeric(raw[source_measure]).sum()
+    if df[measure].sum() != source_total:
+        problems.append(f"total {measure} {df[measure].sum()} != extract total {source_total}")
+    if (df[measure] < 0).any():
+        problems.append(f"negative {measure}")
+    bounds = {column for _, lower, upper, *_ in spec["ranges"] for column in (lower, upper)}
+    for column in df.columns:
+        if column not in bounds and df[column].astype(str).str.strip().eq("").any():
+            problems.append(f"empty values in '{column}'")
+    for label, lower, upper, *_ in spec["ranges"]:
+        if df[lower].isna().any():
+            problems.append(f"missing lower bound in '{label}'")
+        if (df[lower] > df[upper]).fillna(False).any():
+            problems.append(f"lower bound above upper bound in '{label}'")
+    if problems:
+        raise IngestionError(f"{name}: " + "; ".join(problems))
+
+
+def _write_csv(df: pd.DataFrame, target: str):
+    tmp_path = f"{target}.{os.getpid()}.tmp"
+    df.to_csv(tmp_path, index=False)
+    os.replace(tmp_path, target)
+
+
+def build_dataset(name: str, source: str) -> pd.DataFrame:
+    """Reads, transforms and validates one extract."""
+    raw = pd.read_csv(source, dtype=str, keep_default_na=False)
+    df = transform(name, raw)
+    validate(name, raw, df)
+    return df
+
+
+def _entry(name: str, source: str, df: pd.DataFrame, relative_to: str) -> dict:
+    return {
+        "source": os.path.relpath(source, relative_to),
+        "source_sha256": file_sha256(source),
+        "rows": len(df),
+        "total": int(df[DATASETS[name]["measure"]].sum()),
+        "pipeline_version": PIPELINE_VERSION,
+        "ingested_at": datetime.now(timezone.utc).isoformat(),
+    }
+
+
+def ingest_dataset(name: str, source: str, target: str) -> dict:
+    """Transforms, validates and writes one dataset (CSV, compiled Arrow and cube); returns its manifest entry."""
+    from utils.columnar_store import compiled_path, write_arrow
+    from utils.cube import compile_cube
+
+    df = build_dataset(name, source)
+    _write_csv(df, target)
+    typed = apply_types(name, df)
+    write_arrow(typed, compiled_path(target))
+    compile_cube(target, typed)
+    entry = _entry(name, source, df, os.path.dirname(os.path.abspath(target)))
+    entry["output_sha256"] = file_sha256(target)
+    return entry
+
+
+def load_manifest() -> dict:
+    try:
+        with open(manifest_path(), encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def ingest_partitions(force: bool = False) -> dict:
+    """Adds every extract as a month partition, skipping months already stored from the same file."""
+    from utils.partition_store import format_month, partition_store
+
+    stored = partition_store.manifest()
+    report = {}
+    for name, months in find_extracts().items():
+        for month, source in sorted(months.items()):
+            entry = stored.get(name, {}).get(format_month(month), {})
+            unchanged = (
+                entry.get("pipeline_version") == PIPELINE_VERSION
+                and entry.get("source_sha256") == file_sha256(source)
+                and os.path.exists(partition_store.partition_path(name, month))
+            )
+            if unchanged and not force:
+                continue
+            df = build_dataset(name, source)
+            entry = _entry(name, source, df, partition_store.root)
+            partition_store.write(name, month, apply_types(name, df), entry)
+            report[f"{name} {format_month(month)}"] = f"ingested {os.path.basename(source)} ({len(df)} rows)"
+    return report
+
+
+def ingest(force: bool = False) -> dict:
+    """Rebuilds the datasets whose newest extract, output or pipeline version changed; returns what ran."""
+    manifest = load_manifest()
+    extracts = find_extracts()
+    report = {}
+    for name in DATASETS:
+        target = config.AVAILABLE_DATA_PATHS.get(f"{name}.csv")
+        months = extracts.get(name)
+        if not target or not months:
+            report[name] = "no extract" if target else "no target path"
+            continue
+        month = max(months)
+        source = months[month]
+        entry = manifest.get(name, {})
+        unchanged = (
+            entry.get("pipeline_version") == PIPELINE_VERSION
+            and entry.get("source_sha256") == file_sha256(source)
+            and os.path.exists(target) and entry.get("output_sha256") == file_sha256(target)
+        )
+        if unchanged and not force:
+            report[name] = "unchanged"
+            continue
+        manifest[name] = dict(ingest_dataset(name, source, target), month=month)
+        report[name] = f"ingested {os.path.basename(source)} ({manifest[name]['rows']} rows)"
+    with open(manifest_path(), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2, ensure_ascii=False)
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the cleaned NoiPA datasets from the monthly extracts.")
+    parser.add_argument("--force", action="store_true", help="Rebuild even if nothing changed")
+    args = parser.parse_args()
+    for dataset, status in {**ingest_partitions(force=args.force), **ingest(force=args.force)}.items():
+        print(f"{dataset}: {status}")
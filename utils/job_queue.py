@@ -0,0 +1,220 @@
+# utils/job_queue.py
+import itertools
+import multiprocessing
+import threading
+import time
+import uuid
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import numpy as np
+
+from utils.config import config
+from utils.data_cache import data_version
+from utils.progress import PipelineProgress
+from utils.result_cache import ResultCache
+
+
+class JobRejected(Exception):
+    """Raised by JobQueue.submit when the queue is full or the user has too many active jobs."""
+
+
+def run_crew_job(query: str, progress: PipelineProgress = None):
+    """Default job runner; importable by name so it can also run in a worker process."""
+    from crew import run_crew  # crew imports crewai and the agents, only needed by the workers
+    return run_crew(query, progress)
+
+
+class Job:
+    """One submitted query: its status, timings, live progress and, once done, its QueryResult."""
+
+    def __init__(self, job_id: str, query: str, key: str, user: str):
+        self.id = job_id
+        self.query = query
+        self.key = key
+        self.users = {user}
+        self.status = "queued"  # queued -> running -> done | failed
+        self.submitted = time.time()
+        self.started = None
+        self.finished = None
+        self.result = None
+        self.error = None
+        self.progress = PipelineProgress()
+        self._done = threading.Event()
+
+    @property
+    def active(self) -> bool:
+        return self.status in ("queued", "running")
+
+    def wait_seconds(self):
+        return None if self.started is None else self.started - self.submitted
+
+    def run_seconds(self):
+        return None if self.finished is None or self.started is None else self.finished - self.started
+
+
+class JobQueue:
+    """
+    Runs crews in the background on a bounded worker pool. Callers submit a query, get a job
+    id back and poll the job. Identical in-flight queries (same normalized query, same data
+    version) share one job, each user may only have a few active jobs, and the queue depth
+    is capped; queue wait and run times are recorded per job.
+    """
+
+    def __init__(self, runner, workers: int, executor: str = "thread", max_per_user: int = 2,
+                 max_queued: int = 50, result_ttl: float = 900):
+        self.runner = runner
+        self.workers = workers
+        self.executor = executor
+        self.max_per_user = max_per_user
+        self.max_queued = max_queued
+        self.result_ttl = result_ttl
+        self.completed = 0
+        self.failed = 0
+        self.coalesced = 0
+        self.rejected = 0
+        self.wait_times = deque(maxlen=1000)
+        self.run_times = deque(maxlen=1000)
+        self._jobs = {}
+        self._in_flight = {}  # coalescing key -> active job
+        self._pending = deque()
+        self._running = 0
+        self._pool = None
+        self._ids = itertools.count(1)
+        # Re-entrant: a future that is already done runs its callback inside _dispatch.
+        self._lock = threading.RLock()
+
+    def _get_pool(self):
+        if self._pool is None:
+            if self.executor == "process":
+                method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+                self._pool = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context(method))
+            else:
+                self._pool = ThreadPoolExecutor(self.workers, thread_name_prefix="crew-job")
+        return self._pool
+
+    def submit(self, query: str, user: str) -> str:
+        """Queues `query` for `user` and returns the job id (an existing one if coalesced)."""
+        key = ResultCache.key(query, data_version())
+        with self._lock:
+            self._purge()
+            job = self._in_flight.get(key)
+            if job is not None:
+                if user not in job.users:
+                    job.users.add(user)
+                    self.coalesced += 1
+                return job.id
+            if sum(1 for job in self._in_flight.values() if user in job.users) >= self.max_per_user:
+                self.rejected += 1
+                raise JobRejected(f"You already have {self.max_per_user} questions being answered; wait for one to finish.")
+            if len(self._pending) >= self.max_queued:
+                self.rejected += 1
+                raise JobRejected("Too many questions are waiting; please try again in a minute.")
+            job = Job(f"{next(self._ids)}-{uuid.uuid4().hex[:8]}", query, key, user)
+            self._jobs[job.id] = job
+            self._in_flight[key] = job
+            self._pending.append(job)
+            self._dispatch()
+        return job.id
+
+    def _dispatch(self):
+        # Jobs wait here rather than inside the executor, so queue depth and position are known
+        # and a job's start time is when a worker actually picks it up.
+        while self._pending and self._running < self.workers:
+            job = self._pending.popleft()
+            job.status = "running"
+            job.started = time.time()
+            # Latencies are measured from here; the time spent queued is reported on its own.
+            job.progress.start(queue_wait=job.wait_seconds())
+            self._running += 1
+            if self.executor == "process":
+                future = self._get_pool().submit(self.runner, job.query)
+            else:
+                future = self._get_pool().submit(self.runner, job.query, job.progress)
+            future.add_done_callback(lambda future, job=job: self._finish(job, future))
+
+    def _finish(self, job: Job, future):
+        try:
+            job.result = future.result()
+            job.status = "done"
+        except Exception as e:
+            job.error = f"{type(e).__name__}: {e}"
+            job.status = "failed"
+        job.finished = time.time()
+        with self._lock:
+            self._running -= 1
+            if self._in_flight.get(job.key) is job:
+                del self._in_flight[job.key]
+            if job.status == "done":
+                self.completed += 1
+            else:
+                self.failed += 1
+            self.wait_times.append(job.wait_seconds())
+            self.run_times.append(job.run_seconds())
+            self._dispatch()
+        job._done.set()
+
+    def _purge(self):
+        cutoff = time.time() - self.result_ttl
+        for job_id in [job_id for job_id, job in self._jobs.items() if job.finished is not None and job.finished < cutoff]:
+            del self._jobs[job_id]
+
+    def get(self, job_id: str):
+        """Returns the job, or None if the id is unknown or its result has expired."""
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def position(self, job_id: str):
+        """1-based position of a queued job in the queue, or None if it is not waiting."""
+        with self._lock:
+            for position, job in enumerate(self._pending, start=1):
+                if job.id == job_id:
+                    return position
+        return None
+
+    def wait(self, job_id: str, timeout: float = None):
+        """Blocks until the job has finished (or `timeout` elapses) and returns it."""
+        job = self.get(job_id)
+        if job is not None:
+            job._done.wait(timeout)
+        return job
+
+    def metrics(self) -> dict:
+        with self._lock:
+            waits = np.array(self.wait_times)
+            runs = np.array(self.run_times)
+            # Include jobs still waiting, so a stuck queue shows up before anything finishes.
+            now = time.time()
+            current_waits = np.array([now - job.submitted for job in self._pending])
+            return {
+                "queue_depth": len(self._pending),
+                "running": self._running,
+                "completed": self.completed,
+                "failed": self.failed,
+                "coalesced": self.coalesced,
+                "rejected": self.rejected,
+                "wait_s_p50": float(np.percentile(waits, 50)) if len(waits) else None,
+                "wait_s_p95": float(np.percentile(waits, 95)) if len(waits) else None,
+                "oldest_wait_s": float(current_waits.max()) if len(current_waits) else None,
+                "run_s_p50": float(np.percentile(runs, 50)) if len(runs) else None,
+                "run_s_p95": float(np.percentile(runs, 95)) if len(runs) else None,
+            }
+
+    def shutdown(self):
+        with self._lock:
+            for job in self._pending:
+                del self._in_flight[job.key]
+            self._pending.clear()
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=True)
+
+
+job_queue = JobQueue(
+    runner=run_crew_job,
+    workers=config.JOB_WORKERS,
+    executor=config.JOB_EXECUTOR,
+    max_per_user=config.JOB_MAX_PER_USER,
+    max_queued=config.JOB_MAX_QUEUED,
+    result_ttl=config.JOB_RESULT_TTL_SECONDS
+)
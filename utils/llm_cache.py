@@ -0,0 +1,193 @@
+# utils/llm_cache.py
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+import httpx
+import litellm
+from crewai import LLM
+from litellm.llms.custom_httpx.http_handler import HTTPHandler
+
+from utils.config import config
+from utils.llm_cassette import CassetteLLM, LLMCassette
+from utils.tracing import record_llm_call, tracer
+
+
+class LLMResponseCache:
+    """
+    Content-addressed store of LLM responses in SQLite, with LRU eviction, a TTL and
+    hit/miss counters. Every thread gets its own connection and SQLite's locking makes
+    the file safe to share between concurrent sessions and Streamlit processes.
+    """
+
+    def __init__(self, path: str, max_entries: int, ttl_seconds: float):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        with self._connect() as connection:
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, model TEXT, response TEXT, created REAL, last_access REAL)"
+            )
+            connection.execute("CREATE INDEX IF NOT EXISTS responses_lru ON responses (last_access)")
+
+    def _connect(self) -> sqlite3.Connection:
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=30)
+            connection.execute("PRAGMA journal_mode=WAL")
+            self._local.connection = connection
+        return connection
+
+    @staticmethod
+    def key(model: str, temperature, messages, tools=None) -> str:
+        """Hashes everything that determines the response."""
+        payload = json.dumps(
+            {"model": model, "temperature": temperature, "messages": messages, "tools": tools},
+            sort_keys=True, default=str, ensure_ascii=False
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _count(self, hit: bool):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def get(self, key: str):
+        """Returns the cached response, or None on a miss or an expired entry."""
+        now = time.time()
+        with self._connect() as connection:
+            row = connection.execute("SELECT response, created FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is not None and self.ttl_seconds and now - row[1] > self.ttl_seconds:
+                connection.execute("DELETE FROM responses WHERE key = ?", (key,))
+                row = None
+            if row is not None:
+                connection.execute("UPDATE responses SET last_access = ? WHERE key = ?", (now, key))
+        self._count(row is not None)
+        return row[0] if row is not None else None
+
+    def put(self, key: str, model: str, response: str):
+        now = time.time()
+        with self._connect() as connection:
+            connection.execute(
+                "INSERT OR REPLACE INTO responses (key, model, response, created, last_access) VALUES (?, ?, ?, ?, ?)",
+                (key, model, response, now, now)
+            )
+            excess = connection.execute("SELECT COUNT(*) FROM responses").fetchone()[0] - self.max_entries
+            if excess > 0:
+                connection.execute(
+                    "DELETE FROM responses WHERE key IN "
+                    "(SELECT key FROM responses ORDER BY last_access ASC LIMIT ?)", (excess,)
+                )
+
+    def stats(self) -> dict:
+        with self._connect() as connection:
+            entries = connection.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        with self._lock:
+            total = self.hits + self.misses
+            return {"hits": self.hits, "misses": self.misses, "entries": entries,
+                    "hit_rate": self.hits / total if total else 0.0}
+
+    def clear(self):
+        with self._connect() as connection:
+            connection.execute("DELETE FROM responses")
+
+
+class CachedLLM(LLM):
+    """CrewAI LLM that answers repeated prompts from an LLMResponseCache."""
+
+    def __init__(self, *args, cache: LLMResponseCache = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.cache = cache
+
+    def call(self, messages, tools=None, callbacks=None, available_functions=None):
+        with tracer.span("llm", "llm") as span:
+            # Native function calls execute tools inside call(), so they must not be skipped.
+            if self.cache is None or available_functions:
+                response = super().call(messages, tools=tools, callbacks=callbacks, available_functions=available_functions)
+                record_llm_call(span, self.model, messages, response)
+                return response
+            key = self.cache.key(self.model, self.temperature, messages, tools)
+            cached = self.cache.get(key)
+            if cached is not None:
+                record_llm_call(span, self.model, messages, cached, cache_hit=True)
+                return cached
+            response = super().call(messages, tools=tools, callbacks=callbacks, available_functions=available_functions)
+            if isinstance(response, str) and response:
+                self.cache.put(key, self.model, response)
+            record_llm_call(span, self.model, messages, response)
+            return response
+
+
+llm_response_cache = LLMResponseCache(
+    path=config.LLM_CACHE_PATH,
+    max_entries=config.LLM_CACHE_MAX_ENTRIES,
+    ttl_seconds=config.LLM_CACHE_TTL_SECONDS
+) if config.LLM_CACHE_ENABLED else None
+
+# Providers whose litellm handler posts through a litellm HTTPHandler passed as `client=`
+# on each completion call (Gemini builds a fresh handler per call otherwise).
+HTTP_HANDLER_PROVIDERS = ("gemini/",)
+
+
+def make_http_client(transport: httpx.BaseTransport = None) -> HTTPHandler:
+    """
+    Builds the process-wide pooled HTTP client, so requests to the provider reuse warm
+    keep-alive connections instead of new handshakes. It is passed on every call for
+    HTTP_HANDLER_PROVIDERS (see llm_client_params) and installed as litellm's session,
+    which the OpenAI-compatible providers use.
+    """
+    client = httpx.Client(
+        limits=httpx.Limits(
+            max_connections=config.LLM_HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=config.LLM_HTTP_MAX_CONNECTIONS,
+            keepalive_expiry=config.LLM_HTTP_KEEPALIVE_SECONDS
+        ),
+        timeout=config.LLM_HTTP_TIMEOUT_SECONDS,
+        transport=transport
+    )
+    litellm.client_session = client
+    return HTTPHandler(timeout=config.LLM_HTTP_TIMEOUT_SECONDS, client=client)
+
+
+def llm_client_params(model: str, handler: HTTPHandler) -> dict:
+    """Extra LLM kwargs (forwarded by CrewAI to litellm.completion) that route calls through `handler`."""
+    return {"client": handler} if model.startswith(HTTP_HANDLER_PROVIDERS) else {}
+
+
+http_client = make_http_client()
+
+
+def make_shared_llm() -> LLM:
+    """The LLM used by every agent: live (with the response cache), or recording/replaying a cassette."""
+    settings = dict(
+        model=config.LLM_MODEL,
+        api_key=config.GOOGLE_API_KEY,
+        temperature=config.LLM_TEMPERATURE,
+        stream=config.LLM_STREAM,
+        **llm_client_params(config.LLM_MODEL, http_client)
+    )
+    if config.LLM_MODE in ("record", "replay"):
+        # The response cache stays out of the way: recorded latencies must be real provider calls.
+        return CassetteLLM(
+            cassette=LLMCassette(config.LLM_CASSETTE_PATH),
+            mode=config.LLM_MODE,
+            latency=config.LLM_REPLAY_LATENCY_SCALE,
+            **settings
+        )
+    return CachedLLM(cache=llm_response_cache, **settings)
+
+
+# One instance shared by the analyst, visualizer and reporter agents.
+shared_llm = make_shared_llm()
@@ -0,0 +1,129 @@
+# utils/llm_cassette.py
+import hashlib
+import json
+import os
+import threading
+import time
+from datetime import datetime, timezone
+
+from crewai import LLM
+
+from utils.tracing import record_llm_call, tracer
+
+
+class CassetteMiss(KeyError):
+    """Raised in replay mode when a request was never recorded."""
+
+
+class LLMCassette:
+    """
+    Recorded LLM request/response pairs, one JSON object per line. A request is keyed on
+    everything that determines its response (model, temperature, messages, tools); the same
+    request recorded several times is replayed in the recorded order.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self._entries = {}
+        self._replayed = {}
+        self._lock = threading.Lock()
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        entry = json.loads(line)
+                        self._entries.setdefault(entry["key"], []).append(entry)
+
+    @staticmethod
+    def key(model: str, temperature, messages, tools=None) -> str:
+        payload = json.dumps(
+            {"model": model, "temperature": temperature, "messages": messages, "tools": tools},
+            sort_keys=True, default=str, ensure_ascii=False
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def __len__(self):
+        return sum(len(entries) for entries in self._entries.values())
+
+    def record(self, key: str, model: str, messages, response: str, latency: float):
+        entry = {
+            "key": key,
+            "model": model,
+            "messages": messages,
+            "response": response,
+            "latency_s": latency,
+            "recorded_at": datetime.now(timezone.utc).isoformat(),
+        }
+        with self._lock:
+            self._entries.setdefault(key, []).append(entry)
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry, default=str, ensure_ascii=False) + "\n")
+
+    def play(self, key: str) -> dict:
+        """Returns the next recorded entry for `key` (the last one repeats once all were played)."""
+        with self._lock:
+            entries = self._entries.get(key)
+            if not entries:
+                self.misses += 1
+                raise CassetteMiss(f"No recorded LLM response for request {key[:12]} in {self.path}.")
+            index = self._replayed.get(key, 0)
+            self._replayed[key] = index + 1
+            self.hits += 1
+            return entries[min(index, len(entries) - 1)]
+
+    def rewind(self):
+        with self._lock:
+            self._replayed.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"entries": len(self), "hits": self.hits, "misses": self.misses}
+
+
+class CassetteLLM(LLM):
+    """
+    CrewAI LLM that records every call to an LLMCassette ("record") or answers from it
+    without touching the network ("replay"). Replay can reproduce the recorded latency
+    (scaled by `latency`, a float) or skip it (`latency=0`), and emits the response as
+    stream chunks when streaming is on, so the pipeline's timing hooks still fire.
+    """
+
+    def __init__(self, *args, cassette: LLMCassette = None, mode: str = "replay", latency: float = 1.0,
+                 stream_chunks: int = 20, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.cassette = cassette
+        self.mode = mode
+        self.latency = latency
+        self.stream_chunks = stream_chunks
+
+    def call(self, messages, tools=None, callbacks=None, available_functions=None):
+        key = self.cassette.key(self.model, self.temperature, messages, tools)
+        with tracer.span("llm", "llm", cassette=self.mode) as span:
+            if self.mode == "record":
+                start = time.perf_counter()
+                response = super().call(messages, tools=tools, callbacks=callbacks, available_functions=available_functions)
+                if isinstance(response, str):
+                    self.cassette.record(key, self.model, messages, response, time.perf_counter() - start)
+            else:
+                entry = self.cassette.play(key)
+                response = entry["response"]
+                self._replay(response, entry["latency_s"] * self.latency)
+            record_llm_call(span, self.model, messages, response)
+            return response
+
+    def _replay(self, response: str, delay: float):
+        if not self.stream:
+            if delay > 0:
+                time.sleep(delay)
+            return
+        from crewai.utilities.events import LLMStreamChunkEvent, crewai_event_bus
+
+        size = max(1, -(-len(response) // self.stream_chunks))
+        chunks = [response[i:i + size] for i in range(0, len(response), size)] or [""]
+        for chunk in chunks:
+            if delay > 0:
+                time.sleep(delay / len(chunks))
+            crewai_event_bus.emit(self, event=LLMStreamChunkEvent(chunk=chunk))
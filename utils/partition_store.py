@@ -0,0 +1,226 @@
+# utils/partition_store.py
+"""
+Month-partitioned history of the datasets: one compiled Arrow file per dataset and monthly
+NoiPA extract, written by utils/ingestion.py:
+
+    data/partitions/STIPENDI/mese=2025-01.arrow       (the cleaned extract plus a 'mese' column)
+    data/partitions/STIPENDI/mese=2025-01.cube.arrow  (its pre-aggregated cube)
+
+dfs[...] and AVAILABLE_DATA_PATHS keep serving the latest month; history() and cube(...)
+with 'mese' in `by` or `filters` read only the months asked for, several at a time.
+"""
+import json
+import os
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+from utils.columnar_store import load_compiled, write_arrow
+from utils.config import config
+from utils.cube import MONTH_COLUMN, Cube, _aggregate, build_base_cuboid, plain_dimensions
+from utils.data_cache import dataset_cache, dataset_name, file_signature
+
+PARTITION_PATTERN = re.compile(r"^mese=(?P<month>\d{4}-\d{2})\.arrow$")
+MANIFEST_NAME = "_manifest.json"
+
+
+def format_month(value) -> str:
+    """Normalizes '202501', 202501, '2025-1' or '2025-01' to '2025-01'; a bare year stays '2025'."""
+    text = str(value).strip()
+    match = re.fullmatch(r"(\d{4})-?(\d{1,2})", text)
+    if match and 1 <= int(match.group(2)) <= 12:
+        return f"{match.group(1)}-{int(match.group(2)):02d}"
+    if re.fullmatch(r"\d{4}", text):
+        return text
+    raise ValueError(f"Unrecognized month '{value}': use 'YYYY-MM' (or 'YYYY' for a whole year).")
+
+
+def select_months(available, wanted=None, since=None, until=None) -> list:
+    """The available months matching `wanted` (months or years) and within since..until."""
+    months = sorted(available)
+    if wanted is not None:
+        wanted = [wanted] if isinstance(wanted, (str, int)) else list(wanted)
+        keys = {format_month(w) for w in wanted}
+        months = [m for m in months if m in keys or m[:4] in keys]
+    if since is not None:
+        months = [m for m in months if m >= format_month(since)]
+    if until is not None:
+        until = format_month(until)
+        months = [m for m in months if m <= until or m[:4] == until]
+    return months
+
+
+class PartitionStore:
+    """Reads and writes the monthly partitions of each dataset."""
+
+    def __init__(self, root: str = None, workers: int = 4):
+        self._root = root
+        self.workers = workers
+        self._pool = None
+        self._cubes = {}
+        self._lock = threading.Lock()
+
+    @property
+    def root(self) -> str:
+        if self._root:
+            return self._root
+        first = next(p for p in config.AVAILABLE_DATA_PATHS.values() if p)
+        return os.path.join(os.path.dirname(os.path.abspath(first)), "partitions")
+
+    def _get_pool(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(self.workers, thread_name_prefix="partition")
+            return self._pool
+
+    def partition_path(self, dataset: str, month: str) -> str:
+        return os.path.join(self.root, dataset_name(dataset).upper(), f"{MONTH_COLUMN}={format_month(month)}.arrow")
+
+    def cube_path(self, dataset: str, month: str) -> str:
+        return os.path.splitext(self.partition_path(dataset, month))[0] + ".cube.arrow"
+
+    def _snapshot(self, dataset: str) -> dict:
+        """Without partitions, the current data file stands in as its month (from the ingestion manifest)."""
+        from utils.ingestion import load_manifest
+
+        path = config.AVAILABLE_DATA_PATHS.get(f"{dataset}.csv")
+        month = load_manifest().get(dataset, {}).get("month")
+        return {format_month(month): path} if path and month else {}
+
+    def partitions(self, dataset: str) -> dict:
+        """Maps month -> file for every stored month of a dataset."""
+        dataset = dataset_name(dataset).upper()
+        if dataset not in {dataset_name(p) for p in config.AVAILABLE_DATA_PATHS.values() if p}:
+            raise KeyError(f"Unknown dataset '{dataset}'.")
+        directory = os.path.join(self.root, dataset)
+        found = {}
+        if os.path.isdir(directory):
+            for entry in os.listdir(directory):
+                match = PARTITION_PATTERN.match(entry)
+                if match:
+                    found[match.group("month")] = os.path.join(directory, entry)
+        return found or self._snapshot(dataset)
+
+    def months(self, dataset: str) -> list:
+        return sorted(self.partitions(dataset))
+
+    # -- writing (ingestion) ----------------------------------------------------------------
+
+    def manifest(self) -> dict:
+        try:
+            with open(os.path.join(self.root, MANIFEST_NAME), encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+
+    def write(self, dataset: str, month: str, df: pd.DataFrame, entry: dict) -> str:
+        """Stores one month of a dataset (and its cube) and records `entry` in the manifest."""
+        month = format_month(month)
+        df = df.copy()
+        df.insert(0, MONTH_COLUMN, month)
+        target = write_arrow(df, self.partition_path(dataset, month))
+        write_arrow(build_base_cuboid(df), self.cube_path(dataset, month))
+        with self._lock:
+            manifest = self.manifest()
+            manifest.setdefault(dataset, {})[month] = entry
+            tmp_path = os.path.join(self.root, f"{MANIFEST_NAME}.{os.getpid()}.tmp")
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(manifest, f, indent=2, ensure_ascii=False)
+            os.replace(tmp_path, os.path.join(self.root, MANIFEST_NAME))
+        return target
+
+    # -- reading ----------------------------------------------------------------------------
+
+    def _load(self, path: str, month: str) -> pd.DataFrame:
+        df = dataset_cache.get(path)
+        if MONTH_COLUMN not in df.columns:
+            df.insert(0, MONTH_COLUMN, month)
+        return df
+
+    def _map(self, function, months: list) -> list:
+        """Runs function(month) for each month, in parallel when there are several."""
+        if len(months) <= 1:
+            return [function(m) for m in months]
+        return list(self._get_pool().map(function, months))
+
+    @staticmethod
+    def _concat(frames: list) -> pd.DataFrame:
+        # Frames come in month order; 'YYYY-MM' strings also sort chronologically.
+        df = pd.concat(frames, ignore_index=True)
+        if MONTH_COLUMN in df.columns:
+            df[MONTH_COLUMN] = df[MONTH_COLUMN].astype(str)
+        return df
+
+    def history(self, dataset: str, months=None, since=None, until=None) -> pd.DataFrame:
+        """
+        Rows of `dataset` for the selected months (default: all), with a 'mese' column
+        ('YYYY-MM'). `months` takes months or years, e.g. '2025-01', ['2025-01', '2025-02'] or '2025'.
+        """
+        partitions = self.partitions(dataset)
+        selected = select_months(partitions, months, since, until)
+        if not selected:
+            raise KeyError(f"No {dataset_name(dataset).upper()} data for the requested months. "
+                           f"Available: {', '.join(sorted(partitions)) or 'none'}")
+        return self._concat(self._map(lambda m: self._load(partitions[m], m), selected))
+
+    def _cube(self, dataset: str, month: str, path: str):
+        cube_file = self.cube_path(dataset, month)
+        source = cube_file if os.path.exists(cube_file) else path
+        key = (dataset, month)
+        signature = (source, file_signature(source))
+        with self._lock:
+            entry = self._cubes.get(key)
+        if entry is None or entry[0] != signature:
+            base = load_compiled(cube_file, categorical=True) if source == cube_file else build_base_cuboid(self._load(path, month))
+            entry = (signature, Cube(base))
+            with self._lock:
+                self._cubes[key] = entry
+        return entry[1]
+
+    def query(self, dataset: str, by=None, filters=None, measure: str = None, months=None):
+        """
+        cube(...) over several months: each selected partition is aggregated on its own
+        (from its cube when the columns allow), in parallel, and the results are combined.
+        Months are pruned with filters['mese'] or `months`; 'mese' can be grouped on like
+        any column. Returns a DataFrame, or an int total when `by` is empty.
+        """
+        dataset = dataset_name(dataset).upper()
+        by = [by] if isinstance(by, str) else list(by or [])
+        filters = dict(filters or {})
+        wanted = filters.pop(MONTH_COLUMN, months)
+        partitions = self.partitions(dataset)
+        selected = select_months(partitions, wanted)
+        if not selected:
+            raise KeyError(f"No {dataset} data for the requested months. Available: {', '.join(sorted(partitions))}")
+        partition_by = [c for c in by if c != MONTH_COLUMN]
+
+        def aggregate(month):
+            cube = self._cube(dataset, month, partitions[month])
+            column = measure or cube.measure
+            if column == cube.measure and cube.covers(partition_by + list(filters)):
+                frame = cube.cuboid(partition_by + list(filters))
+            else:
+                frame = self._load(partitions[month], month)
+            result = _aggregate(frame, partition_by, filters, column)
+            if not partition_by:
+                result = pd.DataFrame({column: [result]})
+            result.insert(0, MONTH_COLUMN, month)
+            return result
+
+        combined = self._concat(self._map(aggregate, selected))
+        column = combined.columns[-1]
+        if not by:
+            return int(combined[column].sum())
+        return plain_dimensions(combined.groupby(by, observed=True, dropna=False, sort=False)[column].sum().reset_index())
+
+    def shutdown(self):
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=True)
+                self._pool = None
+
+
+partition_store = PartitionStore(root=config.PARTITIONED_DATA_DIR or None, workers=config.PARTITION_SCAN_WORKERS)
+history = partition_store.history
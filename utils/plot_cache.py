@@ -0,0 +1,144 @@
+# utils/plot_cache.py
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+
+from utils.config import config
+
+PLOT_REF_PREFIX = "plot://"
+
+
+def plot_key(spec, df: pd.DataFrame) -> str:
+    """Content address of a chart: hash of the spec (pydantic model, dict or code string) and the data."""
+    digest = hashlib.sha256()
+    digest.update(spec.model_dump_json().encode("utf-8") if hasattr(spec, "model_dump_json") else str(spec).encode("utf-8"))
+    digest.update("\x1f".join(map(str, df.columns)).encode("utf-8"))
+    digest.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+def plot_ref(key: str) -> str:
+    return PLOT_REF_PREFIX + key
+
+
+class PlotCache:
+    """
+    Rendered PNGs keyed by content hash: an in-memory LRU bounded in bytes, backed by an
+    optional on-disk tier with its own size cap (least recently used files evicted first).
+    """
+
+    def __init__(self, max_memory_bytes: int, disk_dir: str = None, max_disk_bytes: int = 0):
+        self.max_memory_bytes = max_memory_bytes
+        self.disk_dir = disk_dir
+        self.max_disk_bytes = max_disk_bytes
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._memory = OrderedDict()
+        self._memory_bytes = 0
+        self._lock = threading.Lock()
+        self._key_locks = {}
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+
+    def _disk_path(self, key: str) -> str:
+        return os.path.join(self.disk_dir, f"{key}.png")
+
+    def _remember(self, key: str, image: bytes):
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                return
+            self._memory[key] = image
+            self._memory_bytes += len(image)
+            while self._memory_bytes > self.max_memory_bytes and len(self._memory) > 1:
+                _, evicted = self._memory.popitem(last=False)
+                self._memory_bytes -= len(evicted)
+
+    def get(self, key: str):
+        """Returns the PNG bytes for a key (or a plot:// reference), or None."""
+        key = key[len(PLOT_REF_PREFIX):] if key.startswith(PLOT_REF_PREFIX) else key
+        with self._lock:
+            image = self._memory.get(key)
+            if image is not None:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+                return image
+        if self.disk_dir:
+            path = self._disk_path(key)
+            try:
+                with open(path, "rb") as f:
+                    image = f.read()
+                os.utime(path)  # mtime doubles as last access for disk eviction
+            except OSError:
+                image = None
+            if image is not None:
+                self._remember(key, image)
+                with self._lock:
+                    self.disk_hits += 1
+                return image
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, key: str, image: bytes):
+        self._remember(key, image)
+        if self.disk_dir:
+            path = self._disk_path(key)
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(image)
+            os.replace(tmp_path, path)
+            self._evict_disk()
+
+    def get_or_render(self, key: str, render) -> bytes:
+        """Returns the cached PNG for key, calling render() once (per process) on a miss."""
+        image = self.get(key)
+        if image is not None:
+            return image
+        with self._lock:
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+        with key_lock:
+            # Another thread may have rendered the same chart while this one waited.
+            with self._lock:
+                image = self._memory.get(key)
+            if image is None:
+                image = render()
+                self.put(key, image)
+        with self._lock:
+            self._key_locks.pop(key, None)
+        return image
+
+    def _evict_disk(self):
+        entries = []
+        for entry in os.scandir(self.disk_dir):
+            if entry.name.endswith(".png"):
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_disk_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"memory_entries": len(self._memory), "memory_bytes": self._memory_bytes,
+                    "memory_hits": self.memory_hits, "disk_hits": self.disk_hits, "misses": self.misses}
+
+
+plot_cache = PlotCache(
+    max_memory_bytes=config.PLOT_CACHE_MAX_MEMORY_MB * 1024 * 1024,
+    disk_dir=config.PLOT_CACHE_DIR if config.PLOT_CACHE_DISK_ENABLED else None,
+    max_disk_bytes=config.PLOT_CACHE_MAX_DISK_MB * 1024 * 1024
+)
@@ -0,0 +1,111 @@
+# utils/progress.py
+import threading
+import time
+
+_active = threading.local()
+
+
+class PipelineProgress:
+    """
+    Timeline of one crew run: streamed LLM tokens and finished stages are forwarded to
+    callbacks as they happen, and the time to first token, time to first useful content
+    (the analyst's findings) and total latency are recorded separately, all measured from
+    start(); time spent waiting in a job queue before that is reported as queue_wait_s.
+    """
+
+    def __init__(self, on_stage=None, on_token=None, token_interval: float = 0.1):
+        self.on_stage = on_stage
+        self.on_token = on_token
+        self.token_interval = token_interval
+        self._last_token_update = 0.0
+        self.started = time.perf_counter()
+        self.queue_wait = None
+        self.first_token = None
+        self.first_content = None
+        self.finished = None
+        self.stage_times = {}
+        self.outputs = {}
+        self.streamed = []
+
+    def start(self, queue_wait: float = None):
+        """Restarts the clock when the run actually begins, e.g. when a queued job is picked up."""
+        self.started = time.perf_counter()
+        self.queue_wait = queue_wait
+
+    def _elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+    def token(self, chunk: str):
+        if self.first_token is None:
+            self.first_token = self._elapsed()
+        self.streamed.append(chunk)
+        # Redrawing on every chunk would flood the UI; refresh at most every token_interval.
+        now = time.perf_counter()
+        if self.on_token is not None and now - self._last_token_update >= self.token_interval:
+            self._last_token_update = now
+            self.on_token("".join(self.streamed))
+
+    def stage(self, name: str, output):
+        """Records a finished stage; `output` is its TaskOutput (or None if the stage was skipped)."""
+        self.stage_times[name] = self._elapsed()
+        self.outputs[name] = output.raw if output is not None else None
+        if self.first_content is None and output is not None:
+            self.first_content = self.stage_times[name]
+        self.streamed = []
+        if self.on_stage is not None:
+            self.on_stage(name, output)
+
+    def task_callback(self, name: str):
+        """A Task(callback=...) that reports the task's output as stage `name`."""
+        return lambda output: self.stage(name, output)
+
+    def streamed_text(self) -> str:
+        """The text streamed so far by the stage currently running."""
+        return "".join(self.streamed)
+
+    def finish(self):
+        self.finished = self._elapsed()
+
+    def metrics(self) -> dict:
+        return {
+            "queue_wait_s": self.queue_wait,
+            "time_to_first_token_s": self.first_token,
+            "time_to_first_content_s": self.first_content,
+            "total_s": self.finished,
+            "stages_s": dict(self.stage_times),
+        }
+
+    # Token events arrive on the thread running the crew; route them to its run.
+    def __enter__(self):
+        _active.progress = self
+        return self
+
+    def __exit__(self, *exc):
+        _active.progress = None
+        self.finish()
+        return False
+
+
+def active_progress():
+    return getattr(_active, "progress", None)
+
+
+_listener_installed = False
+_listener_lock = threading.Lock()
+
+
+def install_stream_listener():
+    """Subscribes once per process to CrewAI's LLM stream events and forwards chunks to the active run."""
+    global _listener_installed
+    with _listener_lock:
+        if _listener_installed:
+            return
+        from crewai.utilities.events import LLMStreamChunkEvent, crewai_event_bus
+
+        @crewai_event_bus.on(LLMStreamChunkEvent)
+        def _forward_chunk(source, event):
+            progress = active_progress()
+            if progress is not None:
+                progress.token(event.chunk)
+
+        _listener_installed = True
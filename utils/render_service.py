@@ -0,0 +1,101 @@
+# utils/render_service.py
+import multiprocessing
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from utils.chart_spec import ChartSpec, render_chart_png
+from utils.config import config
+from utils.plot_cache import PlotCache, plot_cache, plot_key
+from utils.tracing import tracer
+
+
+class RenderService:
+    """
+    Renders chart specs on a bounded pool, one private Agg Figure per render, so charts for
+    several sessions are drawn at the same time without sharing pyplot state. Results go
+    through the plot cache; latency (queue wait + render) is recorded per request.
+    """
+
+    def __init__(self, cache: PlotCache, workers: int, executor: str = "thread", timeout: float = 30):
+        self.cache = cache
+        self.workers = workers
+        self.executor = executor
+        self.timeout = timeout
+        self.renders = 0
+        self.failures = 0
+        self.in_flight = 0
+        self.latencies = deque(maxlen=1000)
+        self._pool = None
+        self._lock = threading.Lock()
+
+    def _get_pool(self):
+        with self._lock:
+            if self._pool is None:
+                if self.executor == "process":
+                    method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+                    self._pool = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context(method))
+                else:
+                    self._pool = ThreadPoolExecutor(self.workers, thread_name_prefix="render")
+            return self._pool
+
+    def _render_now(self, spec: ChartSpec, df: pd.DataFrame) -> bytes:
+        start = time.perf_counter()
+        with self._lock:
+            self.in_flight += 1
+        try:
+            image = self._get_pool().submit(render_chart_png, spec, df).result(timeout=self.timeout)
+        except Exception:
+            with self._lock:
+                self.failures += 1
+            raise
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+        with self._lock:
+            self.renders += 1
+            self.latencies.append(time.perf_counter() - start)
+        return image
+
+    def render(self, spec: ChartSpec, df: pd.DataFrame) -> bytes:
+        """Returns the chart's PNG bytes from the cache, rendering it on the pool on a miss."""
+        rendered = False
+
+        def render():
+            nonlocal rendered
+            rendered = True
+            return self._render_now(spec, df)
+
+        with tracer.span("render_chart", "render", chart_type=spec.chart_type, rows=len(df)) as span:
+            image = self.cache.get_or_render(plot_key(spec, df), render)
+            span.set(cache_hit=not rendered, png_bytes=len(image))
+            return image
+
+    def metrics(self) -> dict:
+        with self._lock:
+            latencies = np.array(self.latencies) * 1000
+            return {
+                "renders": self.renders,
+                "failures": self.failures,
+                "in_flight": self.in_flight,
+                "latency_ms_p50": float(np.percentile(latencies, 50)) if len(latencies) else None,
+                "latency_ms_p95": float(np.percentile(latencies, 95)) if len(latencies) else None,
+            }
+
+    def shutdown(self):
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=True)
+                self._pool = None
+
+
+render_service = RenderService(
+    cache=plot_cache,
+    workers=config.RENDER_WORKERS,
+    executor=config.RENDER_EXECUTOR,
+    timeout=config.RENDER_TIMEOUT_SECONDS
+)
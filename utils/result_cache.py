@@ -0,0 +1,102 @@
+# utils/result_cache.py
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from typing import Optional
+
+from pydantic import BaseModel, Field
+
+from utils.config import config
+from utils.data_cache import data_version
+
+
+def normalize_query(query: str) -> str:
+    """Folds case, accents and whitespace, so 'Quanti usano SPID? ' == 'quanti  usano spid?'."""
+    decomposed = unicodedata.normalize("NFKD", query)
+    folded = "".join(c for c in decomposed if not unicodedata.combining(c)).casefold()
+    return re.sub(r"\s+", " ", folded).strip()
+
+
+class QueryResult(BaseModel):
+    """Everything needed to re-render an answered query without running the crew."""
+    query: str = Field(description="The query as the user typed it")
+    analyst_output: str = Field(description="Raw output of the analyst task")
+    visualizer_output: str = Field(default="", description="Raw JSON output of the visualizer task")
+    plot_image: Optional[bytes] = Field(default=None, description="PNG bytes of the rendered plot")
+
+
+class ResultCache:
+    """
+    End-to-end answers keyed on the normalized query and the data version. Entries for
+    an older data version can never be hit and are purged on the next write.
+    """
+
+    def __init__(self, path: str, max_entries: int):
+        self.path = path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with self._connect() as connection:
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS results ("
+                "key TEXT PRIMARY KEY, data_version TEXT, query TEXT, analyst_output TEXT, "
+                "visualizer_output TEXT, plot_image BLOB, created REAL, last_access REAL)"
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=30)
+            connection.execute("PRAGMA journal_mode=WAL")
+            self._local.connection = connection
+        return connection
+
+    @staticmethod
+    def key(query: str, version: str) -> str:
+        return hashlib.sha256(f"{version}\n{normalize_query(query)}".encode("utf-8")).hexdigest()
+
+    def get(self, query: str, count: bool = True) -> Optional[QueryResult]:
+        """Returns the stored answer, or None; `count=False` leaves the hit/miss counters alone."""
+        key = self.key(query, data_version())
+        with self._connect() as connection:
+            row = connection.execute(
+                "SELECT query, analyst_output, visualizer_output, plot_image FROM results WHERE key = ?", (key,)
+            ).fetchone()
+            if row is not None:
+                connection.execute("UPDATE results SET last_access = ? WHERE key = ?", (time.time(), key))
+        if count:
+            with self._lock:
+                if row is None:
+                    self.misses += 1
+                else:
+                    self.hits += 1
+        if row is None:
+            return None
+        return QueryResult(query=row[0], analyst_output=row[1], visualizer_output=row[2], plot_image=row[3])
+
+    def put(self, result: QueryResult):
+        version = data_version()
+        now = time.time()
+        with self._connect() as connection:
+            connection.execute("DELETE FROM results WHERE data_version != ?", (version,))
+            connection.execute(
+                "INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (self.key(result.query, version), version, result.query, result.analyst_output,
+                 result.visualizer_output, result.plot_image, now, now)
+            )
+            excess = connection.execute("SELECT COUNT(*) FROM results").fetchone()[0] - self.max_entries
+            if excess > 0:
+                connection.execute(
+                    "DELETE FROM results WHERE key IN "
+                    "(SELECT key FROM results ORDER BY last_access ASC LIMIT ?)", (excess,)
+                )
+
+
+result_cache = ResultCache(path=config.RESULT_CACHE_PATH, max_entries=config.RESULT_CACHE_MAX_ENTRIES)
@@ -0,0 +1,213 @@
+# utils/sandbox_pool.py
+import atexit
+import contextlib
+import io
+import multiprocessing
+import queue
+import threading
+
+try:
+    import resource
+except ImportError:  # Windows: no rlimits, only the wall-time limit applies
+    resource = None
+
+from utils.config import config
+
+
+def build_namespace() -> dict:
+    """Returns the globals exposed to LLM-written analysis code."""
+    import re
+    import numpy as np
+    from utils.cube import cube
+    from utils.data_cache import dataset_cache
+    from utils.partition_store import partition_store
+    from utils.schema_catalog import describe_dataset
+
+    # pd.read_csv on the data files and dfs[...] are both served from the
+    # process-wide cache, so the CSVs are parsed once, not on every call.
+    return {
+        'pd': dataset_cache.pandas(),
+        'np': np,
+        're': re,
+        'AVAILABLE_DATA_PATHS': config.AVAILABLE_DATA_PATHS,
+        'dfs': dataset_cache.frames(config.AVAILABLE_DATA_PATHS),
+        'cube': cube,
+        'history': partition_store.history,
+        'months': partition_store.months,
+        'describe_dataset': describe_dataset
+    }
+
+
+def run_analysis_code(code: str) -> str:
+    """
+    Executes analysis code and returns its captured stdout plus any `return_value`.
+    A tabular `return_value` is also stored in the table store and cited as [table:<id>].
+    """
+    from utils.table_store import table_ref, table_store
+
+    try:
+        local_namespace = build_namespace()
+        output_buffer = io.StringIO()
+
+        with contextlib.redirect_stdout(output_buffer):
+            exec(code, local_namespace)
+
+        output = output_buffer.getvalue()
+
+        if 'return_value' in local_namespace:
+            return_value = local_namespace['return_value']
+            output = output + "\n" + str(return_value)
+            try:
+                table_id = table_store.put(return_value)
+            except Exception:
+                table_id = None  # not storable as Arrow: the inline text above stands in for it
+            if table_id:
+                output += (f"\nTable reference: {table_ref(table_id)} (write it on its own line in your answer "
+                           "to show this full table; do not retype its numbers)")
+            return output
+        return output or "Code executed successfully, but no output was produced."
+
+    except Exception as e:
+        return f"Error executing code: {str(e) or type(e).__name__}"
+
+
+def _set_memory_limit(memory_mb: int):
+    if resource is None or not memory_mb:
+        return
+    # RLIMIT_DATA ignores the read-only memory-mapped datasets, RLIMIT_AS would count them.
+    limit = getattr(resource, "RLIMIT_DATA", resource.RLIMIT_AS)
+    _, hard = resource.getrlimit(limit)
+    soft = memory_mb * 1024 * 1024
+    if hard != resource.RLIM_INFINITY:
+        soft = min(soft, hard)
+    resource.setrlimit(limit, (soft, hard))
+
+
+def _set_cpu_limit(cpu_seconds: int):
+    """RLIMIT_CPU counts the whole process lifetime, so the budget is re-armed before each call."""
+    if resource is None or not cpu_seconds:
+        return
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    _, hard = resource.getrlimit(resource.RLIMIT_CPU)
+    soft = int(usage.ru_utime + usage.ru_stime) + cpu_seconds
+    if hard != resource.RLIM_INFINITY:
+        soft = min(soft, hard)
+    resource.setrlimit(resource.RLIMIT_CPU, (soft, hard))
+
+
+def _worker_main(conn, memory_mb: int, cpu_seconds: int):
+    """Worker loop: warm the dataset cache, then execute code received over the pipe."""
+    _set_memory_limit(memory_mb)
+    from utils.data_cache import dataset_cache
+    for path in config.AVAILABLE_DATA_PATHS.values():
+        if path:
+            with contextlib.suppress(Exception):
+                dataset_cache.get(path)
+
+    while True:
+        try:
+            code = conn.recv()
+        except EOFError:
+            break
+        if code is None:
+            break
+        _set_cpu_limit(cpu_seconds)
+        conn.send(run_analysis_code(code))
+
+
+class _Worker:
+    def __init__(self, process, conn):
+        self.process = process
+        self.conn = conn
+
+    def stop(self):
+        with contextlib.suppress(Exception):
+            self.conn.close()
+        self.process.kill()
+        self.process.join()
+
+
+class SandboxPool:
+    """Pool of long-lived, pre-warmed processes that execute analysis code under limits."""
+
+    def __init__(self, size: int, timeout: float, memory_mb: int, cpu_seconds: int):
+        self.size = size
+        self.timeout = timeout
+        self.memory_mb = memory_mb
+        self.cpu_seconds = cpu_seconds
+        self._idle = queue.Queue()
+        self._lock = threading.Lock()
+        self._context = None
+        self._workers = []
+
+    def _get_context(self):
+        if "forkserver" in multiprocessing.get_all_start_methods():
+            context = multiprocessing.get_context("forkserver")
+            # Imported once in the fork server, so each worker starts with them loaded.
+            context.set_forkserver_preload(
+                ["pandas", "numpy", "utils.data_cache", "utils.cube", "utils.partition_store", "utils.schema_catalog", "utils.table_store"]
+            )
+            return context
+        return multiprocessing.get_context("spawn")
+
+    def _spawn(self) -> _Worker:
+        parent_conn, child_conn = self._context.Pipe()
+        process = self._context.Process(
+            target=_worker_main,
+            args=(child_conn, self.memory_mb, self.cpu_seconds),
+            daemon=True
+        )
+        process.start()
+        child_conn.close()
+        worker = _Worker(process, parent_conn)
+        self._workers.append(worker)
+        return worker
+
+    def _replace(self, worker: _Worker):
+        worker.stop()
+        with self._lock:
+            self._workers.remove(worker)
+            self._idle.put(self._spawn())
+
+    def start(self):
+        """Starts the workers; safe to call on every Streamlit rerun."""
+        with self._lock:
+            if self._context is not None:
+                return
+            self._context = self._get_context()
+            for _ in range(self.size):
+                self._idle.put(self._spawn())
+        atexit.register(self.shutdown)
+
+    def run(self, code: str) -> str:
+        """Runs code on an idle worker, blocking until one is free."""
+        self.start()
+        worker = self._idle.get()
+        try:
+            worker.conn.send(code)
+            if worker.conn.poll(self.timeout):
+                result = worker.conn.recv()
+                self._idle.put(worker)
+                return result
+            error = f"Error executing code: execution timed out after {self.timeout} seconds."
+        except (EOFError, OSError):
+            error = ("Error executing code: the sandbox worker was terminated "
+                     "(CPU or memory limit exceeded).")
+        self._replace(worker)
+        return error
+
+    def shutdown(self):
+        with self._lock:
+            for worker in self._workers:
+                worker.stop()
+            self._workers = []
+            self._idle = queue.Queue()
+            self._context = None
+
+
+sandbox_pool = SandboxPool(
+    size=config.SANDBOX_WORKERS,
+    timeout=config.SANDBOX_TIMEOUT_SECONDS,
+    memory_mb=config.SANDBOX_MEMORY_MB,
+    cpu_seconds=config.SANDBOX_CPU_SECONDS
+)
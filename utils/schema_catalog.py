@@ -0,0 +1,111 @@
+# utils/schema_catalog.py
+import re
+import threading
+
+import pandas as pd
+
+from utils.config import config
+from utils.data_cache import data_version, dataset_cache, dataset_name
+from utils.partition_store import partition_store
+from utils.result_cache import normalize_query
+
+# Columns with at most this many distinct values have all of them listed.
+MAX_LISTED_VALUES = 25
+EXAMPLE_VALUES = 3
+# Integer lower/upper bounds written next to range labels by utils/ingestion.py.
+BOUND_PATTERN = re.compile(r"_(min|max)(_km)?$")
+
+
+def range_sort_key(label: str):
+    """Orders range labels such as ' -5km', '5-10km', '600- km' by their lower bound."""
+    match = re.match(r"\D*(\d+)", str(label))
+    lower = int(match.group(1)) if match else 0
+    return (0 if str(label).strip().startswith("-") else 1, lower, str(label))
+
+
+def profile_column(series: pd.Series) -> dict:
+    """Summarises one column: kind, distinct values or range."""
+    profile = {"name": series.name, "distinct": int(series.nunique())}
+    if pd.api.types.is_numeric_dtype(series):
+        profile.update(kind="int" if pd.api.types.is_integer_dtype(series) else "float",
+                       min=series.min().item(), max=series.max().item(), sum=series.sum().item())
+        return profile
+    values = [v for v in series.dropna().unique()]
+    profile["kind"] = "text"
+    if profile["distinct"] <= MAX_LISTED_VALUES:
+        key = range_sort_key if str(series.name).startswith("fascia") else str
+        profile["values"] = sorted((str(v) for v in values), key=key)
+    else:
+        profile["examples"] = [str(v) for v in values[:EXAMPLE_VALUES]]
+    return profile
+
+
+def profile_dataset(df: pd.DataFrame) -> dict:
+    return {"rows": len(df), "columns": [profile_column(df[c]) for c in df.columns]}
+
+
+class SchemaCatalog:
+    """Column/value profile of every dataset, rebuilt only when the data version changes."""
+
+    def __init__(self):
+        self._version = None
+        self._catalog = {}
+        self._lock = threading.Lock()
+
+    def get(self) -> dict:
+        version = data_version()
+        with self._lock:
+            if version != self._version:
+                self._catalog = {
+                    dataset_name(path): dict(key=key, months=partition_store.months(dataset_name(path)),
+                                             **profile_dataset(dataset_cache.get(path)))
+                    for key, path in config.AVAILABLE_DATA_PATHS.items() if path
+                }
+                self._version = version
+            return self._catalog
+
+    def vocabulary(self) -> dict:
+        """Maps each listed value, folded like queries are, to its (dataset, column, value) uses."""
+        vocabulary = {}
+        for dataset, entry in self.get().items():
+            for column in entry["columns"]:
+                for value in column.get("values", []):
+                    key = normalize_query(value)
+                    if key:
+                        vocabulary.setdefault(key, []).append((dataset, column["name"], value))
+        return vocabulary
+
+    def render(self, name: str = None) -> str:
+        """Renders the catalog (or one dataset of it) as compact text for prompts."""
+        catalog = self.get()
+        names = [dataset_name(name).upper()] if name else list(catalog)
+        blocks = []
+        for dataset in names:
+            if dataset not in catalog:
+                return f"Unknown dataset '{name}'. Available: {', '.join(catalog)}"
+            entry = catalog[dataset]
+            lines = [f"{dataset} (AVAILABLE_DATA_PATHS['{entry['key']}'], dfs['{dataset}']): {entry['rows']} rows"]
+            if entry["months"]:
+                lines[0] += f", month {entry['months'][-1]}; history(): {', '.join(entry['months'])}"
+            for column in entry["columns"]:
+                if column["kind"] != "text" and BOUND_PATTERN.search(column["name"]):
+                    detail = f"{column['kind']} range bound, {column['min']}..{column['max']}"
+                    detail += ", empty = open-ended" if "_max" in column["name"] else ""
+                elif column["kind"] != "text":
+                    detail = f"{column['kind']}, {column['min']}..{column['max']}, total {column['sum']}"
+                elif "values" in column:
+                    detail = "values " + " | ".join(repr(v) for v in column["values"])
+                else:
+                    examples = ", ".join(repr(v) for v in column["examples"])
+                    detail = f"text, {column['distinct']} distinct, e.g. {examples}"
+                lines.append(f"  - '{column['name']}': {detail}")
+            blocks.append("\n".join(lines))
+        return "\n".join(blocks)
+
+
+schema_catalog = SchemaCatalog()
+
+
+def describe_dataset(name: str = None) -> str:
+    """Returns the columns, value sets and ranges of one dataset (or all of them)."""
+    return schema_catalog.render(name)
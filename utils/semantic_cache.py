@@ -0,0 +1,193 @@
+# utils/semantic_cache.py
+import re
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+from utils.config import config
+from utils.data_cache import data_version
+from utils.fast_path import DIMENSIONS, NEGATION_WORDS, VALUE_SYNONYMS
+from utils.result_cache import ResultCache, normalize_query, result_cache
+from utils.schema_catalog import schema_catalog
+
+# Catalog values shorter than this ('F', 'M', 'SI', 'NO') are too ambiguous to act as entities.
+MIN_ENTITY_LENGTH = 3
+
+# Words that flip or redirect a question while barely moving its embedding ('più' vs 'meno',
+# 'anziani' vs 'giovani'), folded like queries are; both queries must use the same groups.
+DIRECTION_WORDS = {
+    "more": {"piu", "maggiore", "maggiori", "massimo", "massima", "most", "more", "highest", "higher",
+             "largest", "top", "max"},
+    "less": {"meno", "minore", "minori", "minimo", "minima", "least", "less", "fewer", "lowest", "lower",
+             "smallest", "min"},
+    "older": {"anziani", "anziano", "anziane", "anziana", "vecchi", "older", "oldest", "senior"},
+    "younger": {"giovani", "giovane", "younger", "youngest", "junior"},
+    "above": {"sopra", "oltre", "superiore", "superiori", "above", "over", "exceeding"},
+    "below": {"sotto", "inferiore", "inferiori", "below", "under"},
+    "compare": {"rispetto", "confronto", "confronta", "confrontare", "versus", "vs", "compared", "compare"},
+    "ratio": {"percentuale", "percentuali", "quota", "rapporto", "percentage", "share", "ratio", "proportion"},
+    "not": NEGATION_WORDS,
+}
+
+
+class SemanticQueryCache:
+    """
+    Reuses the stored report of the nearest previously answered query when its cosine
+    similarity is above a threshold. Both queries must also mention the same dataset
+    values, numbers, dimensions and direction/negation words (see entities), so
+    'SPID in Lombardia' never answers 'SPID in Lazio', nor 'per regione' 'per sesso'.
+    """
+
+    def __init__(self, manager_factory, results: ResultCache, threshold: float, max_entries: int,
+                 collection_name: str, candidates: int = 4):
+        self._manager_factory = manager_factory
+        self.results = results
+        self.threshold = threshold
+        self.candidates = candidates
+        self.max_entries = max_entries
+        self.collection_name = collection_name
+        self.lookups = 0
+        self.hits = 0
+        self.latencies = deque(maxlen=1000)
+        self._lock = threading.Lock()
+
+    @property
+    def manager(self):
+        """The Chroma manager, created on first use (opening the database loads the embedder)."""
+        return self._manager_factory()
+
+    @property
+    def collection(self):
+        return self.manager.get_or_create_collection(self.collection_name)
+
+    @staticmethod
+    def entities(query: str) -> frozenset:
+        """
+        What a cached answer must agree on: catalog values, numbers, group-by dimensions,
+        and direction, comparison and negation words mentioned in a query.
+        """
+        normalized = normalize_query(query)
+        text = normalized.replace("'", " ")
+        words = set(re.findall(r"\w+", text))
+        found = set(re.findall(r"\d+", normalized))
+        for value in schema_catalog.vocabulary():
+            if len(value) >= MIN_ENTITY_LENGTH and re.search(rf"(?<!\w){re.escape(value)}(?!\w)", normalized):
+                found.add(value)
+        for phrase, (column, value) in VALUE_SYNONYMS.items():
+            if phrase in words:
+                found.add(f"{column}={value}")
+        for dimension, (phrases, _) in DIMENSIONS.items():
+            if any(re.search(rf"(?<!\w){re.escape(p)}(?!\w)", text) for p in phrases):
+                found.add(f"by:{dimension}")
+        for group, members in DIRECTION_WORDS.items():
+            # Some members are phrases ('other than'), so they are matched on the text.
+            if any(re.search(rf"(?<!\w){re.escape(m)}(?!\w)", text) for m in members):
+                found.add(f"word:{group}")
+        return frozenset(found)
+
+    def nearest(self, query: str, n_results: int = 1) -> list:
+        """Returns [(similarity, original_query)] of the closest cached queries for this data version."""
+        collection = self.collection
+        if collection.count() == 0:
+            return []
+        results = collection.query(
+            query_texts=[normalize_query(query)],
+            n_results=n_results,
+            where={"data_version": data_version()}
+        )
+        return [(1.0 - distance, metadata["query"])
+                for distance, metadata in zip(results["distances"][0], results["metadatas"][0])]
+
+    def _match(self, query: str, threshold: float):
+        # The nearest entry may be rejected by the entity check while a further one matches.
+        for similarity, cached_query in self.nearest(query, self.candidates):
+            if similarity >= threshold and self.entities(cached_query) == self.entities(query):
+                return cached_query
+        return None
+
+    def lookup(self, query: str):
+        """Returns the QueryResult of a near-duplicate query, or None."""
+        start = time.perf_counter()
+        cached_query = self._match(query, self.threshold)
+        # Not counted as an exact-cache lookup: serve_without_crew already counted that one.
+        result = self.results.get(cached_query, count=False) if cached_query else None
+        with self._lock:
+            self.lookups += 1
+            self.hits += result is not None
+            self.latencies.append(time.perf_counter() - start)
+        return result
+
+    def add(self, queries):
+        """Indexes one or more answered queries in a single batch."""
+        queries = [queries] if isinstance(queries, str) else list(queries)
+        if not queries:
+            return
+        version = data_version()
+        now = time.time()
+        self.manager.get_or_create_collection(self.collection_name)
+        self.manager.add_data(
+            documents=[normalize_query(q) for q in queries],
+            ids=[ResultCache.key(q, version) for q in queries],
+            metadatas=[{"query": q, "data_version": version, "created": now} for q in queries]
+        )
+        if self.collection.count() > self.max_entries:
+            self.compact()
+
+    def compact(self):
+        """Drops entries for older data versions, then the oldest beyond max_entries."""
+        self.manager.get_or_create_collection(self.collection_name)
+        self.manager.delete_data(where={"data_version": {"$ne": data_version()}})
+        entries = self.collection.get(include=["metadatas"])
+        excess = len(entries["ids"]) - self.max_entries
+        if excess > 0:
+            by_age = sorted(zip(entries["ids"], entries["metadatas"]), key=lambda e: e[1]["created"])
+            self.manager.delete_data(ids=[entry_id for entry_id, _ in by_age[:excess]])
+
+    def metrics(self) -> dict:
+        with self._lock:
+            latencies = np.array(self.latencies) * 1000
+            return {
+                "lookups": self.lookups,
+                "hits": self.hits,
+                "hit_rate": self.hits / self.lookups if self.lookups else 0.0,
+                "latency_ms_p50": float(np.percentile(latencies, 50)) if len(latencies) else None,
+                "latency_ms_p95": float(np.percentile(latencies, 95)) if len(latencies) else None,
+            }
+
+    def evaluate(self, labelled_pairs, thresholds=(0.8, 0.85, 0.9, 0.95)) -> dict:
+        """
+        Measures recall and precision per threshold on (query, expected_cached_query or None)
+        pairs, against the queries currently indexed; use it to tune SEMANTIC_CACHE_THRESHOLD.
+        """
+        report = {}
+        for threshold in thresholds:
+            true_hits = false_hits = expected = 0
+            for query, expected_query in labelled_pairs:
+                matched = self._match(query, threshold)
+                expected += expected_query is not None
+                if matched is not None:
+                    if expected_query is not None and normalize_query(matched) == normalize_query(expected_query):
+                        true_hits += 1
+                    else:
+                        false_hits += 1
+            report[threshold] = {
+                "recall": true_hits / expected if expected else None,
+                "precision": true_hits / (true_hits + false_hits) if true_hits + false_hits else None,
+            }
+        return report
+
+
+semantic_cache = None
+if config.SEMANTIC_CACHE_ENABLED:
+    from utils.chroma_db import get_chroma_manager
+
+    semantic_cache = SemanticQueryCache(
+        manager_factory=get_chroma_manager,
+        results=result_cache,
+        threshold=config.SEMANTIC_CACHE_THRESHOLD,
+        max_entries=config.SEMANTIC_CACHE_MAX_ENTRIES,
+        collection_name=config.SEMANTIC_CACHE_COLLECTION,
+        candidates=config.SEMANTIC_CACHE_CANDIDATES
+    )
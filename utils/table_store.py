@@ -0,0 +1,137 @@
+# utils/table_store.py
+import hashlib
+import os
+import re
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+
+from utils.columnar_store import load_compiled, write_arrow
+from utils.config import config
+
+# How result tables are cited in text: the analyst copies the reference instead of the numbers.
+TABLE_REF_PATTERN = re.compile(r"\[table:([0-9a-f]{12})\]")
+
+
+def table_ref(table_id: str) -> str:
+    return f"[table:{table_id}]"
+
+
+def _unique_names(names) -> list:
+    """Suffixes repeated column names ('sesso', 'sesso_2'), which Arrow cannot store."""
+    seen, unique = set(), []
+    for name in names:
+        candidate, n = name, 1
+        while candidate in seen:
+            n += 1
+            candidate = f"{name}_{n}"
+        seen.add(candidate)
+        unique.append(candidate)
+    return unique
+
+
+def as_table(value):
+    """Returns `value` as a flat DataFrame if it is tabular (DataFrame or Series), else None."""
+    if isinstance(value, pd.Series):
+        value = value.to_frame(name=value.name if value.name is not None else "value")
+    if not isinstance(value, pd.DataFrame):
+        return None
+    if not isinstance(value.index, pd.RangeIndex) or value.index.names != [None]:
+        # e.g. groupby('sesso')['sesso'].count(): the index and the column share a name
+        value = value.reset_index(allow_duplicates=True)
+    if isinstance(value.columns, pd.MultiIndex):
+        columns = [" ".join(str(level) for level in column if str(level)) for column in value.columns]
+    else:
+        columns = [str(column) for column in value.columns]
+    value = value.set_axis(_unique_names(columns), axis=1)
+    for column in value.columns:
+        # Object columns mixing e.g. numbers and text are kept as text.
+        if value[column].dtype == object and pd.api.types.infer_dtype(value[column]).startswith("mixed"):
+            value[column] = value[column].map(lambda v: None if pd.api.types.is_scalar(v) and pd.isna(v) else str(v))
+    return value
+
+
+class TableStore:
+    """
+    Result tables handed from the analysis sandbox to the reporter as Arrow IPC files keyed
+    by a content hash. Files are shared between the sandbox workers and the app process;
+    recently read tables are also kept in memory.
+    """
+
+    def __init__(self, directory: str, max_bytes: int, max_rows: int, memory_entries: int = 64):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_rows = max_rows
+        self.memory_entries = memory_entries
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _path(self, table_id: str) -> str:
+        return os.path.join(self.directory, f"{table_id}.arrow")
+
+    @staticmethod
+    def table_id(df: pd.DataFrame) -> str:
+        digest = hashlib.sha256("\x1f".join(df.columns).encode("utf-8"))
+        digest.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+        return digest.hexdigest()[:12]
+
+    def put(self, value):
+        """Stores a DataFrame/Series and returns its id, or None if it is not a storable table."""
+        df = as_table(value)
+        if df is None or df.empty or len(df) > self.max_rows:
+            return None
+        table_id = self.table_id(df)
+        with self._lock:
+            if not os.path.exists(self._path(table_id)):
+                write_arrow(df, self._path(table_id))
+                self._evict()
+            self._remember(table_id, df)
+        return table_id
+
+    def _remember(self, table_id: str, df: pd.DataFrame):
+        self._memory[table_id] = df
+        self._memory.move_to_end(table_id)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def get(self, table_id: str):
+        """Returns the stored table, or None if it was never stored or has been evicted."""
+        with self._lock:
+            if table_id in self._memory:
+                self._memory.move_to_end(table_id)
+                return self._memory[table_id]
+            path = self._path(table_id)
+            try:
+                df = load_compiled(path)
+                os.utime(path)  # mtime doubles as last access for eviction
+            except (OSError, ValueError):
+                return None
+            self._remember(table_id, df)
+            return df
+
+    def _evict(self):
+        entries = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(".arrow"):
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+
+
+table_store = TableStore(
+    directory=config.TABLE_STORE_DIR,
+    max_bytes=config.TABLE_STORE_MAX_MB * 1024 * 1024,
+    max_rows=config.TABLE_STORE_MAX_ROWS
+)
@@ -0,0 +1,245 @@
+# utils/tracing.py
+import contextvars
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import re
+import time
+import uuid
+from collections import deque
+from contextlib import contextmanager
+
+from utils.config import config
+
+# Provider credentials travel in request URLs (Gemini's `?key=`); never let them reach a log.
+SECRET_PATTERN = re.compile(r"((?:api_?key|key|token)=)[^&\s\"']+", re.IGNORECASE)
+
+# Totals rolled up from every span into its parents, so a task or crew span summarizes its calls.
+COUNTERS = ("llm_calls", "tool_calls", "errors", "retries", "cache_hits", "prompt_tokens", "completion_tokens")
+
+_current_span = contextvars.ContextVar("current_span", default=None)
+
+
+def redact(text: str) -> str:
+    return SECRET_PATTERN.sub(r"\1***", text)
+
+
+class RedactingFilter(logging.Filter):
+    """Masks credentials in log records (e.g. httpx's 'HTTP Request: POST ...?key=...')."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        message = record.getMessage()
+        redacted = redact(message)
+        if redacted != message:
+            record.msg, record.args = redacted, None
+        return True
+
+
+def install_log_redaction(logger_names=("httpx", "LiteLLM", "litellm", "httpcore")):
+    for name in logger_names:
+        logger = logging.getLogger(name)
+        if not any(isinstance(f, RedactingFilter) for f in logger.filters):
+            logger.addFilter(RedactingFilter())
+
+
+def count_tokens(model: str, messages=None, text: str = None) -> int:
+    """Token count with the model's tokenizer via litellm, or ~4 characters per token without it."""
+    try:
+        import litellm
+        if messages is not None:
+            return litellm.token_counter(model=model, messages=messages)
+        return litellm.token_counter(model=model, text=text or "")
+    except Exception:
+        size = payload_size(messages) if messages is not None else len(text or "")
+        return size // 4
+
+
+def payload_size(value) -> int:
+    """Characters in a prompt/response/tool payload."""
+    if value is None:
+        return 0
+    if isinstance(value, str):
+        return len(value)
+    if isinstance(value, (list, tuple)):
+        return sum(payload_size(item) for item in value)
+    if isinstance(value, dict):
+        return payload_size(value.get("content")) if "content" in value else len(json.dumps(value, default=str))
+    return len(str(value))
+
+
+class Span:
+    """One timed step of a query: the crew run, a task, a tool call or an LLM call."""
+
+    def __init__(self, name: str, kind: str, trace_id: str, parent=None, **attributes):
+        self.name = name
+        self.kind = kind
+        self.trace_id = trace_id
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent = parent
+        self.attributes = attributes
+        self.counts = dict.fromkeys(COUNTERS, 0)
+        self.status = "ok"
+        self.error = None
+        self.start = time.time()
+        self._start = time.perf_counter()
+        self.duration = None
+        self._failed_kinds = set()  # kinds of children whose last call failed, to spot retries
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+    def fail(self, error: str):
+        self.status = "error"
+        self.error = redact(str(error))[:500]
+
+    def end(self):
+        self.duration = time.perf_counter() - self._start
+        if self.kind == "llm":
+            self.counts["llm_calls"] += 1
+            self.counts["cache_hits"] += int(bool(self.attributes.get("cache_hit")))
+            self.counts["prompt_tokens"] += self.attributes.get("prompt_tokens") or 0
+            self.counts["completion_tokens"] += self.attributes.get("completion_tokens") or 0
+        elif self.kind == "tool":
+            self.counts["tool_calls"] += 1
+        if self.status == "error":
+            self.counts["errors"] += 1
+        if self.parent is not None:
+            for counter, value in self.counts.items():
+                self.parent.counts[counter] += value
+            if self.status == "error":
+                self.parent._failed_kinds.add(self.kind)
+            else:
+                self.parent._failed_kinds.discard(self.kind)
+
+    def to_dict(self) -> dict:
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent.span_id if self.parent is not None else None,
+            "name": self.name,
+            "kind": self.kind,
+            "start": self.start,
+            "duration_s": self.duration,
+            "status": self.status,
+            "error": self.error,
+            "attributes": self.attributes,
+            "counts": {counter: value for counter, value in self.counts.items() if value},
+        }
+
+
+class Tracer:
+    """
+    Records spans for each query and writes finished ones to a JSONL trace store. Writes go
+    through a QueueHandler, so the thread running the crew never waits on disk; a listener
+    thread appends them to a size-rotated file. The most recent spans are also kept in memory.
+    """
+
+    def __init__(self, path: str, enabled: bool = True, max_bytes: int = 50 * 1024 * 1024, backups: int = 3,
+                 memory_spans: int = 5000):
+        self.path = path
+        self.enabled = enabled
+        self.recent = deque(maxlen=memory_spans)
+        self._logger = logging.getLogger("noipa.trace")
+        self._logger.propagate = False
+        self._logger.setLevel(logging.INFO)
+        self._listener = None
+        if enabled:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            file_handler = logging.handlers.RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backups,
+                                                                encoding="utf-8")
+            file_handler.setFormatter(logging.Formatter("%(message)s"))
+            records = queue.SimpleQueue()
+            self._logger.addHandler(logging.handlers.QueueHandler(records))
+            self._listener = logging.handlers.QueueListener(records, file_handler)
+            self._listener.start()
+
+    @contextmanager
+    def span(self, name: str, kind: str = "step", **attributes):
+        """Times the block as a child of the current span (or as a new trace's root)."""
+        if not self.enabled:
+            yield Span(name, kind, trace_id="", **attributes)
+            return
+        parent = _current_span.get()
+        span = Span(name, kind, trace_id=parent.trace_id if parent is not None else uuid.uuid4().hex,
+                    parent=parent, **attributes)
+        if parent is not None and kind in parent._failed_kinds:
+            span.set(retry=True)
+            span.counts["retries"] += 1
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.fail(f"{type(e).__name__}: {e}")
+            raise
+        finally:
+            _current_span.reset(token)
+            self._finish(span)
+
+    def start_span(self, name: str, kind: str = "step", **attributes) -> Span:
+        """Opens a span that is closed later with end_span, for steps without a single enclosing block."""
+        parent = _current_span.get()
+        span = Span(name, kind, trace_id=parent.trace_id if parent is not None else uuid.uuid4().hex,
+                    parent=parent, **attributes)
+        _current_span.set(span)
+        return span
+
+    def end_span(self, span: Span, record: bool = True):
+        """Closes a span from start_span; `record=False` drops it (e.g. an empty trailing step)."""
+        _current_span.set(span.parent)
+        if record:
+            self._finish(span)
+
+    def _finish(self, span: Span):
+        span.end()
+        if not self.enabled:
+            return
+        record = span.to_dict()
+        self.recent.append(record)
+        self._logger.info(json.dumps(record, default=str, ensure_ascii=False))
+
+    def load(self, limit: int = 5000) -> list:
+        """The most recent spans from the trace store (including rotated files), oldest first."""
+        spans = deque(maxlen=limit)
+        paths = [f"{self.path}.{i}" for i in range(9, 0, -1)] + [self.path]
+        for path in paths:
+            if not os.path.exists(path):
+                continue
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        spans.append(json.loads(line))
+                    except json.JSONDecodeError:
+                        continue  # a line still being written
+        return list(spans)
+
+    def flush(self):
+        """Blocks until queued spans are written."""
+        if self._listener is not None:
+            self._listener.stop()
+            self._listener.start()
+
+
+def current_span():
+    return _current_span.get()
+
+
+def record_llm_call(span: Span, model: str, messages, response, cache_hit: bool = False):
+    """Fills an LLM span with payload sizes and token counts."""
+    span.set(
+        model=model,
+        cache_hit=cache_hit,
+        prompt_chars=payload_size(messages),
+        completion_chars=payload_size(response),
+        prompt_tokens=count_tokens(model, messages=messages),
+        completion_tokens=count_tokens(model, text=response if isinstance(response, str) else str(response)),
+    )
+
+
+tracer = Tracer(
+    path=config.TRACE_PATH,
+    enabled=config.TRACING_ENABLED,
+    max_bytes=config.TRACE_MAX_MB * 1024 * 1024
+)
+install_log_redaction()
@@ -0,0 +1,75 @@
+# utils/viz_intent.py
+import io
+import json
+import re
+
+import pandas as pd
+
+from utils.result_cache import normalize_query
+
+VISUALIZATION_CSV_MARKER = "=== DATA FOR VISUALIZATION (CSV) ==="
+
+# Charts with more categories than this are unreadable; the table is the better answer.
+MAX_CHART_ROWS = 60
+
+# Phrases (accent/case folded) that ask for a chart, or explicitly for no chart.
+NO_CHART_PATTERNS = [
+    r"\bsenza (grafic\w*|visualizzazion\w*|plot)\b", r"\bsolo (il |la |i |le )?(testo|numer\w*|tabell\w*|total\w*)\b",
+    r"\bnon (serve|servono|voglio|mostrare) (il |un |i |alcun )?(grafic\w*|visualizzazion\w*)\b",
+    r"\b(no|without( a| any)?) (chart|plot|graph|visuali[sz]ation)s?\b", r"\b(text|numbers?|table) only\b",
+    r"\bjust (the )?(number|numbers|count|total|text|table)\b",
+]
+CHART_PATTERNS = [
+    r"\bgrafic\w*\b", r"\bvisualizz\w*\b", r"\bistogramm\w*\b", r"\btorta\b", r"\bdiagramm\w*\b",
+    r"\bplot\w*\b", r"\bchart\w*\b", r"\bgraph\w*\b", r"\bvisuali[sz]\w*\b", r"\bhistogram\w*\b",
+    r"\bpie\b", r"\bheat ?map\b", r"\bdraw\b", r"\bdisegna\w*\b",
+]
+
+
+def requested_visualization(query: str):
+    """True if the query asks for a chart, False if it refuses one, None if it does not say."""
+    text = normalize_query(query)
+    if any(re.search(p, text) for p in NO_CHART_PATTERNS):
+        return False
+    if any(re.search(p, text) for p in CHART_PATTERNS):
+        return True
+    return None
+
+
+def extract_visualization_csv(analyst_output: str):
+    """Parses the analyst's '=== DATA FOR VISUALIZATION (CSV) ===' block, or returns None."""
+    if not analyst_output or VISUALIZATION_CSV_MARKER not in analyst_output:
+        return None
+    block = analyst_output.split(VISUALIZATION_CSV_MARKER, 1)[1].strip()
+    block = re.sub(r"^```\w*\n|\n?```.*$", "", block, flags=re.DOTALL).strip()
+    try:
+        df = pd.read_csv(io.StringIO(block))
+    except (pd.errors.ParserError, pd.errors.EmptyDataError, ValueError):
+        return None
+    return df if len(df.columns) >= 2 else None
+
+
+def chartable(df) -> bool:
+    """A chart adds something only for 2..MAX_CHART_ROWS rows with a numeric column."""
+    return (df is not None and 2 <= len(df) <= MAX_CHART_ROWS
+            and any(pd.api.types.is_numeric_dtype(df[c]) for c in df.columns))
+
+
+def should_visualize(query: str, analyst_output: str) -> bool:
+    """
+    Decides locally whether the visualizer task is worth an LLM call: an explicit request
+    wins, otherwise the analyst's CSV block must have a shape a chart can show.
+    """
+    requested = requested_visualization(query)
+    if requested is False:
+        return False
+    df = extract_visualization_csv(analyst_output)
+    if requested:
+        return df is not None and len(df) >= 1
+    return chartable(df)
+
+
+def no_visualization_json(reason: str) -> str:
+    """The visualizer's 'no chart' JSON, for when its task was skipped."""
+    return json.dumps({"visualization_type": "none", "plot_parameters": None,
+                       "description": reason, "plot_path": None})